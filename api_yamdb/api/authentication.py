@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import User
+
+# Поля пользователя, которых достаточно для проверок permisions.py и для
+# записи автора отзыва или комментария. Остальные поля отложены и при
+# обращении загружаются из базы.
+AUTH_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in (
+        'id', 'username', 'role', 'is_active', 'is_staff', 'is_superuser'
+    )
+)
+
+# Поля пользователя, которые RoleAccessToken добавляет в токен. Вместе с
+# id из токена их хватает, чтобы собрать пользователя без базы.
+ROLE_CLAIMS = ('username', 'role', 'is_staff', 'is_superuser')
+
+
+def get_setting(name):
+    return settings.AUTH_CACHE[name]
+
+
+class RoleAccessToken(AccessToken):
+    """Access-токен с ролью и флагами пользователя в подписанных полях."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in ROLE_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+def trusts_claims(request, token):
+    """Можно ли собрать пользователя из полей токена, по политике
+    settings.TOKEN_USER. Токены без полей роли всегда проверяются по базе.
+    """
+    config = settings.TOKEN_USER
+    if not config['ENABLED'] or any(
+        claim not in token for claim in ROLE_CLAIMS
+    ):
+        return False
+    if config['REVALIDATE'] == 'writes' and request.method not in SAFE_METHODS:
+        return False
+    max_age = config['MAX_AGE']
+    return max_age is None or time.time() - token['iat'] <= max_age
+
+
+def token_user(token):
+    """Пользователь из полей токена. Токен выдаётся только активному
+    пользователю, поэтому is_active не хранится.
+    """
+    values = {claim: token[claim] for claim in ROLE_CLAIMS}
+    values['id'] = token[api_settings.USER_ID_CLAIM]
+    values['is_active'] = True
+    return User.from_db(
+        DEFAULT_DB_ALIAS, AUTH_FIELDS,
+        tuple(values[field] for field in AUTH_FIELDS)
+    )
+
+
+class UserCache:
+    """LRU-кеш полей пользователя по (id, токен) со сроком жизни TTL
+    секунд. Кеш свой у каждого процесса: сигналы сбрасывают его только в
+    процессе, где изменён пользователь, в остальных запись живёт не
+    дольше TTL.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, db, values = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return db, values
+
+    def set(self, key, db, values):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + get_setting('TTL'), db,
+                                 values)
+            self.entries.move_to_end(key)
+            while len(self.entries) > get_setting('MAX_SIZE'):
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, которая не читает пользователя из базы на
+    каждый запрос. Токен проверяется как обычно; пользователь
+    собирается экземпляром User только с полями AUTH_FIELDS - из полей
+    токена в режиме TOKEN_USER или из кеша.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if trusts_claims(request, validated_token):
+            return token_user(validated_token), validated_token
+        user = self.get_cached_user(raw_token, validated_token)
+        return user, validated_token
+
+    def get_cached_user(self, raw_token, validated_token):
+        key = (validated_token.get(api_settings.USER_ID_CLAIM), raw_token)
+        cached = user_cache.get(key)
+        if cached is not None:
+            db, values = cached
+            return User.from_db(db, AUTH_FIELDS, values)
+        # Промах: полная проверка simplejwt (пользователь существует и
+        # активен), затем в кеш попадают только нужные поля.
+        user = self.get_user(validated_token)
+        user_cache.set(
+            key, user._state.db,
+            tuple(getattr(user, field) for field in AUTH_FIELDS)
+        )
+        return user
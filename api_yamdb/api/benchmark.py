@@ -0,0 +1,291 @@
+import math
+import platform
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import metrics, slowqueries, throttling
+from .authentication import RoleAccessToken
+from .codes import current_code
+from reviews.loader import load_files
+from reviews.models import Category, Genre, Title, User
+from reviews.synthetic import DatasetGenerator
+
+# Замеры эндпоинтов API на синтетических данных. Каждый сценарий
+# выполняется repeat раз после warmup прогревочных запросов; по умолчанию
+# кеш очищается перед каждым запросом, чтобы измерять путь до базы, а не
+# попадания в кеш каталога. Корзины ограничения частоты очищаются перед
+# каждым запросом: замеряется проверка лимита, а не ответ 429. Кеш,
+# корзины, метрики, журнал медленных запросов и профили на время замеров
+# переносятся во временный каталог, чтобы не стереть кеш и лимиты
+# работающих воркеров и не добавить замеры в их метрики.
+BENCHMARK_SCALE = {
+    'users': 2000,
+    'titles': 1000,
+    'genres': 20,
+    'categories': 5,
+    'reviews_per_title': 10,
+    'comments_per_review': 2,
+}
+DEFAULT_REPEAT = 20
+DEFAULT_WARMUP = 3
+# Порог регрессии по времени и размеру ответа - доля от базового значения.
+# Изменения меньше MIN_LATENCY_DELTA_MS считаются шумом измерений.
+DEFAULT_THRESHOLD = 0.2
+MIN_LATENCY_DELTA_MS = 1.0
+LATENCY_METRICS = ('p50_ms', 'p95_ms')
+
+# client - 'anon', 'user' или 'admin'; data - словарь или функция без
+# аргументов, которая вызывается перед каждым запросом вне замера.
+Scenario = namedtuple(
+    'Scenario', ('name', 'method', 'path', 'client', 'data'),
+    defaults=('anon', None)
+)
+
+
+class BenchmarkError(Exception):
+    """Сценарий вернул ошибку вместо ответа."""
+
+
+def seed_dataset(seed=0, **scale):
+    """Генерирует синтетические данные и загружает их в текущую базу."""
+    options = {**BENCHMARK_SCALE, **scale}
+    generator = DatasetGenerator(
+        options['users'], options['titles'], options['genres'],
+        options['categories'], options['reviews_per_title'],
+        options['comments_per_review'], seed=seed
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        generator.generate(Path(directory))
+        load_files(Path(directory))
+    return options
+
+
+def build_scenarios():
+    """Сценарии для всех маршрутов api/urls.py. Для вложенных ресурсов
+    берутся самые нагруженные объекты: произведение с наибольшим числом
+    отзывов и отзыв с наибольшим числом комментариев.
+    """
+    title = Title.objects.order_by('-reviews_count', 'pk').first()
+    review = title.reviews.annotate(
+        comments_total=Count('comments')
+    ).order_by('-comments_total', 'pk').first()
+    comment = review.comments.order_by('pk').first()
+    user = User.objects.filter(role='user').order_by('pk').first()
+    genre = Genre.objects.order_by('pk').first()
+    category = Category.objects.order_by('pk').first()
+    word = title.name.split()[0]
+    titles = '/api/v1/titles/'
+    reviews = f'{titles}{title.pk}/reviews/'
+    comments = f'{reviews}{review.pk}/comments/'
+    scenarios = [
+        Scenario('titles-list', 'get', titles),
+        Scenario(
+            'titles-list-filtered', 'get',
+            f'{titles}?genre={genre.slug}&category={category.slug}'
+        ),
+        Scenario('titles-list-name', 'get', f'{titles}?name={word}'),
+        Scenario('titles-search', 'get', f'{titles}?search={word}'),
+        Scenario('titles-detail', 'get', f'{titles}{title.pk}/'),
+        Scenario('genres-list', 'get', '/api/v1/genres/'),
+        Scenario('categories-list', 'get', '/api/v1/categories/'),
+        Scenario('reviews-list', 'get', reviews),
+        Scenario('reviews-detail', 'get', f'{reviews}{review.pk}/'),
+        Scenario('comments-list', 'get', comments),
+        Scenario('users-list', 'get', '/api/v1/users/', 'admin'),
+        Scenario(
+            'users-detail', 'get', f'/api/v1/users/{user.username}/',
+            'admin'
+        ),
+        Scenario('users-me', 'get', '/api/v1/users/me/', 'user'),
+        Scenario(
+            'signup', 'post', '/api/v1/auth/signup/', 'anon',
+            {'username': user.username, 'email': user.email}
+        ),
+        Scenario(
+            'token', 'post', '/api/v1/auth/token/', 'anon',
+            lambda: {
+                'username': user.username,
+                'confirmation_code': current_code(
+                    User.objects.get(pk=user.pk)
+                ),
+            }
+        ),
+        Scenario('export-reviews', 'get', '/api/v1/export/reviews/', 'admin'),
+    ]
+    if comment is not None:
+        scenarios.append(
+            Scenario('comments-detail', 'get', f'{comments}{comment.pk}/')
+        )
+    return scenarios
+
+
+def build_clients():
+    clients = {'anon': APIClient()}
+    for role in ('user', 'admin'):
+        user = User.objects.filter(role=role).order_by('pk').first()
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RoleAccessToken.for_user(user)}'
+        )
+        clients[role] = client
+    return clients
+
+
+def percentile(values, fraction):
+    """Процентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def measure(scenario, client, repeat=DEFAULT_REPEAT, warmup=DEFAULT_WARMUP,
+            cold=True):
+    timings = []
+    queries = 0
+    size = 0
+    for iteration in range(warmup + repeat):
+        if cold:
+            cache.clear()
+        throttling.store.clear()
+        data = scenario.data() if callable(scenario.data) else scenario.data
+        request = getattr(client, scenario.method)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = request(scenario.path, data, format='json')
+            if response.streaming:
+                body = b''.join(response.streaming_content)
+            else:
+                body = response.content
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise BenchmarkError(
+                f'{scenario.name}: {scenario.method.upper()} '
+                f'{scenario.path} вернул {response.status_code}'
+            )
+        if iteration >= warmup:
+            timings.append(elapsed * 1000)
+            queries = max(queries, len(context))
+            size = max(size, len(body))
+    return {
+        'method': scenario.method.upper(),
+        'path': scenario.path,
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'queries': queries,
+        'bytes': size,
+    }
+
+
+@contextmanager
+def isolated_storage():
+    """Общие для всех воркеров хранилища - во временном каталоге: кеш
+    каталога и корзины ограничения частоты замеры очищают, а метрики,
+    журнал медленных запросов и профили замеры засорили бы.
+    """
+    process_stores = (metrics.store, slowqueries.log)
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        # Накопленное до замеров остаётся в файлах общего каталога.
+        for store in process_stores:
+            store.flush(force=True)
+        try:
+            with override_settings(
+                CACHES={'default': {
+                    'BACKEND':
+                        'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': directory / 'cache',
+                }},
+                THROTTLE={
+                    **settings.THROTTLE,
+                    'DATABASE': directory / 'throttle.sqlite3',
+                },
+                METRICS={
+                    **settings.METRICS, 'DIRECTORY': directory / 'metrics'
+                },
+                SLOW_QUERIES={
+                    **settings.SLOW_QUERIES,
+                    'DIRECTORY': directory / 'slow_queries',
+                },
+                PROFILING={
+                    **settings.PROFILING, 'DIRECTORY': directory / 'profiles'
+                },
+            ):
+                yield
+        finally:
+            # Значения замеров не должны попасть в общий каталог при
+            # следующей записи.
+            for store in process_stores:
+                store.reset()
+
+
+def run_benchmark(scenarios=None, repeat=DEFAULT_REPEAT,
+                  warmup=DEFAULT_WARMUP, cold=True, progress=None):
+    """Замеряет сценарии на текущей базе и возвращает результат для
+    сохранения в JSON.
+    """
+    if scenarios is None:
+        scenarios = build_scenarios()
+    clients = build_clients()
+    endpoints = {}
+    with isolated_storage():
+        for scenario in scenarios:
+            endpoints[scenario.name] = measure(
+                scenario, clients[scenario.client], repeat, warmup, cold
+            )
+            if progress:
+                progress(scenario.name, endpoints[scenario.name])
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': repeat,
+            'warmup': warmup,
+            'cold_cache': cold,
+        },
+        'endpoints': endpoints,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Сравнивает два результата run_benchmark и возвращает список
+    регрессий строками. Время и размер ответа сравниваются с порогом
+    threshold, число запросов к базе детерминировано и не должно расти.
+    """
+    regressions = []
+    for name, base in baseline['endpoints'].items():
+        result = current['endpoints'].get(name)
+        if result is None:
+            regressions.append(f'{name}: нет в новом замере')
+            continue
+        for metric in LATENCY_METRICS:
+            delta = result[metric] - base[metric]
+            if (
+                delta > MIN_LATENCY_DELTA_MS
+                and delta > base[metric] * threshold
+            ):
+                regressions.append(
+                    f'{name}: {metric} {base[metric]} -> {result[metric]}'
+                )
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов к базе {base["queries"]} -> '
+                f'{result["queries"]}'
+            )
+        if result['bytes'] > base['bytes'] * (1 + threshold):
+            regressions.append(
+                f'{name}: размер ответа {base["bytes"]} -> {result["bytes"]}'
+            )
+    return regressions
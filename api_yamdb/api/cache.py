@@ -0,0 +1,128 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Версии ресурсов и кеш ответов каталога.
+# Версия - время последнего изменения ресурса в наносекундах, хранится в
+# общем для всех воркеров кеше и обновляется сигналами моделей
+# (api/signals.py): запись в одном воркере меняет ETag во всех. По версиям
+# строятся ETag и Last-Modified, и по ним же проверяется свежесть кеша:
+#   titles            - всё, что встроено в произведения (жанры, категории);
+#   titles:list       - состав и поля списка произведений;
+#   title:<pk>        - одно произведение;
+#   genres            - список жанров;
+#   categories        - список категорий;
+#   reviews:<title>   - отзывы произведения;
+#   comments:<review> - комментарии к отзыву;
+#   users             - имена пользователей (автор в отзывах и комментариях).
+# Ключ ответа не содержит версию данных: запись хранит версии, с которыми
+# она была построена. Так после изменения данных устаревший ответ остаётся
+# доступен и отдаётся другим запросам, пока один воркер строит новый.
+RESPONSE_KEY_PREFIX = 'catalog:response:'
+VERSION_KEY_PREFIX = 'catalog:version:'
+LOCK_SUFFIX = ':lock'
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_setting(name):
+    return settings.CATALOG_CACHE[name]
+
+
+def version_key(name):
+    return f'{VERSION_KEY_PREFIX}{name}'
+
+
+def get_versions(names):
+    """Текущие версии зависимостей одним обращением к кешу.
+    Отсутствующая версия заводится от текущего времени, чтобы после
+    вытеснения версии из кеша не совпасть со старыми записями.
+    """
+    keys = [version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_versions(*names):
+    now = time.time_ns()
+    for name in names:
+        key = version_key(name)
+        # Версия всегда растёт, даже если часы отстают от прошлой отметки.
+        cache.set(key, max(now, (cache.get(key) or 0) + 1), None)
+
+
+def get_last_modified(versions):
+    return max(versions) // 10 ** 9
+
+
+def get_etag(request, versions):
+    """ETag зависит от адреса с параметрами и версий данных."""
+    raw = f'{get_response_key(request)}:{":".join(map(str, versions))}'
+    return f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def get_response_key(request):
+    """Ключ по хосту, пути и нормализованной строке запроса:
+    параметры сортируются, порядок в URL на ключ не влияет.
+    """
+    query = urlencode(sorted(
+        (name, value)
+        for name, values in request.GET.lists()
+        for value in values
+    ))
+    raw = f'{request.get_host()}{request.path}?{query}'
+    return RESPONSE_KEY_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_entry(key, version):
+    """Возвращает (данные, версии, с которыми они построены, свежие ли
+    они) или (None, None, False).
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return None, None, False
+    fresh = entry['version'] == version and entry['expires'] > time.time()
+    return entry['data'], entry['version'], fresh
+
+
+def set_entry(key, version, data):
+    cache.set(
+        key,
+        {
+            'version': version,
+            'data': data,
+            'expires': time.time() + get_setting('TIMEOUT'),
+        },
+        get_setting('STALE_TIMEOUT')
+    )
+
+
+def acquire_lock(key):
+    """Блокировка построения ответа, общая для воркеров через кеш.
+    В memcached и redis cache.add атомарен; в файловом кеше между
+    проверкой и записью есть короткое окно, и изредка один ответ могут
+    построить два воркера. Это лишняя работа, а не ошибка: ответ
+    тот же.
+    """
+    return cache.add(key + LOCK_SUFFIX, 1, get_setting('LOCK_TIMEOUT'))
+
+
+def release_lock(key):
+    cache.delete(key + LOCK_SUFFIX)
+
+
+def wait_for_entry(key, version):
+    """Ждёт, пока другой воркер построит отсутствующий ответ."""
+    deadline = time.monotonic() + get_setting('LOCK_WAIT')
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        data, _, fresh = get_entry(key, version)
+        if fresh:
+            return data
+    return None
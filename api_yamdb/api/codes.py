@@ -0,0 +1,82 @@
+import time
+from random import randint
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from reviews.models import User
+
+# Коды подтверждения для получения токена (settings.CONFIRMATION_CODES).
+# В режиме 'stored' код случайный и хранится в User.confirmation_code:
+# каждый вызов signup перезаписывает строку пользователя. В режиме 'hmac'
+# код не хранится, а вычисляется, как токены сброса пароля Django: HMAC
+# от id пользователя, номера окна времени длиной WINDOW секунд и «соли»
+# пользователя - почты, хеша пароля и времени последнего входа. Повторный
+# signup ничего не пишет в таблицу пользователей; выдача токена обновляет
+# last_login, и использованный код перестаёт подходить.
+KEY_SALT = 'api.codes.confirmation'
+CODE_DIGITS = 6
+
+
+def get_setting(name):
+    return settings.CONFIRMATION_CODES[name]
+
+
+def is_stateless():
+    return get_setting('MODE') == 'hmac'
+
+
+def current_window():
+    return int(time.time()) // get_setting('WINDOW')
+
+
+def hmac_code(user, window):
+    login = ''
+    if user.last_login:
+        login = user.last_login.replace(microsecond=0, tzinfo=None)
+    value = f'{user.pk}:{user.email}:{user.password}:{login}:{window}'
+    digest = salted_hmac(KEY_SALT, value, algorithm='sha256').hexdigest()
+    return int(digest, 16) % 10 ** CODE_DIGITS
+
+
+def make_code(user):
+    """Новый код: случайный для 'stored', текущий HMAC-код для 'hmac'."""
+    if is_stateless():
+        return hmac_code(user, current_window())
+    return randint(10 ** (CODE_DIGITS - 1), 10 ** CODE_DIGITS - 1)
+
+
+def format_code(code):
+    return f'{code:0{CODE_DIGITS}d}'
+
+
+def check_code(user, code):
+    """Проверяет код. HMAC-код действует в своём окне и в следующем,
+    то есть от WINDOW до двух WINDOW секунд; сравнение идёт за
+    постоянное время.
+    """
+    if not is_stateless():
+        return code == user.confirmation_code
+    window = current_window()
+    matches = [
+        constant_time_compare(
+            format_code(hmac_code(user, checked)), format_code(code)
+        )
+        for checked in (window, window - 1)
+    ]
+    return any(matches)
+
+
+def consume(user):
+    """Делает использованный HMAC-код недействительным."""
+    if is_stateless():
+        user.last_login = timezone.now()
+        User.objects.filter(pk=user.pk).update(last_login=user.last_login)
+
+
+def current_code(user):
+    """Код, который сейчас подходит пользователю (для замеров и тестов)."""
+    if is_stateless():
+        return hmac_code(user, current_window())
+    return user.confirmation_code
@@ -0,0 +1,97 @@
+import json
+import zlib
+
+from . import serializers
+from .list_serializers import compile_row
+from reviews.models import Comments, Review, Title
+
+EXPORT_CHUNK_SIZE = 2000
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def title_chunks(queryset, chunk_size):
+    # iterator() не поддерживает prefetch_related, поэтому произведения
+    # читаются пачками по первичному ключу: жанры подгружаются на пачку.
+    queryset = queryset.select_related('category').prefetch_related(
+        'genre'
+    ).order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def iterator_chunks(queryset, chunk_size):
+    chunk = []
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(instance)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def review_chunks(queryset, chunk_size):
+    return iterator_chunks(
+        queryset.select_related('author').order_by('id'), chunk_size
+    )
+
+
+comment_chunks = review_chunks
+
+
+# Формат строк совпадает с ответами API; для вложенных ресурсов
+# добавляется ссылка на родительский объект.
+EXPORTS = {
+    'titles': {
+        'model': Title,
+        'serializer': serializers.TitleReadSerializer,
+        'chunks': title_chunks,
+        'parents': (),
+        'since_field': None,
+    },
+    'reviews': {
+        'model': Review,
+        'serializer': serializers.ReviewSerializer,
+        'chunks': review_chunks,
+        'parents': ('title',),
+        'since_field': 'pub_date',
+    },
+    'comments': {
+        'model': Comments,
+        'serializer': serializers.CommentSerializer,
+        'chunks': comment_chunks,
+        'parents': ('review',),
+        'since_field': 'pub_date',
+    },
+}
+
+
+def export_lines(resource, since=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Генерирует NDJSON пачками строк, не держа выборку в памяти."""
+    export = EXPORTS[resource]
+    queryset = export['model'].objects.all()
+    if since is not None:
+        queryset = queryset.filter(**{f'{export["since_field"]}__gte': since})
+    build = compile_row(export['serializer'](), memo={})
+    for chunk in export['chunks'](queryset, chunk_size):
+        lines = []
+        for instance in chunk:
+            row = build(instance)
+            for parent in export['parents']:
+                row[parent] = getattr(instance, f'{parent}_id')
+            lines.append(json.dumps(row, ensure_ascii=False))
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=GZIP_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,13 +1,93 @@
+import sys
+from functools import reduce
+from operator import or_
+
 import django_filters
+from django.db.models import Q
+from rest_framework.filters import SearchFilter
+
+from reviews.models import Review, Title, normalize_name
+from reviews.search import search_reviews, search_titles
+
+
+def prefix_range(field, prefix):
+    """Поиск по префиксу как диапазон [prefix, следующий префикс).
+    В отличие от LIKE 'prefix%' такое условие всегда идёт по B-tree индексу.
+    """
+    last = ord(prefix[-1])
+    if last == sys.maxunicode:
+        return Q(**{f'{field}__gte': prefix})
+    return Q(**{
+        f'{field}__gte': prefix,
+        f'{field}__lt': prefix[:-1] + chr(last + 1),
+    })
+
+
+def filter_normalized(queryset, fields, value):
+    """Ищет подстроку value без учёта регистра по нормализованным полям
+    fields. Результат тот же, что у icontains по исходным полям; индекс
+    для такого условия не используется.
+    """
+    value = normalize_name(value)
+    if not value:
+        return queryset
+    return queryset.filter(reduce(or_, (
+        Q(**{f'{field}__contains': value}) for field in fields
+    )))
+
+
+def filter_normalized_prefix(queryset, field, value):
+    """Ищет значения нормализованного поля field, начинающиеся с value,
+    диапазоном по индексу поля.
+    """
+    value = normalize_name(value)
+    if not value:
+        return queryset
+    return queryset.filter(prefix_range(field, value))
+
 
-from reviews.models import Title
+class NormalizedSearchFilter(SearchFilter):
+    """SearchFilter по нормализованным полям (name_normalized и т.п.).
+    Строка поиска приводится к тому же виду, что и поля, целиком.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        value = request.query_params.get(self.search_param, '').strip()
+        if not search_fields or not value:
+            return queryset
+        return filter_normalized(queryset, search_fields, value)
 
 
 class TitleFilter(django_filters.FilterSet):
-    name = django_filters.CharFilter(lookup_expr='icontains')
+    name = django_filters.CharFilter(method='filter_name')
+    name_prefix = django_filters.CharFilter(method='filter_name_prefix')
     genre = django_filters.CharFilter(field_name='genre__slug')
     category = django_filters.CharFilter(field_name='category__slug')
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('name', 'year', 'genre', 'category')
+        fields = (
+            'name', 'name_prefix', 'year', 'genre', 'category', 'search'
+        )
+
+    def filter_name(self, queryset, name, value):
+        return filter_normalized(queryset, ('name_normalized',), value)
+
+    def filter_name_prefix(self, queryset, name, value):
+        return filter_normalized_prefix(queryset, 'name_normalized', value)
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
+
+
+class ReviewFilter(django_filters.FilterSet):
+    search = django_filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = Review
+        fields = ('search',)
+
+    def filter_search(self, queryset, name, value):
+        return search_reviews(queryset, value)
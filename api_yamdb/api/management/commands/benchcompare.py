@@ -0,0 +1,38 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import DEFAULT_THRESHOLD, compare
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение результата команды benchmark с базовым: команда '
+        'завершается с ошибкой, если найдены регрессии'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', type=Path)
+        parser.add_argument('current', type=Path)
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help='Допустимый рост времени и размера ответа, доля (0.2 = 20%%)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            baseline, current = (
+                json.loads(options[name].read_text(encoding='utf-8'))
+                for name in ('baseline', 'current')
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+        regressions = compare(baseline, current, options['threshold'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f'Найдено регрессий: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено'))
@@ -0,0 +1,77 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases,
+                               teardown_test_environment)
+
+from api.benchmark import (BENCHMARK_SCALE, DEFAULT_REPEAT, DEFAULT_WARMUP,
+                           BenchmarkError, isolated_storage,
+                           run_benchmark, seed_dataset)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер эндпоинтов API на синтетических данных в тестовой базе: '
+        'p50/p95 времени ответа, число запросов к базе и размер ответа'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=Path,
+            help='Файл для результата в JSON (по умолчанию - вывод на экран)'
+        )
+        parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+        parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Не очищать кеш перед запросами'
+        )
+        for name, value in BENCHMARK_SCALE.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}',
+                type=type(value),
+                default=value
+            )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть больше нуля')
+        # Замеры идут в отдельной тестовой базе и со своим кешем: рабочие
+        # данные и кеш не меняются, письма не отправляются.
+        with isolated_storage():
+            setup_test_environment()
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                scale = seed_dataset(
+                    options['seed'],
+                    **{name: options[name] for name in BENCHMARK_SCALE}
+                )
+                result = run_benchmark(
+                    repeat=options['repeat'], warmup=options['warmup'],
+                    cold=not options['warm_cache'], progress=self.report
+                )
+            except BenchmarkError as e:
+                raise CommandError(e)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+        result['meta'].update(scale=scale, seed=options['seed'])
+        data = json.dumps(result, ensure_ascii=False, indent=2)
+        if options['output'] is None:
+            self.stdout.write(data)
+            return
+        options['output'].write_text(data + '\n', encoding='utf-8')
+        self.stdout.write(
+            self.style.SUCCESS(f'Результат сохранён в {options["output"]}')
+        )
+
+    def report(self, name, result):
+        self.stderr.write(
+            f'{name}: p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+            f'запросов {result["queries"]}, {result["bytes"]} байт'
+        )
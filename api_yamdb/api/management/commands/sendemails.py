@@ -0,0 +1,51 @@
+import logging
+import time
+from smtplib import SMTPException
+
+from django.core.management.base import BaseCommand
+
+from api.outbox import drain, get_setting
+
+logger = logging.getLogger('api.outbox')
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправка писем из очереди: пачками через одно соединение с '
+        'почтовым сервером, с повторными попытками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Отправить готовые письма и завершиться'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Писем в пачке (по умолчанию EMAIL_OUTBOX["BATCH_SIZE"])'
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self.report(*drain(options['batch_size']))
+            return
+        while True:
+            try:
+                sent, errors = drain(options['batch_size'])
+            except (SMTPException, OSError) as error:
+                # Почтовый сервер недоступен: письма остаются в очереди.
+                logger.warning('Нет соединения с почтовым сервером: %s', error)
+                sent = errors = 0
+            if sent or errors:
+                self.report(sent, errors)
+            else:
+                time.sleep(get_setting('POLL_INTERVAL'))
+
+    def report(self, sent, errors):
+        message = f'Отправлено писем: {sent}'
+        if errors:
+            message += f', ошибок: {errors}'
+        self.stdout.write(self.style.SUCCESS(message))
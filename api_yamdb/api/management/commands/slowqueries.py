@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+
+from api.slowqueries import clear, top_offenders
+
+
+class Command(BaseCommand):
+    help = (
+        'Самые медленные SQL-запросы по общему времени с примерами '
+        'параметров и планами выполнения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Сколько форм запросов показать'
+        )
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help='Показать примеры с параметрами и планами выполнения'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Очистить журнал медленных запросов'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear()
+            self.stdout.write(self.style.SUCCESS('Журнал очищен'))
+            return
+        offenders = top_offenders(options['limit'])
+        if not offenders:
+            self.stdout.write('Медленных запросов не найдено')
+            return
+        for number, entry in enumerate(offenders, 1):
+            views = sorted({sample['view'] for sample in entry['samples']})
+            self.stdout.write(
+                f'{number}. всего {entry["total_ms"]:.1f} мс, '
+                f'запросов {entry["count"]}, '
+                f'максимум {entry["max_ms"]:.1f} мс, '
+                f'view: {", ".join(views)}'
+            )
+            self.stdout.write(f'   {entry["sql"]}')
+            if options['plans']:
+                self.write_samples(entry['samples'])
+
+    def write_samples(self, samples):
+        for sample in samples:
+            self.stdout.write(
+                f'   - {sample["ms"]:.1f} мс, {sample["view"]}, '
+                f'параметры: {sample["params"]}'
+            )
+            for step in sample['plan'] or ():
+                self.stdout.write(f'       {step}')
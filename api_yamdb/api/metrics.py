@@ -0,0 +1,294 @@
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.crypto import constant_time_compare
+
+from . import processfiles
+
+# Метрики в текстовом формате Prometheus. Каждый процесс копит значения
+# в памяти и не чаще FLUSH_INTERVAL секунд записывает их в свой файл в
+# каталоге DIRECTORY (api/processfiles.py); эндпоинт /metrics складывает
+# файлы всех процессов. Так воркеры gunicorn/uwsgi за балансировщиком отдают
+# общие значения, какой бы из них ни получил запрос Prometheus. Значения
+# остановленных процессов остаются в сумме (счётчики не должны
+# уменьшаться): при чтении их файлы складываются в один. Каталог
+# очищается при развёртывании, до запуска воркеров.
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+REQUEST_DURATION = 'yamdb_http_request_duration_seconds'
+RESPONSES = 'yamdb_http_responses_total'
+DB_QUERIES = 'yamdb_db_queries_total'
+DB_DURATION = 'yamdb_db_query_duration_seconds_total'
+CACHE_RESPONSES = 'yamdb_cache_responses_total'
+CACHE_HIT_RATIO = 'yamdb_cache_hit_ratio'
+EMAIL_BACKLOG = 'yamdb_email_backlog'
+EMAILS_SENT = 'yamdb_emails_sent_total'
+EMAIL_ERRORS = 'yamdb_email_errors_total'
+
+DEFINITIONS = {
+    REQUEST_DURATION: (HISTOGRAM, 'Время обработки запроса по view.'),
+    RESPONSES: (COUNTER, 'Ответы по view, методу и статусу.'),
+    DB_QUERIES: (COUNTER, 'SQL-запросы по view.'),
+    DB_DURATION: (COUNTER, 'Время SQL-запросов по view.'),
+    CACHE_RESPONSES: (
+        COUNTER, 'Ответы каталога по результату обращения к кешу.'
+    ),
+    CACHE_HIT_RATIO: (
+        GAUGE, 'Доля ответов каталога из кеша (HIT и STALE).'
+    ),
+    EMAIL_BACKLOG: (GAUGE, 'Письма в очереди на отправку.'),
+    EMAILS_SENT: (COUNTER, 'Отправленные письма.'),
+    EMAIL_ERRORS: (COUNTER, 'Неудачные попытки отправки писем.'),
+}
+# Значения, которые вычисляются при каждом запросе /metrics, а не
+# копятся процессами: имя метрики -> функция без аргументов.
+GAUGE_CALLBACKS = {}
+CACHE_HITS = ('hit', 'stale')
+UNMATCHED_VIEW = 'unmatched'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def get_setting(name):
+    return settings.METRICS[name]
+
+
+def register_gauge(name):
+    """Декоратор функции, которая возвращает текущее значение метрики."""
+    def decorator(func):
+        GAUGE_CALLBACKS[name] = func
+        return func
+    return decorator
+
+
+class MetricsStore(processfiles.ProcessFileStore):
+    """Значения метрик текущего процесса. Ключ - (имя, метки), где
+    метки - кортеж пар (имя, значение). Гистограмма хранится списком:
+    число наблюдений в каждом интервале BUCKETS и за последним, затем
+    сумма наблюдений.
+    """
+
+    settings_name = 'METRICS'
+
+    def clear(self):
+        self.values = {}
+
+    def inc(self, name, labels=(), amount=1):
+        with self.lock:
+            self.check_fork()
+            key = (name, labels)
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = get_setting('BUCKETS')
+        with self.lock:
+            self.check_fork()
+            entry = self.values.setdefault(
+                (name, labels), [0] * (len(buckets) + 2)
+            )
+            entry[bisect_left(buckets, value)] += 1
+            entry[-1] += value
+
+    def serialize(self):
+        return {
+            'values': [
+                [name, labels, value]
+                for (name, labels), value in self.values.items()
+            ],
+        }
+
+
+store = MetricsStore()
+
+
+def merge(totals, key, value):
+    if key not in totals:
+        totals[key] = value
+    elif isinstance(value, list):
+        totals[key] = [
+            total + item for total, item in zip(totals[key], value)
+        ]
+    else:
+        totals[key] += value
+
+
+def is_authorized(request):
+    """Запрос к /metrics с токеном METRICS['TOKEN']."""
+    token = get_setting('TOKEN')
+    return bool(token) and constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    )
+
+
+def sum_values(datas):
+    totals = {}
+    for data in datas:
+        for name, labels, value in data['values']:
+            merge(totals, (name, tuple(map(tuple, labels))), value)
+    return totals
+
+
+def merge_files(datas):
+    """Данные файлов нескольких процессов одним файлом."""
+    return {
+        'values': [
+            [name, labels, value]
+            for (name, labels), value in sum_values(datas).items()
+        ],
+    }
+
+
+def read_files():
+    """Сумма значений всех процессов, в том числе остановленных."""
+    totals = sum_values(processfiles.read_files(
+        get_setting('DIRECTORY'), merge_files
+    ))
+    return {
+        key: value for key, value in totals.items()
+        if key[0] in DEFINITIONS
+    }
+
+
+def add_cache_hit_ratio(totals):
+    hits = total = 0
+    for (name, labels), value in totals.items():
+        if name == CACHE_RESPONSES:
+            total += value
+            if dict(labels)['result'] in CACHE_HITS:
+                hits += value
+    if total:
+        totals[(CACHE_HIT_RATIO, ())] = hits / total
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def format_number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def histogram_lines(name, labels, entry):
+    lines = []
+    cumulative = 0
+    bounds = [repr(float(bound)) for bound in get_setting('BUCKETS')]
+    for bound, count in zip(bounds + ['+Inf'], entry[:-1]):
+        cumulative += count
+        lines.append(
+            f'{name}_bucket{format_labels(labels + (("le", bound),))} '
+            f'{cumulative}'
+        )
+    lines.append(f'{name}_sum{format_labels(labels)} '
+                 f'{format_number(entry[-1])}')
+    lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+    return lines
+
+
+def render(totals):
+    lines = []
+    for name, (kind, description) in DEFINITIONS.items():
+        samples = sorted(
+            (labels, value) for (metric, labels), value in totals.items()
+            if metric == name
+        )
+        if not samples:
+            continue
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            if kind == HISTOGRAM:
+                lines.extend(histogram_lines(name, labels, value))
+            else:
+                lines.append(
+                    f'{name}{format_labels(labels)} {format_number(value)}'
+                )
+    return '\n'.join(lines) + '\n'
+
+
+def collect():
+    """Текст для /metrics со значениями всех процессов."""
+    store.flush(force=True)
+    totals = read_files()
+    add_cache_hit_ratio(totals)
+    for name, callback in GAUGE_CALLBACKS.items():
+        totals[(name, ())] = callback()
+    return render(totals)
+
+
+def view_label(view_func, request):
+    """Имя view для меток: TitleViewSet.list, ExportView.get или имя
+    функции для обычных view Django.
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', UNMATCHED_VIEW)
+    actions = getattr(view_func, 'actions', None) or {}
+    method = request.method.lower()
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+class QueryCounter:
+    """execute_wrapper, считающий число и время SQL-запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Время ответа, статус, SQL-запросы и результат обращения к кешу
+    для каждого запроса с разбивкой по view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_setting('ENABLED'):
+            return self.get_response(request)
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            started = time.perf_counter()
+            response = self.get_response(request)
+            elapsed = time.perf_counter() - started
+        labels = (
+            ('view', getattr(request, 'metrics_view', UNMATCHED_VIEW)),
+        )
+        store.observe(REQUEST_DURATION, labels, elapsed)
+        store.inc(RESPONSES, labels + (
+            ('method', request.method), ('status', str(response.status_code))
+        ))
+        store.inc(DB_QUERIES, labels, counter.count)
+        store.inc(DB_DURATION, labels, counter.duration)
+        if response.has_header('X-Cache'):
+            store.inc(CACHE_RESPONSES, labels + (
+                ('result', response['X-Cache'].lower()),
+            ))
+        store.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_label(view_func, request)
@@ -1,4 +1,10 @@
-from rest_framework import mixins
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import mixins, status
+from rest_framework.response import Response
+
+from . import cache
 
 
 class CreateListDestroyMixin(mixins.CreateModelMixin,
@@ -6,3 +12,161 @@ class CreateListDestroyMixin(mixins.CreateModelMixin,
                              mixins.DestroyModelMixin):
     "Кастомный миксин класс."
     pass
+
+
+class SparseFieldsetMixin:
+    """Выборочные поля ответа: ?fields=id,name,rating.
+    Запрошенные поля передаются сериализатору через контекст, а
+    get_queryset может не загружать лишнее: field_requested() подсказывает,
+    нужны ли связи, а текстовые колонки из deferrable_fields откладываются.
+    Действует только для list и retrieve.
+    """
+
+    fields_query_param = 'fields'
+    deferrable_fields = ()
+
+    def get_requested_fields(self):
+        if self.action not in ('list', 'retrieve'):
+            return None
+        value = self.request.query_params.get(self.fields_query_param)
+        if not value:
+            return None
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+    def field_requested(self, name):
+        requested = self.get_requested_fields()
+        return requested is None or name in requested
+
+    def sparse_queryset(self, queryset):
+        deferred = [
+            name for name in self.deferrable_fields
+            if not self.field_requested(name)
+        ]
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['requested_fields'] = self.get_requested_fields()
+        return context
+
+
+class VersionedResponseMixin:
+    """Условные GET/HEAD запросы и кеш ответов по версиям ресурсов.
+    resource_versions задаёт для каждого action имена версий из
+    api/cache.py (в имени можно использовать kwargs запроса, например
+    'title:{pk}'). По версиям строятся ETag и Last-Modified, и на
+    If-None-Match/If-Modified-Since ответ 304 отдаётся до обращения к
+    ORM и сериализатору. HEAD отвечает заголовками без построения тела.
+    При cache_responses данные ответа кешируются: отсутствующий ответ
+    строит только один воркер, остальные ждут его; устаревший ответ
+    отдаётся, пока другой воркер его обновляет.
+    """
+
+    resource_versions = {}
+    cache_responses = False
+
+    def get_resource_versions(self):
+        return cache.get_versions([
+            name.format(**self.kwargs)
+            for name in self.resource_versions[self.action]
+        ])
+
+    def versioned_response(self, handler, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return handler(request, *args, **kwargs)
+        versions = self.get_resource_versions()
+        validators = self.set_validators(HttpResponse(), request, versions)
+        not_modified = get_conditional_response(
+            request,
+            etag=validators['ETag'],
+            last_modified=cache.get_last_modified(versions),
+            response=validators
+        )
+        if not_modified is not validators:
+            return not_modified
+
+        if request.method == 'HEAD':
+            response = self.head_response()
+        elif self.cache_responses:
+            response = self.cached_response(
+                handler, versions, request, *args, **kwargs
+            )
+        else:
+            response = handler(request, *args, **kwargs)
+        # Устаревший ответ уже помечен версиями, с которыми он построен.
+        if (
+            response.status_code == status.HTTP_200_OK
+            and not response.has_header('ETag')
+        ):
+            self.set_validators(response, request, versions)
+        return response
+
+    def set_validators(self, response, request, versions):
+        response['ETag'] = cache.get_etag(request, versions)
+        response['Last-Modified'] = http_date(
+            cache.get_last_modified(versions)
+        )
+        return response
+
+    def head_response(self):
+        # Проверяем только существование ресурса (и родительских
+        # объектов для вложенных эндпоинтов), без выборки и сериализации.
+        if self.action == 'retrieve':
+            queryset = self.filter_queryset(self.get_queryset())
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            if not queryset.filter(**{
+                self.lookup_field: self.kwargs[lookup_url_kwarg]
+            }).exists():
+                return Response(status=status.HTTP_404_NOT_FOUND)
+        else:
+            self.get_queryset()
+        return Response()
+
+    def cached_response(self, handler, versions, request, *args, **kwargs):
+        key = cache.get_response_key(request)
+        data, data_versions, fresh = cache.get_entry(key, versions)
+        if fresh:
+            return self.cached_data_response(data, 'HIT')
+
+        if not cache.acquire_lock(key):
+            if data is not None:
+                # С текущими версиями клиент получил бы старые данные с
+                # новым ETag и после обновления - 304 на этот ETag.
+                return self.set_validators(
+                    self.cached_data_response(data, 'STALE'),
+                    request, data_versions
+                )
+            data = cache.wait_for_entry(key, versions)
+            if data is not None:
+                return self.cached_data_response(data, 'HIT')
+            return handler(request, *args, **kwargs)
+
+        try:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set_entry(key, versions, response.data)
+        finally:
+            cache.release_lock(key)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def cached_data_response(self, data, state):
+        return Response(data, headers={'X-Cache': state})
+
+
+class VersionedListMixin(VersionedResponseMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.versioned_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class VersionedRetrieveMixin(VersionedResponseMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.versioned_response(
+            super().retrieve, request, *args, **kwargs
+        )
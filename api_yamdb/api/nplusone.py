@@ -0,0 +1,177 @@
+import logging
+import random
+import re
+import sys
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import Field
+
+# Поиск N+1 запросов. Каждый SQL-запрос запроса к API сводится к
+# «форме» - тексту без значений параметров и чисел, - и к месту вызова в
+# коде проекта. Если запрос одной формы из одного места выполнен
+# THRESHOLD и более раз, это цикл по объектам с запросом на каждой
+# итерации. Режимы (settings.N_PLUS_ONE['MODE']):
+#   off    - выключено;
+#   log    - проверяется доля SAMPLE_RATE запросов, находки пишутся в лог;
+#   strict - проверяется каждый запрос, находка - исключение NPlusOneError.
+logger = logging.getLogger('api.nplusone')
+
+IN_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+NUMBER_RE = re.compile(r'\b\d+\b')
+# Модули с обёртками execute_wrapper: их кадры стоят в стеке между
+# запросом и кодом, который его выполнил.
+INSTRUMENTATION_FILES = frozenset(
+    Path(__file__).resolve().with_name(name)
+    for name in ('nplusone.py', 'metrics.py', 'profiling.py', 'slowqueries.py')
+)
+
+Detection = namedtuple(
+    'Detection', ('view', 'count', 'sql', 'call_site', 'field')
+)
+
+
+class NPlusOneError(Exception):
+    """Найден N+1: один и тот же запрос выполняется в цикле."""
+
+
+def get_config():
+    return settings.N_PLUS_ONE
+
+
+def fingerprint(sql):
+    """Форма запроса: списки IN любой длины и числа (LIMIT, OFFSET)
+    заменяются заглушками.
+    """
+    return NUMBER_RE.sub('?', IN_LIST_RE.sub('(...)', sql))
+
+
+@lru_cache(maxsize=None)
+def project_path(filename):
+    """Путь файла относительно репозитория (вместе с тестами) или None
+    для чужого кода.
+    """
+    root = settings.BASE_DIR.parent
+    path = Path(filename).resolve()
+    if (
+        path in INSTRUMENTATION_FILES
+        or root not in path.parents
+        or 'site-packages' in path.parts
+    ):
+        return None
+    return path.relative_to(root)
+
+
+def inspect_stack(frame):
+    """Место вызова в коде проекта и поле сериализатора, которое строилось
+    в момент запроса.
+    """
+    call_site = field = None
+    while frame is not None and (call_site is None or field is None):
+        code = frame.f_code
+        path = project_path(code.co_filename)
+        if call_site is None and path is not None:
+            call_site = f'{path}:{frame.f_lineno} in {code.co_name}'
+        if field is None:
+            candidate = frame.f_locals.get('field')
+            if isinstance(candidate, Field) and candidate.parent is not None:
+                field = (
+                    f'{type(candidate.parent).__name__}.'
+                    f'{candidate.field_name}'
+                )
+        frame = frame.f_back
+    return call_site, field
+
+
+class QueryCollector:
+    """Обёртка execute_wrapper, считающая запросы по форме и месту вызова."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        call_site, field = inspect_stack(sys._getframe(1))
+        key = (fingerprint(sql), call_site)
+        if key in self.queries:
+            self.queries[key]['count'] += 1
+        else:
+            self.queries[key] = {'count': 1, 'sql': sql, 'field': field}
+        return execute(sql, params, many, context)
+
+    def detections(self, view=None):
+        return [
+            Detection(view, query['count'], query['sql'], call_site,
+                      query['field'])
+            for (_, call_site), query in self.queries.items()
+            if query['count'] >= self.threshold
+        ]
+
+
+@contextmanager
+def collect_queries(threshold=None):
+    """Считает запросы ко всем базам внутри блока."""
+    if threshold is None:
+        threshold = get_config()['THRESHOLD']
+    collector = QueryCollector(threshold)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(collector))
+        yield collector
+
+
+def format_detection(detection):
+    return (
+        f'N+1 в {detection.view or "коде"}: {detection.count} запросов '
+        f'одной формы из {detection.call_site or "неизвестного места"}'
+        f', поле {detection.field or "-"}: {detection.sql}'
+    )
+
+
+@contextmanager
+def assert_no_n_plus_one(threshold=None):
+    """Помощник для тестов: падает, если в блоке найден N+1.
+
+        with assert_no_n_plus_one():
+            client.get('/api/v1/titles/1/reviews/')
+    """
+    with collect_queries(threshold) as collector:
+        yield collector
+    detections = collector.detections()
+    assert not detections, '\n'.join(map(format_detection, detections))
+
+
+def get_view_name(request):
+    match = request.resolver_match
+    if match is None:
+        return request.path
+    return f'{match._func_path} ({request.method} {request.path})'
+
+
+class NPlusOneMiddleware:
+    """Проверка запросов к API на N+1 в режиме settings.N_PLUS_ONE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_config()
+        mode = config['MODE']
+        if mode == 'off' or (
+            mode == 'log' and random.random() >= config['SAMPLE_RATE']
+        ):
+            return self.get_response(request)
+        with collect_queries(config['THRESHOLD']) as collector:
+            response = self.get_response(request)
+        detections = collector.detections(get_view_name(request))
+        if detections and mode == 'strict':
+            raise NPlusOneError(
+                '\n'.join(map(format_detection, detections))
+            )
+        for detection in detections:
+            logger.warning(format_detection(detection))
+        return response
@@ -0,0 +1,161 @@
+from datetime import timedelta
+from smtplib import SMTPException
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from reviews.models import OutboxEmail
+
+# Очередь писем. Запрос к API только вставляет строку в OutboxEmail,
+# команда sendemails забирает готовые к отправке письма пачками и
+# отправляет их через одно соединение с почтовым сервером. Забранные
+# письма «арендуются»: следующая попытка переносится на LEASE секунд
+# вперёд, так что письма упавшего воркера вернутся в очередь, а два
+# воркера не возьмут одно письмо. Перед отправкой каждого письма аренда
+# продлевается, поэтому медленная пачка не теряет письма, до которых ещё
+# не дошла. У отправленных писем текст (с кодом подтверждения) стирается
+# сразу, а сами строки удаляются через RETENTION секунд.
+
+
+def get_setting(name):
+    return settings.EMAIL_OUTBOX[name]
+
+
+def enqueue(subject, body, from_email, to):
+    """Ставит письмо в очередь одним INSERT."""
+    return OutboxEmail.objects.create(
+        subject=subject, body=body, from_email=from_email, to=to
+    )
+
+
+@metrics.register_gauge(metrics.EMAIL_BACKLOG)
+def backlog():
+    return OutboxEmail.objects.filter(status='pending').count()
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед попыткой номер attempts + 1."""
+    return min(
+        get_setting('RETRY_DELAY') * 2 ** (attempts - 1),
+        get_setting('MAX_RETRY_DELAY')
+    )
+
+
+def claim_batch(batch_size):
+    """Забирает до batch_size писем, срок отправки которых наступил."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=ids).update(
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=get_setting('LEASE'))
+        )
+    return list(OutboxEmail.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def reconnect(connection):
+    """После ошибки соединение может быть разорвано: следующее письмо
+    отправляется через новое.
+    """
+    connection.close()
+    try:
+        connection.open()
+    except (SMTPException, OSError):
+        pass
+
+
+def renew_lease(email):
+    """Продлевает аренду письма перед отправкой. False - аренда истекла,
+    и письмо уже забрал другой воркер.
+    """
+    lease = timezone.now() + timedelta(seconds=get_setting('LEASE'))
+    renewed = OutboxEmail.objects.filter(
+        pk=email.pk, status='pending', next_attempt_at=email.next_attempt_at
+    ).update(next_attempt_at=lease)
+    email.next_attempt_at = lease
+    return bool(renewed)
+
+
+def send_batch(emails, connection):
+    """Отправляет письма через открытое соединение. Возвращает
+    (отправленные id, {письмо: текст ошибки}); письма с истёкшей арендой
+    пропускаются.
+    """
+    sent = []
+    errors = {}
+    for email in emails:
+        if not renew_lease(email):
+            continue
+        message = EmailMessage(
+            email.subject, email.body, email.from_email, (email.to,),
+            connection=connection
+        )
+        try:
+            message.send()
+        except (SMTPException, OSError) as error:
+            errors[email] = f'{type(error).__name__}: {error}'
+            reconnect(connection)
+        else:
+            sent.append(email.pk)
+    return sent, errors
+
+
+def record_results(sent, errors):
+    now = timezone.now()
+    OutboxEmail.objects.filter(pk__in=sent).update(
+        status='sent', sent_at=now, last_error='', body=''
+    )
+    for email, error in errors.items():
+        if email.attempts >= get_setting('MAX_ATTEMPTS'):
+            changes = {'status': 'failed'}
+        else:
+            changes = {
+                'next_attempt_at':
+                    now + timedelta(seconds=retry_delay(email.attempts)),
+            }
+        OutboxEmail.objects.filter(pk=email.pk).update(
+            last_error=error, **changes
+        )
+    metrics.store.inc(metrics.EMAILS_SENT, amount=len(sent))
+    metrics.store.inc(metrics.EMAIL_ERRORS, amount=len(errors))
+    metrics.store.flush(force=True)
+
+
+def purge():
+    """Удаляет отправленные и неотправленные письма старше RETENTION
+    секунд. Возвращает число удалённых писем.
+    """
+    before = timezone.now() - timedelta(seconds=get_setting('RETENTION'))
+    deleted, _ = OutboxEmail.objects.filter(
+        status__in=('sent', 'failed'), created_at__lt=before
+    ).delete()
+    return deleted
+
+
+def drain(batch_size=None, connection=None):
+    """Отправляет все письма, срок которых наступил, пачками через одно
+    соединение. Возвращает (отправлено, ошибок).
+    """
+    purge()
+    batch_size = batch_size or get_setting('BATCH_SIZE')
+    total_sent = total_errors = 0
+    connection = connection or get_connection()
+    with connection:
+        while True:
+            emails = claim_batch(batch_size)
+            if not emails:
+                break
+            sent, errors = send_batch(emails, connection)
+            record_results(sent, errors)
+            total_sent += len(sent)
+            total_errors += len(errors)
+    return total_sent, total_errors
@@ -0,0 +1,186 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       LimitOffsetPagination)
+
+POSITION_SEPARATOR = '|'
+MIN_INT = -2 ** 63
+MAX_INT = 2 ** 63 - 1
+
+
+def reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith('-') else f'-{field}'
+        for field in ordering
+    )
+
+
+class CursorOrLimitOffsetPagination(CursorPagination):
+    """Курсорная (keyset) пагинация с сохранением limit/offset.
+    Курсорный режим включается параметром cursor (пустое значение -
+    первая страница): выборка идёт по индексу без OFFSET и без COUNT(*),
+    в ответе только ссылки next/previous. В отличие от CursorPagination
+    из DRF позиция хранит значения всех полей ordering, поэтому курсор
+    не зависит от сдвига и остаётся верным при добавлении новых записей.
+    Без параметра cursor запрос обрабатывается через LimitOffsetPagination.
+    """
+
+    ordering = ('id',)
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    offset_pagination_class = LimitOffsetPagination
+    offset_paginator = None
+
+    def use_cursor(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(request):
+            if not queryset.ordered:
+                queryset = queryset.order_by(*self.ordering)
+            self.offset_paginator = self.offset_pagination_class()
+            return self.offset_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        self.offset_paginator = None
+
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = (
+                self.cursor.reverse, self.cursor.position
+            )
+
+        if reverse:
+            queryset = queryset.order_by(*reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.get_position_filter(
+                queryset.model, current_position, reverse
+            ))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        # Есть ли записи дальше в направлении выборки и перед курсором.
+        has_following = len(results) > len(self.page)
+        has_preceding = current_position is not None and bool(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = has_preceding, has_following
+        else:
+            self.has_next, self.has_previous = has_following, has_preceding
+        # Курсор указывает на крайнюю запись страницы: следующая страница
+        # начинается строго после последней, предыдущая - строго до первой.
+        if self.has_next:
+            self.next_position = self._get_position_from_instance(
+                self.page[-1], self.ordering
+            )
+        if self.has_previous:
+            self.previous_position = self._get_position_from_instance(
+                self.page[0], self.ordering
+            )
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_position_values(self, model, position):
+        """Значения позиции, приведённые к типам полей модели. Курсор
+        приходит от клиента, и испорченное значение даёт 404, а не 500.
+        """
+        values = position.split(POSITION_SEPARATOR)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [
+                model._meta.get_field(order.lstrip('-')).clean(value, None)
+                for order, value in zip(self.ordering, values)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        # Целое вне 64 бит база не примет даже для сравнения.
+        if any(
+            isinstance(value, int) and not MIN_INT <= value <= MAX_INT
+            for value in values
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_position_filter(self, model, position, reverse):
+        """Условие "строго после позиции" по кортежу полей ordering:
+        (a > x) OR (a = x AND b > y) OR ... с учётом направления полей.
+        Такое условие покрывается составным индексом по тем же полям.
+        """
+        values = self.get_position_values(model, position)
+        condition = Q()
+        equal = Q()
+        for order, value in zip(self.ordering, values):
+            field = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def decode_cursor(self, request):
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        cursor = super().decode_cursor(request)
+        if cursor.position is None:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.next_position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.previous_position)
+        )
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field = order.lstrip('-')
+            if isinstance(instance, dict):
+                value = instance[field]
+            else:
+                value = getattr(instance, field)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(str(value))
+        return POSITION_SEPARATOR.join(values)
+
+    def get_paginated_response(self, data):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_html_context()
+        return super().get_html_context()
+
+
+class TitlePagination(CursorOrLimitOffsetPagination):
+    """Пагинация каталога произведений по первичному ключу (ordering
+    по умолчанию).
+    """
+
+
+class PubDatePagination(CursorOrLimitOffsetPagination):
+    """Пагинация отзывов и комментариев: новые записи первыми.
+    Порядок (-pub_date, -id) совпадает с составными индексами моделей.
+    """
+
+    ordering = ('-pub_date', '-id')
@@ -0,0 +1,195 @@
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: файлы остановленных процессов не складываются.
+    fcntl = None
+
+# Данные, которые каждый процесс копит в памяти и периодически
+# записывает в свой файл в каталоге, общем для всех воркеров (метрики,
+# журнал медленных запросов). Имя файла - <pid>-<токен>.json: токен
+# случайный и меняется после fork, поэтому новый процесс с тем же pid не
+# перезапишет файл остановленного воркера. Чтобы файлы перезапущенных
+# воркеров не копились, читатель складывает файлы остановленных процессов
+# своего хоста в один файл STOPPED_FILE.
+STOPPED_FILE = 'stopped.json'
+LOCK_FILE = 'files.lock'
+HOST = socket.gethostname()
+
+
+class ProcessFileStore:
+    """Основа хранилища процесса. Настройки берутся из словаря
+    settings.<settings_name> (DIRECTORY, FLUSH_INTERVAL); наследник
+    определяет clear() и serialize().
+    """
+
+    settings_name = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def get_setting(self, name):
+        return getattr(settings, self.settings_name)[name]
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.token = secrets.token_hex(8)
+        self.last_flush = time.monotonic()
+        self.clear()
+
+    def clear(self):
+        raise NotImplementedError('.clear() must be overridden')
+
+    def serialize(self):
+        """Данные для записи в файл или None, если писать нечего."""
+        raise NotImplementedError('.serialize() must be overridden')
+
+    def check_fork(self):
+        # После fork потомок получает копию данных родителя: без сброса
+        # они попали бы в сумму дважды.
+        if os.getpid() != self.pid:
+            self.reset()
+
+    def path(self):
+        return (
+            Path(self.get_setting('DIRECTORY'))
+            / f'{self.pid}-{self.token}.json'
+        )
+
+    def flush(self, force=False):
+        """Записывает данные процесса в его файл не чаще FLUSH_INTERVAL
+        секунд.
+        """
+        now = time.monotonic()
+        interval = self.get_setting('FLUSH_INTERVAL')
+        if not force and now - self.last_flush < interval:
+            return
+        with self.lock:
+            self.check_fork()
+            self.last_flush = now
+            data = self.serialize()
+            if data is None:
+                return
+            write_file(self.path(), {
+                'host': HOST, 'pid': self.pid, 'data': data,
+            })
+
+
+def write_file(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + '.tmp')
+    temp_path.write_text(
+        json.dumps(content, ensure_ascii=False), encoding='utf-8'
+    )
+    os.replace(temp_path, path)
+
+
+def load_file(path):
+    """Содержимое файла или None для недописанного и повреждённого."""
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def locked(directory, operation):
+    """Блокировка каталога: общая для чтения, исключительная для
+    складывания файлов. Возвращает, получена ли она.
+    """
+    if fcntl is None:
+        yield False
+        return
+    with open(directory / LOCK_FILE, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, operation)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def fold_stopped(directory, merge):
+    """Складывает файлы остановленных процессов этого хоста в
+    STOPPED_FILE функцией merge(список данных) -> данные. Если pid
+    остановленного процесса уже занят другим, файл сложится позже.
+    Занятый другим читателем каталог пропускается.
+    """
+    if fcntl is None:
+        return
+    stopped_path = directory / STOPPED_FILE
+    with locked(directory, fcntl.LOCK_EX | fcntl.LOCK_NB) as acquired:
+        if not acquired:
+            return
+        stopped = load_file(stopped_path) or {'data': None, 'folded': []}
+        # Файлы, сложенные в прошлый раз, но не удалённые из-за сбоя.
+        for name in stopped['folded']:
+            (directory / name).unlink(missing_ok=True)
+        folded = []
+        datas = [] if stopped['data'] is None else [stopped['data']]
+        for path in directory.glob('*.json'):
+            content = load_file(path)
+            if (
+                content is not None
+                and content.get('host') == HOST
+                and not process_alive(content['pid'])
+            ):
+                folded.append(path)
+                datas.append(content['data'])
+        if not folded:
+            return
+        # Сначала сумма с именами сложенных файлов, затем удаление: при
+        # сбое между ними файлы не попадут в сумму дважды.
+        write_file(stopped_path, {
+            'data': merge(datas), 'folded': [path.name for path in folded],
+        })
+        for path in folded:
+            path.unlink(missing_ok=True)
+
+
+def read_files(directory, merge=None):
+    """Данные из файлов всех процессов, в том числе остановленных.
+    С merge файлы остановленных процессов сначала складываются в один
+    (fold_stopped). Недописанные и повреждённые файлы пропускаются.
+    """
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    if merge is not None:
+        fold_stopped(directory, merge)
+    operation = fcntl.LOCK_SH if fcntl else None
+    with locked(directory, operation):
+        stopped = load_file(directory / STOPPED_FILE) or {}
+        folded = set(stopped.get('folded', ()))
+        datas = []
+        for path in directory.glob('*.json'):
+            if path.name in folded:
+                continue
+            content = load_file(path)
+            if content is not None and content.get('data') is not None:
+                datas.append(content['data'])
+        return datas
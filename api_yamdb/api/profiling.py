@@ -0,0 +1,191 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+
+from .authentication import CachedJWTAuthentication
+
+# Профиль запроса хранится двумя файлами: <id>.pstats для pstats и
+# snakeviz и <id>.json со сводкой - время, SQL-запросы и самые дорогие
+# функции. id - время создания в наносекундах и pid процесса, по нему
+# профили сортируются и вытесняются.
+PROFILE_ID_RE = re.compile(r'^\d+-\d+$')
+TOP_FUNCTIONS = 30
+TOP_QUERIES = 20
+
+
+def get_setting(name):
+    return settings.PROFILING[name]
+
+
+def header_key():
+    return 'HTTP_' + get_setting('HEADER').upper().replace('-', '_')
+
+
+def get_directory():
+    return get_setting('DIRECTORY')
+
+
+def is_profile_id(profile_id):
+    return bool(PROFILE_ID_RE.match(profile_id))
+
+
+def profile_path(profile_id, suffix):
+    return get_directory() / f'{profile_id}.{suffix}'
+
+
+def get_admin(request):
+    """Администратор из JWT запроса или None. Middleware работает до
+    аутентификации DRF, поэтому токен проверяется здесь же.
+    """
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except APIException:
+        return None
+    if result is None:
+        return None
+    user = result[0]
+    return user if user.is_admin or user.is_superuser else None
+
+
+class SQLTimer:
+    """execute_wrapper, записывающий время каждого SQL-запроса."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+
+def top_functions(stats):
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in sorted(
+        stats.stats.items(), key=lambda item: item[1][3], reverse=True
+    )[:TOP_FUNCTIONS]:
+        rows.append({
+            'function': f'{filename}:{line}({name})',
+            'calls': calls,
+            'total_ms': round(total * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        })
+    return rows
+
+
+def build_summary(profile_id, request, response, elapsed, stats, timer,
+                  user):
+    match = request.resolver_match
+    slowest = sorted(timer.queries, key=lambda query: query[1], reverse=True)
+    return {
+        'id': profile_id,
+        'created': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': match._func_path if match else None,
+        'status': response.status_code,
+        'user': user.username,
+        'duration_ms': round(elapsed * 1000, 3),
+        'sql': {
+            'count': len(timer.queries),
+            'total_ms': round(
+                sum(duration for _, duration in timer.queries) * 1000, 3
+            ),
+            'slowest': [
+                {'sql': sql, 'ms': round(duration * 1000, 3)}
+                for sql, duration in slowest[:TOP_QUERIES]
+            ],
+        },
+        'functions': top_functions(stats),
+    }
+
+
+def save_profile(profile, summary):
+    directory = get_directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile.dump_stats(profile_path(summary['id'], 'pstats'))
+    profile_path(summary['id'], 'json').write_text(
+        json.dumps(summary, ensure_ascii=False, indent=2), encoding='utf-8'
+    )
+    trim_profiles()
+
+
+def list_profile_ids():
+    """Идентификаторы сохранённых профилей, новые первыми."""
+    directory = get_directory()
+    if not directory.exists():
+        return []
+    ids = [
+        path.stem for path in directory.glob('*.json')
+        if is_profile_id(path.stem)
+    ]
+    return sorted(ids, key=lambda profile_id: int(profile_id.split('-')[0]),
+                  reverse=True)
+
+
+def trim_profiles():
+    """Удаляет самые старые профили сверх MAX_PROFILES."""
+    for profile_id in list_profile_ids()[get_setting('MAX_PROFILES'):]:
+        for suffix in ('json', 'pstats'):
+            try:
+                os.remove(profile_path(profile_id, suffix))
+            except FileNotFoundError:
+                pass
+
+
+def load_summary(profile_id):
+    if not is_profile_id(profile_id):
+        return None
+    try:
+        return json.loads(
+            profile_path(profile_id, 'json').read_text(encoding='utf-8')
+        )
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос администратора с заголовком settings.PROFILING."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if header_key() not in request.META:
+            return self.get_response(request)
+        user = get_admin(request)
+        if user is None:
+            return self.get_response(request)
+        return self.profile(request, user)
+
+    def profile(self, request, user):
+        profile_id = f'{time.time_ns()}-{os.getpid()}'
+        timer = SQLTimer()
+        profile = cProfile.Profile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            started = time.perf_counter()
+            profile.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+            elapsed = time.perf_counter() - started
+        stats = pstats.Stats(profile)
+        save_profile(profile, build_summary(
+            profile_id, request, response, elapsed, stats, timer, user
+        ))
+        response['X-Profile-Id'] = profile_id
+        return response
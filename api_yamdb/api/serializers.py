@@ -1,19 +1,16 @@
 from datetime import datetime
-from random import randint
-from smtplib import SMTPException
 
-from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
-from rest_framework.exceptions import APIException
-from rest_framework_simplejwt.tokens import AccessToken
 
+from . import codes, outbox
+from .authentication import RoleAccessToken
+from .list_serializers import CompiledListSerializer
 from reviews.models import Category, Comments, Genre, Review, Title, User
 
 
 EMAIL_SUBJECT = 'Код подтверждения'
 EMAIL_SOURCE = 'from yamdb@mail.com'
-EMAIL_ERROR = 'Произошла следующая ошибка при попытке отправки письма:\n'
 
 
 class ValidateUsernameMixin:
@@ -27,6 +24,19 @@ class ValidateUsernameMixin:
         return value
 
 
+class SparseFieldsMixin:
+    """Оставляет только поля из context['requested_fields'], если они заданы.
+    Вложенные сериализаторы не затрагиваются.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('requested_fields')
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
 class BaseUserSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -44,43 +54,48 @@ class SignUpSerializer(ValidateUsernameMixin, serializers.ModelSerializer):
         read_only_fields = ('password',)
 
     def create(self, validated_data):
-        """Метод create создаёт нового пользователя."""
-        username = validated_data.get('username')
-        email = validated_data.get('email')
-        user, _ = User.objects.get_or_create(
-            username=username,
-            email=email,
+        """Метод create создаёт нового пользователя одним INSERT."""
+        user = User(
+            username=validated_data.get('username'),
+            email=validated_data.get('email'),
         )
-        confirmation_code = self.send_code(email)
-        user.confirmation_code = confirmation_code
         user.set_unusable_password()
-        user.save()
+        if codes.is_stateless():
+            # HMAC-код вычисляется от id, который появится после вставки.
+            user.save()
+            self.send_code(user)
+        else:
+            user.confirmation_code = self.send_code(user)
+            user.save()
         return user
 
     def update(self, instance, validated_data):
-        """Метод .update() создаёт пользователю новый код."""
-        confirmation_code = self.send_code(validated_data.get('email'))
-        instance.confirmation_code = confirmation_code
-        instance.save()
+        """Метод .update() создаёт пользователю новый код. В режиме HMAC
+        код не хранится, и строка пользователя не меняется.
+        """
+        confirmation_code = self.send_code(instance)
+        if not codes.is_stateless():
+            instance.confirmation_code = confirmation_code
+            instance.save()
         return instance
 
-    def send_code(self, recipient_email):
+    def send_code(self, user):
         """Отвечает за создание кода подтверждения и отправку писем.
-        Функция randint создаёт 6-значный код.
-        Отправка письма осуществляется на почту, которую указал пользователь
+        Код создаёт модуль codes: 6-значный случайный или HMAC-код.
+        Письмо на почту, которую указал пользователь, ставится в очередь
+        и отправляется командой sendemails.
         """
-        confirmation_code = randint(100000, 999999)
-        message = f'Код для получения токена - {confirmation_code}'
-        try:
-            send_mail(
-                EMAIL_SUBJECT,
-                message,
-                EMAIL_SOURCE,
-                (recipient_email,),
-                fail_silently=True
-            )
-        except SMTPException as error:
-            raise APIException(EMAIL_ERROR + error)
+        confirmation_code = codes.make_code(user)
+        message = (
+            'Код для получения токена - '
+            f'{codes.format_code(confirmation_code)}'
+        )
+        outbox.enqueue(
+            EMAIL_SUBJECT,
+            message,
+            EMAIL_SOURCE,
+            user.email
+        )
         return confirmation_code
 
 
@@ -91,9 +106,10 @@ class GetTokenSerializer(serializers.Serializer):
 
     def validate(self, data):
         user = get_object_or_404(User, username=data['username'])
-        if data['confirmation_code'] != user.confirmation_code:
+        if not codes.check_code(user, data['confirmation_code']):
             raise serializers.ValidationError('Неверный код подтверждения')
-        data['token'] = str(AccessToken.for_user(user))
+        codes.consume(user)
+        data['token'] = str(RoleAccessToken.for_user(user))
         return data
 
 
@@ -161,7 +177,7 @@ class TitleSerializer(serializers.ModelSerializer):
         return value
 
 
-class TitleReadSerializer(serializers.ModelSerializer):
+class TitleReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     rating = serializers.IntegerField(read_only=True, default=None)
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(read_only=True, many=True)
@@ -171,9 +187,11 @@ class TitleReadSerializer(serializers.ModelSerializer):
             'id', 'name', 'year', 'rating', 'description', 'genre', 'category'
         )
         model = Title
+        list_serializer_class = CompiledListSerializer
 
 
-class AuthorForReviewAndCommentSerializer(serializers.ModelSerializer):
+class AuthorForReviewAndCommentSerializer(SparseFieldsMixin,
+                                          serializers.ModelSerializer):
     """Миксин для переопределения поля автора."""
 
     author = serializers.SlugRelatedField(
@@ -190,6 +208,7 @@ class CommentSerializer(AuthorForReviewAndCommentSerializer):
 
         model = Comments
         fields = ('id', 'text', 'author', 'pub_date')
+        list_serializer_class = CompiledListSerializer
 
     def validate(self, data):
         """Валидация."""
@@ -209,6 +228,7 @@ class ReviewSerializer(AuthorForReviewAndCommentSerializer):
 
         model = Review
         fields = ('id', 'text', 'author', 'score', 'pub_date')
+        list_serializer_class = CompiledListSerializer
 
     def validate(self, data):
         author = self.context['request'].user
@@ -0,0 +1,91 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save)
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .cache import bump_versions
+from reviews.models import (Category, Comments, Genre, GenreTitle, Review,
+                            Title, User)
+
+
+def invalidate_title(title_id):
+    bump_versions('titles:list', f'title:{title_id}')
+
+
+@receiver((post_save, post_delete), sender=Title)
+def title_changed(sender, instance, **kwargs):
+    invalidate_title(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Review)
+def review_changed(sender, instance, **kwargs):
+    # Отзыв меняет ещё и рейтинг произведения.
+    invalidate_title(instance.title_id)
+    bump_versions(f'reviews:{instance.title_id}')
+
+
+@receiver((post_save, post_delete), sender=GenreTitle)
+def title_genre_changed(sender, instance, **kwargs):
+    invalidate_title(instance.title_id)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_title(instance.pk)
+    else:
+        # Изменения со стороны жанра затрагивают несколько произведений.
+        bump_versions('titles')
+
+
+@receiver((post_save, post_delete), sender=Genre)
+def genre_changed(sender, **kwargs):
+    bump_versions('genres', 'titles')
+
+
+@receiver((post_save, post_delete), sender=Category)
+def category_changed(sender, **kwargs):
+    bump_versions('categories', 'titles')
+
+
+@receiver((post_save, post_delete), sender=Comments)
+def comment_changed(sender, instance, **kwargs):
+    bump_versions(f'comments:{instance.review_id}')
+
+
+def get_access(instance):
+    """Поля, от которых зависят права пользователя."""
+    return instance.__dict__.get('role'), instance.__dict__.get('is_active')
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    instance._saved_username = instance.__dict__.get('username')
+    instance._saved_access = get_access(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # Имя автора выводится в отзывах и комментариях. Остальные изменения
+    # пользователя (например, новый код подтверждения) их не затрагивают.
+    if not created and instance.username != instance._saved_username:
+        bump_versions('users')
+    # Смена роли или блокировка должны действовать сразу, а не после
+    # истечения записи в кеше аутентификации.
+    if not created and get_access(instance) != instance._saved_access:
+        user_cache.invalidate(instance.pk)
+    instance._saved_username = instance.username
+    instance._saved_access = get_access(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+
+
+def invalidate_catalog(sender, **kwargs):
+    # migrate и flush меняют данные в обход сигналов моделей.
+    bump_versions('titles', 'titles:list', 'genres', 'categories', 'users')
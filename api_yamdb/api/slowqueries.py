@@ -0,0 +1,239 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from . import processfiles
+from .metrics import UNMATCHED_VIEW, view_label
+from .nplusone import fingerprint
+
+# Журнал медленных SQL-запросов. Каждый запрос к базе во время запроса к
+# API замеряется; запросы дольше THRESHOLD_MS группируются по форме
+# (nplusone.fingerprint) и хранятся с общим временем, числом и самыми
+# долгими примерами: параметры, view и план выполнения. Как и метрики,
+# процесс пишет журнал в свой файл в DIRECTORY (api/processfiles.py),
+# команда slowqueries складывает файлы всех процессов.
+EXPLAIN_PREFIXES = ('SELECT', 'WITH')
+
+
+def get_setting(name):
+    return settings.SLOW_QUERIES[name]
+
+
+def plain_params(params):
+    """Параметры запроса в виде, который можно записать в JSON."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: plain_value(value) for name, value in params.items()}
+    return [plain_value(value) for value in params]
+
+
+def plain_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def explain_sql(connection):
+    if connection.vendor == 'sqlite':
+        return 'EXPLAIN QUERY PLAN '
+    return 'EXPLAIN '
+
+
+def explain(connection, sql, params):
+    """План выполнения запроса строками или None, если план получить
+    нельзя. Запрос при этом не выполняется. Нужен отдельный курсор: у
+    исходного ещё не прочитан результат. Внутри транзакции ошибка EXPLAIN
+    откатывается до точки сохранения и не ломает транзакцию запроса.
+    """
+    try:
+        with ExitStack() as stack:
+            if connection.in_atomic_block:
+                stack.enter_context(
+                    transaction.atomic(using=connection.alias)
+                )
+            cursor = stack.enter_context(connection.cursor())
+            cursor.execute(explain_sql(connection) + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    # В SQLite последняя колонка - описание шага, в PostgreSQL колонка
+    # одна.
+    return [str(row[-1]) for row in rows]
+
+
+def trim_entries(entries):
+    """Оставляет MAX_QUERIES форм с наибольшим общим временем."""
+    while len(entries) > get_setting('MAX_QUERIES'):
+        del entries[min(entries, key=lambda key: entries[key]['total_ms'])]
+
+
+def merge_entry(entries, key, entry):
+    """Добавляет группу запросов в entries, оставляя MAX_SAMPLES самых
+    долгих примеров.
+    """
+    current = entries.get(key)
+    if current is None:
+        current = entries[key] = {
+            'sql': entry['sql'], 'count': 0, 'total_ms': 0.0,
+            'max_ms': 0.0, 'samples': [],
+        }
+    current['count'] += entry['count']
+    current['total_ms'] += entry['total_ms']
+    current['max_ms'] = max(current['max_ms'], entry['max_ms'])
+    current['samples'] = sorted(
+        current['samples'] + entry['samples'],
+        key=lambda sample: sample['ms'], reverse=True
+    )[:get_setting('MAX_SAMPLES')]
+
+
+class SlowQueryLog(processfiles.ProcessFileStore):
+    """Медленные запросы текущего процесса по формам. Хранится не больше
+    MAX_QUERIES форм: при переполнении вытесняется форма с наименьшим
+    общим временем.
+    """
+
+    settings_name = 'SLOW_QUERIES'
+
+    def clear(self):
+        self.entries = {}
+
+    def add(self, sql, duration_ms, sample):
+        with self.lock:
+            self.check_fork()
+            merge_entry(self.entries, fingerprint(sql), {
+                'sql': sql, 'count': 1, 'total_ms': duration_ms,
+                'max_ms': duration_ms, 'samples': [sample],
+            })
+            trim_entries(self.entries)
+
+    def needs_plan(self, sql, duration_ms):
+        """План нужен, только если пример попадёт в самые долгие."""
+        entry = self.entries.get(fingerprint(sql))
+        return (
+            entry is None
+            or len(entry['samples']) < get_setting('MAX_SAMPLES')
+            or duration_ms > entry['samples'][-1]['ms']
+        )
+
+    def serialize(self):
+        return self.entries or None
+
+
+log = SlowQueryLog()
+
+
+class QueryTimer:
+    """execute_wrapper, записывающий в журнал запросы дольше порога."""
+
+    def __init__(self, connection, view=UNMATCHED_VIEW):
+        self.connection = connection
+        self.view = view
+        self.threshold = get_setting('THRESHOLD_MS')
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if duration_ms >= self.threshold:
+                self.record(sql, params, many, duration_ms)
+
+    def record(self, sql, params, many, duration_ms):
+        plan = None
+        if (
+            not many
+            and sql.lstrip().upper().startswith(EXPLAIN_PREFIXES)
+            and log.needs_plan(sql, duration_ms)
+        ):
+            self.explaining = True
+            try:
+                plan = explain(self.connection, sql, params)
+            finally:
+                self.explaining = False
+        log.add(sql, duration_ms, {
+            'ms': round(duration_ms, 3),
+            'params': None if many else plain_params(params),
+            'view': self.view,
+            'plan': plan,
+        })
+
+
+@contextmanager
+def capture_slow_queries(view=UNMATCHED_VIEW):
+    """Записывает медленные запросы ко всем базам внутри блока."""
+    timers = []
+    with ExitStack() as stack:
+        for connection in connections.all():
+            timer = QueryTimer(connection, view)
+            timers.append(timer)
+            stack.enter_context(connection.execute_wrapper(timer))
+        yield timers
+    log.flush()
+
+
+def merge_files(datas):
+    """Журналы нескольких процессов, сложенные по формам запросов."""
+    entries = {}
+    for data in datas:
+        for key, entry in data.items():
+            merge_entry(entries, key, entry)
+    return entries
+
+
+def merge_stopped(datas):
+    # Сумма журналов остановленных процессов ограничена, как журнал
+    # одного процесса.
+    entries = merge_files(datas)
+    trim_entries(entries)
+    return entries
+
+
+def read_files():
+    """Журналы всех процессов, сложенные по формам запросов."""
+    return merge_files(processfiles.read_files(
+        get_setting('DIRECTORY'), merge_stopped
+    ))
+
+
+def top_offenders(limit=None):
+    """Формы запросов по убыванию общего времени."""
+    log.flush(force=True)
+    entries = sorted(
+        read_files().values(), key=lambda entry: entry['total_ms'],
+        reverse=True
+    )
+    return entries[:limit]
+
+
+def clear():
+    log.reset()
+    directory = get_setting('DIRECTORY')
+    if directory.exists():
+        for path in directory.glob('*.json'):
+            path.unlink()
+
+
+class SlowQueryMiddleware:
+    """Журнал медленных SQL-запросов с разбивкой по view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_setting('ENABLED'):
+            return self.get_response(request)
+        with capture_slow_queries() as timers:
+            request.slow_query_timers = timers
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = view_label(view_func, request)
+        for timer in getattr(request, 'slow_query_timers', ()):
+            timer.view = view
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+# Ограничение частоты запросов к signup и получению токена корзинами
+# токенов. Корзина вмещает capacity токенов и получает новый токен раз в
+# interval секунд; каждый запрос забирает один токен, пустая корзина
+# означает ответ 429 с заголовком Retry-After. Корзины хранятся в
+# отдельном файле SQLite, общем для всех процессов, и обновляются одной
+# командой INSERT ... ON CONFLICT DO UPDATE, так что два воркера не могут
+# забрать один токен. База приложения не используется: отклонённый запрос
+# не делает ни одного запроса через ORM.
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS bucket ('
+    'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+)
+TAKE_SQL = '''
+    INSERT INTO bucket (key, tokens, updated)
+    VALUES (:key, :capacity - 1, :now)
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = MIN(
+            :capacity, tokens + MAX(:now - updated, 0) / :interval
+        ) - 1,
+        updated = :now
+    WHERE MIN(:capacity, tokens + MAX(:now - updated, 0) / :interval) >= 1
+    RETURNING tokens
+'''
+STATE_SQL = 'SELECT tokens, updated FROM bucket WHERE key = :key'
+PURGE_SQL = 'DELETE FROM bucket WHERE updated < :before'
+CLEAR_SQL = 'DELETE FROM bucket'
+# Сколько секунд ждать блокировку файла другим процессом.
+LOCK_TIMEOUT = 5
+# Раз в PURGE_EVERY запросов процесс удаляет полные корзины: отсутствующая
+# корзина равносильна полной.
+PURGE_EVERY = 1000
+
+
+def get_setting(name):
+    return settings.THROTTLE[name]
+
+
+def bucket_key(scope, value):
+    return f'{scope}:{hashlib.md5(value.encode()).hexdigest()}'
+
+
+class BucketStore:
+    """Корзины токенов в файле SQLite. Соединение своё у каждого потока
+    и создаётся заново после fork.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.calls = 0
+
+    def connect(self):
+        path = Path(get_setting('DATABASE'))
+        local = self.local
+        if (
+            getattr(local, 'pid', None) != os.getpid()
+            or local.path != path
+        ):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                path, timeout=LOCK_TIMEOUT, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(SCHEMA)
+            local.connection, local.pid, local.path = (
+                connection, os.getpid(), path
+            )
+        return local.connection
+
+    def take(self, key, capacity, interval):
+        """Забирает токен из корзины. Возвращает 0, если токен был, иначе
+        сколько секунд ждать следующего.
+        """
+        now = time.time()
+        connection = self.connect()
+        taken = connection.execute(TAKE_SQL, {
+            'key': key, 'capacity': capacity, 'interval': interval,
+            'now': now,
+        }).fetchall()
+        self.purge(connection, now)
+        if taken:
+            return 0
+        tokens, updated = connection.execute(
+            STATE_SQL, {'key': key}
+        ).fetchone()
+        available = min(capacity, tokens + max(now - updated, 0) / interval)
+        return (1 - available) * interval
+
+    def purge(self, connection, now):
+        self.calls += 1
+        if self.calls % PURGE_EVERY:
+            return
+        longest = max(
+            capacity * interval
+            for capacity, interval in get_setting('RATES').values()
+        )
+        connection.execute(PURGE_SQL, {'before': now - longest})
+
+    def clear(self):
+        self.connect().execute(CLEAR_SQL)
+
+
+store = BucketStore()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Корзина токенов для области view.throttle_scope. Ёмкость и скорость
+    берутся из THROTTLE['RATES'] по ключу '<область>_<kind>'; без такого
+    ключа запросы не ограничиваются.
+    """
+
+    kind = None
+
+    def get_value(self, request):
+        raise NotImplementedError('.get_value() must be overridden')
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+        scope = f'{getattr(view, "throttle_scope", None)}_{self.kind}'
+        rate = get_setting('RATES').get(scope)
+        if not get_setting('ENABLED') or rate is None:
+            return True
+        value = self.get_value(request)
+        if not value:
+            return True
+        self.wait_time = store.take(bucket_key(scope, value), *rate)
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Корзина на IP-адрес клиента (с учётом NUM_PROXIES)."""
+
+    kind = 'ip'
+
+    def get_value(self, request):
+        return self.get_ident(request)
+
+
+class FieldThrottle(TokenBucketThrottle):
+    """Корзина на значение поля запроса без учёта регистра."""
+
+    field = None
+
+    def get_value(self, request):
+        if not isinstance(request.data, dict):
+            return None
+        value = request.data.get(self.field)
+        if isinstance(value, str):
+            return value.strip().lower()
+        return None
+
+
+class UsernameThrottle(FieldThrottle):
+    kind = field = 'username'
+
+
+class EmailThrottle(FieldThrottle):
+    kind = field = 'email'
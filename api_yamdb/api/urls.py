@@ -30,4 +30,24 @@ urlpatterns = [
     })),
     path(f'{api_ver}/', include(router.urls)),
     path(f'{api_ver}/auth/token/', views.GetTokenView.as_view()),
+    path(
+        f'{api_ver}/export/<str:resource>/',
+        views.ExportView.as_view(),
+        name='export'
+    ),
+    path(
+        f'{api_ver}/profiles/',
+        views.ProfileListView.as_view(),
+        name='profiles'
+    ),
+    path(
+        f'{api_ver}/profiles/<str:profile_id>/',
+        views.ProfileDetailView.as_view(),
+        name='profile'
+    ),
+    path(
+        f'{api_ver}/profiles/<str:profile_id>/pstats/',
+        views.ProfileDownloadView.as_view(),
+        name='profile-pstats'
+    ),
 ]
@@ -1,8 +1,11 @@
-from django.db.models import Avg
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseForbidden, StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, status, viewsets
-from rest_framework.filters import SearchFilter
+from rest_framework import status, viewsets
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.mixins import (CreateModelMixin,
                                    RetrieveModelMixin,
                                    UpdateModelMixin)
@@ -10,12 +13,16 @@ from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from . import permisions, serializers
-from .filters import TitleFilter
-from .mixin import CreateListDestroyMixin
+from . import export, metrics, permisions, profiling, serializers
+from .filters import NormalizedSearchFilter, ReviewFilter, TitleFilter
+from .mixin import (CreateListDestroyMixin, SparseFieldsetMixin,
+                    VersionedListMixin, VersionedRetrieveMixin)
+from .pagination import PubDatePagination, TitlePagination
+from .throttling import EmailThrottle, IPThrottle, UsernameThrottle
 from reviews.models import Category, Genre, Title, User
 
 
@@ -25,6 +32,8 @@ class SignUpViewSet(CreateModelMixin, GenericViewSet):
     queryset = User.objects.all()
     serializer_class = serializers.SignUpSerializer
     permission_classes = (AllowAny,)
+    throttle_classes = (IPThrottle, UsernameThrottle, EmailThrottle)
+    throttle_scope = 'signup'
 
     def create(self, request, *args, **kwargs):
         """
@@ -33,7 +42,8 @@ class SignUpViewSet(CreateModelMixin, GenericViewSet):
         В случае, если пользователя с заданными username и email
         не существует, то происходит его создание.
         В случае, если пользователь с заданными username и email
-        существует, то сериализатор обновляет его confirmation_code.
+        существует, то сериализатор отправляет ему новый код (в режиме
+        'stored' - обновляет его confirmation_code).
         """
         try:
             user = User.objects.get(
@@ -57,6 +67,8 @@ class GetTokenView(TokenObtainPairView):
 
     serializer_class = serializers.GetTokenSerializer
     permission_classes = (AllowAny,)
+    throttle_classes = (IPThrottle, UsernameThrottle)
+    throttle_scope = 'token'
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -78,8 +90,8 @@ class AdminViewSet(ModelViewSet):
     serializer_class = serializers.AdminUsersSerializer
     permission_classes = (permisions.AdminOnly,)
     pagination_class = LimitOffsetPagination
-    filter_backends = (SearchFilter,)
-    search_fields = ('username',)
+    filter_backends = (NormalizedSearchFilter,)
+    search_fields = ('username_normalized',)
     http_method_names = ('get', 'post', 'patch', 'delete', 'head')
     lookup_field = 'username'
 
@@ -98,20 +110,35 @@ class UserViewSet(RetrieveModelMixin, UpdateModelMixin, GenericViewSet):
     pagination_class = LimitOffsetPagination
 
     def get_queryset(self):
-        return self.request.user
+        return User.objects.filter(pk=self.request.user.pk)
 
     def get_object(self):
-        return self.request.user
+        # request.user из кеша аутентификации содержит не все поля.
+        return self.get_queryset().get()
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.select_related('category').prefetch_related(
-        'genre').annotate(rating=Avg('reviews__score'))
+class TitleViewSet(VersionedListMixin, VersionedRetrieveMixin,
+                   SparseFieldsetMixin, viewsets.ModelViewSet):
+    queryset = Title.objects.all()
     permission_classes = (permisions.AdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
-    pagination_class = LimitOffsetPagination
+    pagination_class = TitlePagination
     http_method_names = ('get', 'post', 'patch', 'delete', 'head')
+    resource_versions = {
+        'list': ('titles', 'titles:list'),
+        'retrieve': ('titles', 'title:{pk}'),
+    }
+    cache_responses = True
+    deferrable_fields = ('description',)
+
+    def get_queryset(self):
+        queryset = Title.objects.all()
+        if self.field_requested('category'):
+            queryset = queryset.select_related('category')
+        if self.field_requested('genre'):
+            queryset = queryset.prefetch_related('genre')
+        return self.sparse_queryset(queryset)
 
     def get_serializer_class(self):
         if self.action == 'list' or self.action == 'retrieve':
@@ -120,53 +147,73 @@ class TitleViewSet(viewsets.ModelViewSet):
 
 
 class BaseForGenreAndCategoryViewSet(
-    CreateListDestroyMixin, viewsets.GenericViewSet
+    VersionedListMixin, CreateListDestroyMixin, viewsets.GenericViewSet
 ):
     permission_classes = (permisions.AdminOrReadOnly,)
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('name',)
+    filter_backends = (NormalizedSearchFilter,)
+    search_fields = ('name_normalized',)
     pagination_class = LimitOffsetPagination
     lookup_field = 'slug'
+    cache_responses = True
 
 
 class GenreViewSet(BaseForGenreAndCategoryViewSet):
     queryset = Genre.objects.all()
     serializer_class = serializers.GenreSerializer
+    resource_versions = {'list': ('genres',)}
 
 
 class CategoryViewSet(BaseForGenreAndCategoryViewSet):
     queryset = Category.objects.all()
     serializer_class = serializers.CategorySerializer
+    resource_versions = {'list': ('categories',)}
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(VersionedListMixin, VersionedRetrieveMixin,
+                    SparseFieldsetMixin, viewsets.ModelViewSet):
     """Класс обработки отзывов."""
 
     serializer_class = serializers.ReviewSerializer
     pk_url_kwarg = 'review_id'
     permission_classes = (permisions.UserStaffOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = ReviewFilter
+    pagination_class = PubDatePagination
     http_method_names = ('get', 'post', 'patch', 'delete', 'head')
+    resource_versions = {
+        'list': ('users', 'title:{title_id}', 'reviews:{title_id}'),
+        'retrieve': ('users', 'title:{title_id}', 'reviews:{title_id}'),
+    }
+    deferrable_fields = ('text',)
 
     def get_title(self):
         """Забираю необходимое произведение."""
         return get_object_or_404(Title, pk=self.kwargs['title_id'])
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        queryset = self.get_title().reviews.all()
+        if self.field_requested('author'):
+            queryset = queryset.select_related('author')
+        return self.sparse_queryset(queryset)
 
     def perform_create(self, serializer):
         serializer.save(title=self.get_title(), author=self.request.user)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(VersionedListMixin, VersionedRetrieveMixin,
+                     SparseFieldsetMixin, viewsets.ModelViewSet):
     """Класс обработки комментариев."""
 
     serializer_class = serializers.CommentSerializer
     permission_classes = (permisions.UserStaffOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = PubDatePagination
     pk_url_kwarg = 'comment_id'
     http_method_names = ('get', 'post', 'patch', 'delete', 'head')
+    resource_versions = {
+        'list': ('users', 'reviews:{title_id}', 'comments:{review_id}'),
+        'retrieve': ('users', 'reviews:{title_id}', 'comments:{review_id}'),
+    }
+    deferrable_fields = ('text',)
 
     def get_review(self):
         # Забираю отзыв.
@@ -174,7 +221,115 @@ class CommentViewSet(viewsets.ModelViewSet):
         return get_object_or_404(title.reviews, pk=self.kwargs['review_id'])
 
     def get_queryset(self):
-        return self.get_review().comments.select_related('author')
+        queryset = self.get_review().comments.all()
+        if self.field_requested('author'):
+            queryset = queryset.select_related('author')
+        return self.sparse_queryset(queryset)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user, review=self.get_review())
+
+
+class ExportView(APIView):
+    """Потоковая выгрузка titles, reviews и comments в формате NDJSON.
+    Параметр since (ISO 8601) оставляет записи, опубликованные не раньше
+    указанного момента. При Accept-Encoding: gzip поток сжимается на лету.
+    """
+
+    permission_classes = (permisions.AdminOnly,)
+
+    def get(self, request, resource):
+        if resource not in export.EXPORTS:
+            raise NotFound(f'Неизвестный ресурс {resource}')
+        since = self.get_since(request, resource)
+        stream = export.export_lines(resource, since)
+        gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if gzip:
+            stream = export.gzip_stream(stream)
+        response = StreamingHttpResponse(
+            stream, content_type='application/x-ndjson; charset=utf-8'
+        )
+        response['Vary'] = 'Accept-Encoding'
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        return response
+
+    def get_since(self, request, resource):
+        value = request.query_params.get('since')
+        if not value:
+            return None
+        if export.EXPORTS[resource]['since_field'] is None:
+            raise ValidationError(
+                {'since': f'Фильтр недоступен для ресурса {resource}'}
+            )
+        try:
+            since = parse_datetime(value)
+        except ValueError:
+            # Формат верный, но такой даты нет: 2024-13-40T00:00.
+            since = None
+        if since is None:
+            raise ValidationError(
+                {'since': 'Ожидается дата и время в формате ISO 8601'}
+            )
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+
+class ProfileListView(APIView):
+    """Список сохранённых профилей запросов, новые первыми."""
+
+    permission_classes = (permisions.AdminOnly,)
+
+    def get(self, request):
+        summaries = (
+            profiling.load_summary(profile_id)
+            for profile_id in profiling.list_profile_ids()
+        )
+        return Response([
+            {
+                key: summary[key] for key in (
+                    'id', 'created', 'method', 'path', 'status',
+                    'duration_ms'
+                )
+            }
+            for summary in summaries if summary is not None
+        ])
+
+
+class ProfileDetailView(APIView):
+    """Сводка профиля: время, SQL-запросы и самые дорогие функции."""
+
+    permission_classes = (permisions.AdminOnly,)
+
+    def get(self, request, profile_id):
+        summary = profiling.load_summary(profile_id)
+        if summary is None:
+            raise NotFound(f'Профиль {profile_id} не найден')
+        return Response(summary)
+
+
+class ProfileDownloadView(APIView):
+    """Файл pstats профиля для pstats, snakeviz и подобных инструментов."""
+
+    permission_classes = (permisions.AdminOnly,)
+
+    def get(self, request, profile_id):
+        path = profiling.profile_path(profile_id, 'pstats')
+        if not profiling.is_profile_id(profile_id) or not path.exists():
+            raise NotFound(f'Профиль {profile_id} не найден')
+        return FileResponse(
+            open(path, 'rb'), as_attachment=True, filename=path.name,
+            content_type='application/octet-stream'
+        )
+
+
+def metrics_view(request):
+    """Метрики всех воркеров в текстовом формате Prometheus. Без
+    настроенного токена эндпоинт закрыт (404), с чужим токеном - 403.
+    """
+    if not metrics.get_setting('TOKEN'):
+        raise Http404
+    if not metrics.is_authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.collect(), content_type=metrics.CONTENT_TYPE)
@@ -23,11 +23,14 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'django_filters',
-    'api',
+    # reviews идёт раньше api: сигналы пересчёта рейтинга должны
+    # срабатывать до сигналов сброса кеша ответов.
     'reviews',
+    'api',
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -35,6 +38,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'api.slowqueries.SlowQueryMiddleware',
+    'api.nplusone.NPlusOneMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -69,6 +75,139 @@ DATABASES = {
 }
 
 
+# Cache
+# Кеш общий для всех воркеров сервера: версии данных для ETag, ответы
+# каталога и блокировки их построения (api/cache.py) должны быть видны
+# каждому процессу, поэтому кеш в памяти процесса не подходит. Если
+# воркеры работают на нескольких серверах, нужен сетевой кеш (memcached,
+# redis) с тем же LOCATION у всех.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# Кеш ответов каталога (api/cache.py). TIMEOUT - сколько ответ считается
+# свежим, STALE_TIMEOUT - сколько устаревший ответ может отдаваться, пока
+# воркер строит новый, LOCK_WAIT - сколько ждать чужого построения ответа.
+CATALOG_CACHE = {
+    'TIMEOUT': 60,
+    'STALE_TIMEOUT': 600,
+    'LOCK_TIMEOUT': 10,
+    'LOCK_WAIT': 2,
+}
+
+# Поиск N+1 запросов (api/nplusone.py). MODE: 'off', 'log' - проверка доли
+# SAMPLE_RATE запросов с записью находок в лог, 'strict' - исключение на
+# каждой находке (для тестов). THRESHOLD - сколько запросов одной формы из
+# одного места считаются циклом.
+N_PLUS_ONE = {
+    'MODE': 'off',
+    'THRESHOLD': 3,
+    'SAMPLE_RATE': 0.01,
+}
+
+# Профилирование запросов по заголовку (api/profiling.py). Запрос
+# администратора с заголовком HEADER выполняется под cProfile, результат
+# сохраняется в DIRECTORY; хранятся последние MAX_PROFILES профилей.
+PROFILING = {
+    'HEADER': 'X-Profile',
+    'DIRECTORY': BASE_DIR / 'profiles',
+    'MAX_PROFILES': 50,
+}
+
+# Метрики Prometheus (api/metrics.py), эндпоинт /metrics. Все воркеры
+# должны видеть один каталог DIRECTORY; процесс записывает свои значения
+# не чаще FLUSH_INTERVAL секунд. BUCKETS - границы гистограммы времени
+# ответа в секундах. /metrics отвечает только на запросы с заголовком
+# "Authorization: Bearer <TOKEN>" (bearer_token в настройках Prometheus);
+# без TOKEN эндпоинт закрыт.
+METRICS = {
+    'ENABLED': True,
+    'DIRECTORY': BASE_DIR / 'metrics',
+    'FLUSH_INTERVAL': 1.0,
+    'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'TOKEN': None,
+}
+
+# Журнал медленных SQL-запросов (api/slowqueries.py, команда slowqueries).
+# Запросы дольше THRESHOLD_MS миллисекунд сохраняются с планом
+# выполнения: не больше MAX_QUERIES форм запросов и MAX_SAMPLES самых
+# долгих примеров каждой формы на процесс.
+SLOW_QUERIES = {
+    'ENABLED': True,
+    'THRESHOLD_MS': 100,
+    'DIRECTORY': BASE_DIR / 'slow_queries',
+    'MAX_QUERIES': 200,
+    'MAX_SAMPLES': 5,
+    'FLUSH_INTERVAL': 1.0,
+}
+
+# Кеш пользователей для аутентификации по JWT (api/authentication.py):
+# не больше MAX_SIZE записей на процесс, каждая живёт TTL секунд. Смена
+# роли, блокировка и удаление пользователя сбрасывают запись сразу.
+AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+}
+
+# Режим пользователя из токена: при ENABLED права проверяются по роли и
+# флагам из подписанных полей токена, без базы и кеша. REVALIDATE -
+# когда роль всё же сверяется с базой: 'never' - до истечения токена,
+# 'writes' - для изменяющих запросов. MAX_AGE - сколько секунд после
+# выдачи токена поля считаются актуальными (None - без ограничения).
+TOKEN_USER = {
+    'ENABLED': False,
+    'REVALIDATE': 'writes',
+    'MAX_AGE': None,
+}
+
+# Очередь писем (api/outbox.py, команда sendemails). Письма отправляются
+# пачками по BATCH_SIZE; после ошибки следующая попытка откладывается на
+# RETRY_DELAY секунд с удвоением до MAX_RETRY_DELAY, после MAX_ATTEMPTS
+# попыток письмо считается неотправленным. LEASE - на сколько секунд
+# воркер забирает письмо (должно быть больше таймаута SMTP),
+# POLL_INTERVAL - пауза при пустой очереди, RETENTION - сколько секунд
+# хранятся отправленные и неотправленные письма.
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30,
+    'MAX_RETRY_DELAY': 3600,
+    'LEASE': 300,
+    'POLL_INTERVAL': 5,
+    'RETENTION': 7 * 24 * 3600,
+}
+
+# Коды подтверждения: 'stored' - случайный код в строке пользователя,
+# 'hmac' - код вычисляется из данных пользователя и окна времени
+# длиной WINDOW секунд и ничего не пишет в базу при повторном signup.
+CONFIRMATION_CODES = {
+    'MODE': 'stored',
+    'WINDOW': 900,
+}
+
+# Ограничение частоты signup и получения токена (api/throttling.py).
+# Корзины токенов хранятся в файле SQLite DATABASE, общем для всех
+# воркеров. RATES: '<область>_<ip|username|email>' -> (ёмкость корзины,
+# секунд на восстановление одного токена).
+THROTTLE = {
+    'ENABLED': True,
+    'DATABASE': BASE_DIR / 'throttle.sqlite3',
+    'RATES': {
+        'signup_ip': (20, 6),
+        'signup_username': (5, 60),
+        'signup_email': (5, 60),
+        'token_ip': (30, 2),
+        'token_username': (10, 30),
+    },
+}
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -114,10 +253,15 @@ EMAIL_FILE_PATH = 'emails/'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+    # Число доверенных прокси перед приложением. IP клиента для
+    # ограничения частоты берётся из X-Forwarded-For, только если прокси
+    # настроены; при 0 - из REMOTE_ADDR, и поддельный заголовок не
+    # создаёт новую корзину.
+    'NUM_PROXIES': 0,
 }
 
 SIMPLE_JWT = {
@@ -133,10 +277,15 @@ EMAIL_FILE_PATH = 'emails/'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+    # Число доверенных прокси перед приложением. IP клиента для
+    # ограничения частоты берётся из X-Forwarded-For, только если прокси
+    # настроены; при 0 - из REMOTE_ADDR, и поддельный заголовок не
+    # создаёт новую корзину.
+    'NUM_PROXIES': 0,
 }
 
 SIMPLE_JWT = {
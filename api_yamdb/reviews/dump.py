@@ -0,0 +1,135 @@
+import csv
+import gzip
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.db import connections, transaction
+from django.db.models import Q
+
+from .loader import MODELS_FILES, PROGRESS_INTERVAL, load_order
+from .models import Comments, Review, Title, User
+
+DUMP_CHUNK_SIZE = 2000
+# Поля, которые loadcsv вычисляет сам: рейтинг пересчитывается после
+# загрузки, поисковые копии строятся из исходных полей.
+DERIVED_FIELDS = {
+    Title: ('rating', 'reviews_count', 'score_sum'),
+}
+
+
+def since_filter(model, since):
+    """Условие отбора по --since; таблицы без условия выгружаются
+    целиком. Кроме новых записей в выгрузку попадают отзывы, к которым
+    есть новые комментарии, и авторы всех выгруженных отзывов и
+    комментариев: без них loadcsv не загрузит выгрузку в пустую базу.
+    """
+    comments = Comments.objects.filter(pub_date__gte=since)
+    if model is Comments:
+        return Q(pub_date__gte=since)
+    if model is Review:
+        return Q(pub_date__gte=since) | Q(pk__in=comments.values('review'))
+    if model is User:
+        reviews = Review.objects.filter(since_filter(Review, since))
+        return (
+            Q(date_joined__gte=since)
+            | Q(pk__in=reviews.values('author'))
+            | Q(pk__in=comments.values('author'))
+        )
+    return None
+
+
+def dump_fields(model):
+    """Поля выгрузки в формате, который читает loadcsv: первичный ключ,
+    данные и внешние ключи колонками *_id.
+    """
+    skipped = set(DERIVED_FIELDS.get(model, ()))
+    skipped.update(getattr(model, 'normalized_fields', {}))
+    return [
+        field for field in model._meta.local_concrete_fields
+        if field.name not in skipped
+    ]
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return value
+
+
+@contextmanager
+def read_snapshot(using='default'):
+    """Транзакция только для чтения, в которой все таблицы видны на один
+    момент времени. SQLite держит снимок до конца транзакции сам, в
+    PostgreSQL для этого нужен уровень изоляции REPEATABLE READ.
+    """
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, '
+                    'READ ONLY'
+                )
+        yield
+
+
+def open_output(path, compress):
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def dump_model(model, path, since=None, compress=False,
+               chunk_size=DUMP_CHUNK_SIZE, progress=None, using='default'):
+    """Потоково пишет таблицу модели в файл CSV и возвращает число строк.
+    Файл пишется во временный и переименовывается в конце, так что
+    прерванная выгрузка не оставляет обрезанных файлов.
+    """
+    fields = dump_fields(model)
+    queryset = model.objects.using(using).order_by('pk')
+    condition = since_filter(model, since) if since is not None else None
+    if condition is not None:
+        queryset = queryset.filter(condition)
+    values = queryset.values_list(
+        *(field.attname for field in fields)
+    ).iterator(chunk_size=chunk_size)
+    started = last_report = time.monotonic()
+    rows = 0
+    temp_path = path.with_name(path.name + '.tmp')
+    with open_output(temp_path, compress) as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(field.attname for field in fields)
+        for row in values:
+            writer.writerow(format_value(value) for value in row)
+            rows += 1
+            if progress and rows % chunk_size == 0:
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    progress(model, rows, now - started, False)
+                    last_report = now
+    os.replace(temp_path, path)
+    if progress:
+        progress(model, rows, time.monotonic() - started, True)
+    return rows
+
+
+def dump_files(directory, since=None, compress=False,
+               chunk_size=DUMP_CHUNK_SIZE, progress=None, using='default'):
+    """Выгружает все таблицы MODELS_FILES в каталог directory из одного
+    снимка базы. Возвращает {модель: число строк}.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    dumped = {}
+    with read_snapshot(using):
+        for model in load_order():
+            name = MODELS_FILES[model] + ('.gz' if compress else '')
+            dumped[model] = dump_model(
+                model, directory / name, since, compress, chunk_size,
+                progress, using
+            )
+    return dumped
@@ -0,0 +1,640 @@
+import csv
+import hashlib
+import io
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+import django
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connections, transaction
+
+from .models import (
+    Category, Comments, Genre, GenreTitle, LoadState, Review, Title, User,
+    normalize_name
+)
+from .ratings import recalculate_ratings
+
+# Файлы выгрузки в порядке загрузки: таблица грузится после тех,
+# на которые ссылаются её внешние ключи.
+MODELS_FILES = {
+    User: 'users.csv',
+    Category: 'category.csv',
+    Genre: 'genre.csv',
+    Title: 'titles.csv',
+    GenreTitle: 'genre_title.csv',
+    Review: 'review.csv',
+    Comments: 'comments.csv'
+}
+# Естественные ключи для ON CONFLICT, если в файле нет колонки id.
+NATURAL_KEYS = {
+    User: ('username',),
+    Category: ('slug',),
+    Genre: ('slug',),
+    GenreTitle: ('title', 'genre'),
+    Review: ('title', 'author'),
+}
+# Поля, значения которых запоминаются при записи: рейтинг пересчитывается
+# только у произведений загруженных отзывов.
+TRACKED_FIELDS = {Review: 'title'}
+BATCH_SIZE = 5000
+DIGEST_BLOCK_SIZE = 1 << 20
+PROGRESS_INTERVAL = 1.0
+# Настройки SQLite на время загрузки. Журнал переносится в память, а не
+# отключается совсем: с journal_mode=OFF не работает ROLLBACK, и
+# упавшая таблица осталась бы загруженной наполовину.
+SQLITE_BULK_PRAGMAS = (
+    ('journal_mode', 'MEMORY'),
+    ('synchronous', 'OFF'),
+    ('cache_size', -262144),
+    ('temp_store', 'MEMORY'),
+)
+
+
+# checksum - SHA-256 всего файла, prefix_checksum - первых size байт
+# прошлой загрузки, prefix_lines - число строк в этой части.
+FileDigest = namedtuple(
+    'FileDigest', ('checksum', 'prefix_checksum', 'size', 'prefix_lines')
+)
+
+
+CONVERSION_ERRORS = (ValidationError, ValueError, TypeError, IndexError)
+
+
+class LoadError(Exception):
+    """Ошибка в данных файла; таблица откатывается целиком."""
+
+
+@contextmanager
+def bulk_load_pragmas(using='default'):
+    """Переключает SQLite в режим массовой загрузки и возвращает
+    прежние настройки по выходу. Для других СУБД ничего не делает.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        saved = []
+        for name, value in SQLITE_BULK_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}')
+            saved.append((name, cursor.fetchone()[0]))
+            cursor.execute(f'PRAGMA {name} = {value}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name, value in saved:
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def get_pragmas(using='default'):
+    with connections[using].cursor() as cursor:
+        result = {}
+        for name, _ in SQLITE_BULK_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}')
+            result[name] = cursor.fetchone()[0]
+    return result
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def file_digest(path, watermark=0):
+    """Считает контрольные суммы файла за один проход.
+    Сумма первых watermark байт показывает, дописан ли файл после
+    прошлой загрузки или изменён в середине.
+    """
+    checksum = hashlib.sha256()
+    prefix_checksum = None
+    prefix_lines = size = 0
+    with open(path, 'rb') as csvfile:
+        for block in iter(lambda: csvfile.read(DIGEST_BLOCK_SIZE), b''):
+            if prefix_checksum is None:
+                head = block[:watermark - size]
+                checksum.update(head)
+                prefix_lines += head.count(b'\n')
+                if size + len(head) == watermark:
+                    prefix_checksum = checksum.hexdigest()
+                checksum.update(block[len(head):])
+            else:
+                checksum.update(block)
+            size += len(block)
+    return FileDigest(
+        checksum.hexdigest(), prefix_checksum, size, prefix_lines
+    )
+
+
+def read_header(path):
+    with open(path, encoding='utf-8', newline='') as csvfile:
+        return next(csv.reader(csvfile), None)
+
+
+def column_converter(field, connection):
+    """Функция строка CSV -> значение для INSERT.
+    Значение проходит валидаторы поля (например, пределы оценки отзыва).
+    Внешние ключи приводятся к типу первичного ключа и пишутся в колонку
+    *_id как есть, связанные объекты не загружаются; ссылки проверяются
+    пачками при записи (TableLoader.check_references).
+    """
+    validate = field.run_validators
+    if field.is_relation:
+        field = field.target_field
+
+    def convert(value):
+        if value == '' and field.null:
+            return None
+        value = field.to_python(value)
+        validate(value)
+        return field.get_db_prep_save(value, connection)
+    return convert
+
+
+def constant_value(model, field, connection):
+    """Значение колонки, которой нет в файле: по умолчанию или auto_now."""
+    value = field.pre_save(model(), add=True)
+    return field.get_db_prep_save(value, connection)
+
+
+class TableLoader:
+    """Потоковая загрузка одного файла CSV в таблицу модели.
+    Строки не превращаются в объекты моделей: для каждой колонки один раз
+    строится преобразователь, и пачки кортежей уходят в executemany.
+    В режиме upsert существующие записи обновляются через ON CONFLICT
+    по первичному ключу, а без колонки id - по естественному ключу.
+    """
+
+    def __init__(self, model, header, using='default', upsert=False):
+        self.model = model
+        self.using = using
+        self.connection = connections[using]
+        fields = model._meta.local_concrete_fields
+        attnames = {field.attname for field in fields}
+        unknown = [name for name in header if name not in attnames]
+        if unknown:
+            raise LoadError(
+                f'Колонки {", ".join(unknown)} нет в модели {model.__name__}'
+            )
+        self.positions = {name: index for index, name in enumerate(header)}
+        self.columns = []
+        self.getters = []
+        # Колонки из файла и вычисляемые из него; значения по умолчанию
+        # при обновлении существующей записи не перезаписываются.
+        self.updated_columns = []
+        # Внешние ключи из файла: (позиция в строке, поле).
+        self.references = []
+        for field in fields:
+            if field.primary_key and field.attname not in self.positions:
+                # id не задан в файле - его назначит база.
+                continue
+            getter, from_file = self.column_getter(field)
+            self.columns.append(field.column)
+            self.getters.append(getter)
+            if from_file:
+                self.updated_columns.append(field.column)
+            if from_file and field.is_relation:
+                self.references.append((len(self.columns) - 1, field))
+        self.sql = self.insert_sql(upsert)
+        self.upsert = upsert
+        self.tracked = set()
+        tracked = TRACKED_FIELDS.get(model)
+        self.tracked_field = tracked and model._meta.get_field(tracked)
+
+    def column_getter(self, field):
+        normalized = getattr(self.model, 'normalized_fields', {})
+        if field.attname in self.positions:
+            return self.read_column(
+                self.positions[field.attname],
+                column_converter(field, self.connection)
+            ), True
+        if normalized.get(field.attname) in self.positions:
+            return self.normalize_column(
+                self.positions[normalized[field.attname]]
+            ), True
+        return self.constant_column(
+            constant_value(self.model, field, self.connection)
+        ), False
+
+    def conflict_columns(self):
+        meta = self.model._meta
+        if meta.pk.attname in self.positions:
+            return [meta.pk.column]
+        fields = [
+            meta.get_field(name) for name in NATURAL_KEYS.get(self.model, ())
+        ]
+        if fields and all(
+            field.attname in self.positions for field in fields
+        ):
+            return [field.column for field in fields]
+        return None
+
+    def insert_sql(self, upsert):
+        quote_name = self.connection.ops.quote_name
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote_name(self.model._meta.db_table),
+            ', '.join(quote_name(column) for column in self.columns),
+            ', '.join(['%s'] * len(self.columns)),
+        )
+        conflict = self.conflict_columns() if upsert else None
+        if not conflict:
+            return sql
+        updated = [
+            f'{quote_name(column)} = excluded.{quote_name(column)}'
+            for column in self.updated_columns if column not in conflict
+        ]
+        action = f'DO UPDATE SET {", ".join(updated)}' if updated else (
+            'DO NOTHING'
+        )
+        conflict = ', '.join(quote_name(column) for column in conflict)
+        return f'{sql} ON CONFLICT ({conflict}) {action}'
+
+    @staticmethod
+    def read_column(position, convert):
+        return lambda row: convert(row[position])
+
+    @staticmethod
+    def normalize_column(position):
+        return lambda row: normalize_name(row[position])
+
+    @staticmethod
+    def constant_column(value):
+        return lambda row: value
+
+    def convert(self, row):
+        return tuple(getter(row) for getter in self.getters)
+
+    def convert_chunk(self, records):
+        """Преобразует пачку записей в список (номер строки, значения);
+        ошибочные строки не прерывают загрузку, а возвращаются списком
+        (номер строки, ошибка).
+        """
+        rows = []
+        rejected = []
+        for line, row in records:
+            try:
+                rows.append((line, self.convert(row)))
+            except CONVERSION_ERRORS as e:
+                rejected.append((line, str(e)))
+        return rows, rejected
+
+    def track(self, batch):
+        """Запоминает в tracked значения TRACKED_FIELDS пачки. При
+        обновлении по id запоминаются и прежние значения: отзыв мог
+        перейти к другому произведению.
+        """
+        field = self.tracked_field
+        if not field or field.column not in self.columns:
+            return
+        position = self.columns.index(field.column)
+        self.tracked.update(row[position] for row in batch)
+        pk = self.model._meta.pk
+        if not self.upsert or pk.column not in self.columns:
+            return
+        position = self.columns.index(pk.column)
+        ids = [row[position] for row in batch]
+        size = self.connection.features.max_query_params or len(ids)
+        for chunk in batched(ids, size):
+            self.tracked.update(
+                self.model.objects.using(self.using).filter(
+                    pk__in=chunk
+                ).values_list(field.attname, flat=True)
+            )
+
+    def existing_values(self, field, values):
+        """Значения из values, на которые есть записи в таблице field."""
+        target = field.target_field
+        manager = field.related_model._base_manager.using(self.using)
+        values = list(values)
+        size = self.connection.features.max_query_params or len(values)
+        existing = set()
+        for chunk in batched(values, size):
+            existing.update(manager.filter(
+                **{f'{target.attname}__in': chunk}
+            ).values_list(target.attname, flat=True))
+        return existing
+
+    def check_references(self, batch, name, reject=None):
+        """Отбрасывает строки пачки со ссылками на несуществующие записи,
+        одним запросом на внешний ключ. SQLite проверяет внешние ключи
+        только при COMMIT, и ошибка не указывала бы ни файл, ни строку.
+        """
+        for position, field in self.references:
+            existing = self.existing_values(field, {
+                values[position] for _, values in batch
+            } - {None})
+            checked = []
+            for line, values in batch:
+                value = values[position]
+                if value is None or value in existing:
+                    checked.append((line, values))
+                    continue
+                error = (
+                    f'{field.attname}: нет записи '
+                    f'{field.related_model.__name__} с '
+                    f'{field.target_field.attname} = {value}'
+                )
+                if reject is None:
+                    raise LoadError(f'{name}, строка {line}: {error}')
+                reject(name, line, error)
+            batch = checked
+        return batch
+
+    def write(self, reader, cursor, batch_size, progress=None, name='',
+              reject=None):
+        """Пишет пары (номер строки, значения) из reader пачками,
+        возвращает число записанных строк.
+        """
+        started = last_report = time.monotonic()
+        rows = 0
+        for batch in batched(reader, batch_size):
+            batch = self.check_references(batch, name, reject)
+            if not batch:
+                continue
+            values = [row for _, row in batch]
+            self.track(values)
+            try:
+                cursor.executemany(self.sql, values)
+            except DatabaseError as e:
+                raise LoadError(
+                    f'{name}, строки {batch[0][0]}-{batch[-1][0]}: {e}'
+                )
+            rows += len(batch)
+            now = time.monotonic()
+            if progress and now - last_report >= PROGRESS_INTERVAL:
+                progress(self.model, rows, now - started, False)
+                last_report = now
+        if progress:
+            progress(self.model, rows, time.monotonic() - started, True)
+        return rows
+
+    def reset_sequences(self, cursor):
+        # Первичные ключи берутся из файла, счётчики автоинкремента
+        # (PostgreSQL, Oracle) нужно подвинуть за последний id.
+        for sql in self.connection.ops.sequence_reset_sql(
+            no_style(), [self.model]
+        ):
+            cursor.execute(sql)
+
+
+# Файл к загрузке: offset - байт, с которого читаются строки,
+# line_offset - номер строки перед ним, state - прошлая загрузка, от
+# которой продолжается счёт строк.
+LoadTask = namedtuple(
+    'LoadTask',
+    ('model', 'path', 'header', 'digest', 'state', 'offset', 'line_offset')
+)
+
+
+def load_order(models_files=MODELS_FILES):
+    """Модели в порядке загрузки: каждая после тех, на которые ссылается."""
+    order = []
+
+    def visit(model):
+        if model in order:
+            return
+        for field in model._meta.local_concrete_fields:
+            related = field.related_model
+            if related in models_files and related is not model:
+                visit(related)
+        order.append(model)
+
+    for model in models_files:
+        visit(model)
+    return order
+
+
+def load_state_key(path):
+    """Поля LoadState, по которым находится состояние файла."""
+    return {
+        'directory': str(path.resolve().parent),
+        'file_name': path.name,
+    }
+
+
+def plan_load(model, path, incremental, using='default'):
+    """Решает, какую часть файла загружать. Возвращает LoadTask или
+    None, если файл не менялся с прошлой загрузки либо пуст.
+    """
+    state = None
+    if incremental:
+        state = LoadState.objects.using(using).filter(
+            **load_state_key(path)
+        ).first()
+    digest = file_digest(path, state.size if state else 0)
+    header = read_header(path)
+    if header is None:
+        return None
+    if state is None:
+        return LoadTask(model, path, header, digest, None, 0, 0)
+    if digest.checksum == state.checksum:
+        return None
+    if digest.prefix_checksum == state.checksum:
+        # Файл только дописан: читаются строки после прошлой загрузки.
+        return LoadTask(
+            model, path, header, digest, state, state.size,
+            digest.prefix_lines
+        )
+    return LoadTask(model, path, header, digest, None, 0, 0)
+
+
+@contextmanager
+def open_records(task):
+    """Записи файла (номер строки, строка CSV) начиная с task.offset."""
+    with open(task.path, 'rb') as raw:
+        raw.seek(task.offset)
+        reader = csv.reader(io.TextIOWrapper(raw, 'utf-8', newline=''))
+        if not task.offset:
+            next(reader)
+
+        def records():
+            for row in reader:
+                if row:
+                    yield task.line_offset + reader.line_num, row
+        yield records()
+
+
+def write_task(task, rows, batch_size=BATCH_SIZE, progress=None,
+               using='default', incremental=False, reject=None):
+    """Пишет строки файла в одной транзакции и запоминает состояние."""
+    loader = TableLoader(task.model, task.header, using, upsert=incremental)
+    try:
+        with transaction.atomic(using=using), \
+                connections[using].cursor() as cursor:
+            count = loader.write(
+                rows, cursor, batch_size, progress, task.path.name, reject
+            )
+            loader.reset_sequences(cursor)
+            recalculate_title_ratings(loader.tracked, using)
+            LoadState.objects.using(using).update_or_create(
+                **load_state_key(task.path),
+                defaults={
+                    'checksum': task.digest.checksum,
+                    'size': task.digest.size,
+                    'rows': count + (task.state.rows if task.state else 0),
+                }
+            )
+    except DatabaseError as e:
+        # Отложенные ограничения проверяются при COMMIT, вне write().
+        raise LoadError(f'{task.path.name}: {e}')
+    return count
+
+
+def recalculate_title_ratings(title_ids, using='default'):
+    """Пересчитывает рейтинг произведений title_ids: загрузка идёт в
+    обход сигналов, которые обычно обновляют счётчики.
+    """
+    title_ids = sorted(title_ids)
+    size = connections[using].features.max_query_params or len(title_ids)
+    for chunk in batched(title_ids, size):
+        recalculate_ratings(Title.objects.using(using).filter(pk__in=chunk))
+
+
+def checked_rows(results, task, reject=None):
+    """Склеивает результаты convert_chunk в поток строк для записи.
+    Ошибочные строки передаются в reject(файл, номер строки, ошибка),
+    а без него прерывают загрузку.
+    """
+    for rows, rejected in results:
+        for line, error in rejected:
+            if reject is None:
+                raise LoadError(f'{task.path.name}, строка {line}: {error}')
+            reject(task.path.name, line, error)
+        yield from rows
+
+
+def load_file(model, path, batch_size=BATCH_SIZE, progress=None,
+              using='default', incremental=False, reject=None):
+    """Загружает файл в одной транзакции пачками по batch_size строк.
+    progress(model, rows, elapsed, finished) вызывается не чаще раза в
+    PROGRESS_INTERVAL секунд и в конце. В режиме incremental неизменный
+    файл пропускается (возвращается None), у дописанного читаются только
+    новые строки, а записи обновляются через upsert. Возвращает число
+    загруженных строк.
+    """
+    task = plan_load(model, path, incremental, using)
+    if task is None:
+        return None
+    loader = TableLoader(model, task.header, using)
+    with open_records(task) as records:
+        results = (
+            loader.convert_chunk(chunk)
+            for chunk in batched(records, batch_size)
+        )
+        return write_task(
+            task, checked_rows(results, task, reject), batch_size,
+            progress, using, incremental, reject
+        )
+
+
+# Преобразователи строк в процессах пула, по одному на модель и заголовок.
+worker_loaders = {}
+
+
+def convert_chunk(model_label, header, records):
+    """Выполняется в процессе пула: разбор и проверка пачки строк."""
+    key = (model_label, tuple(header))
+    if key not in worker_loaders:
+        worker_loaders[key] = TableLoader(apps.get_model(model_label), header)
+    return worker_loaders[key].convert_chunk(records)
+
+
+class ParsePipeline:
+    """Разбор файлов в пуле процессов для одного пишущего процесса.
+    Пачки отправляются в пул по порядку файлов, пока писатель занят
+    предыдущими; в работе одновременно не больше window пачек, поэтому
+    память не зависит от размера файлов.
+    """
+
+    def __init__(self, pool, tasks, batch_size, window):
+        self.pool = pool
+        self.window = window
+        self.pending = deque()
+        self.source = self.read(tasks, batch_size)
+        self.fill()
+
+    @staticmethod
+    def read(tasks, batch_size):
+        for task in tasks:
+            with open_records(task) as records:
+                for chunk in batched(records, batch_size):
+                    yield task, chunk
+
+    def fill(self):
+        while len(self.pending) < self.window:
+            item = next(self.source, None)
+            if item is None:
+                return
+            task, chunk = item
+            self.pending.append((task, self.pool.submit(
+                convert_chunk, task.model._meta.label, task.header, chunk
+            )))
+
+    def results(self, task):
+        """Результаты пачек файла task в исходном порядке."""
+        while self.pending and self.pending[0][0] is task:
+            _, future = self.pending.popleft()
+            self.fill()
+            yield future.result()
+
+
+def load_parallel(tasks, workers, batch_size=BATCH_SIZE, progress=None,
+                  using='default', incremental=False, reject=None):
+    """Загружает файлы tasks ({модель: LoadTask или None}) по порядку,
+    разбирая строки в пуле из workers процессов.
+    """
+    loaded = {}
+    with ProcessPoolExecutor(workers, initializer=django.setup) as pool:
+        pipeline = ParsePipeline(
+            pool, [task for task in tasks.values() if task], batch_size,
+            workers * 2
+        )
+        for model, task in tasks.items():
+            if task is None:
+                loaded[model] = None
+                continue
+            loaded[model] = write_task(
+                task, checked_rows(pipeline.results(task), task, reject),
+                batch_size, progress, using, incremental, reject
+            )
+    return loaded
+
+
+def load_files(directory, batch_size=BATCH_SIZE, progress=None,
+               using='default', incremental=False, workers=1, reject=None):
+    """Загружает все файлы MODELS_FILES из каталога directory.
+    При workers > 1 строки разбираются и проверяются в пуле процессов,
+    а пишутся в базу одним процессом в порядке зависимостей. Если задан
+    reject(файл, номер строки, ошибка), ошибочные строки пропускаются и
+    передаются ему, иначе загрузка прерывается на первой из них.
+    Возвращает {модель: число строк или None для пропущенного файла}.
+    """
+    with bulk_load_pragmas(using):
+        if workers > 1:
+            tasks = {
+                model: plan_load(
+                    model, directory / MODELS_FILES[model], incremental,
+                    using
+                )
+                for model in load_order()
+            }
+            return load_parallel(
+                tasks, workers, batch_size, progress, using, incremental,
+                reject
+            )
+        return {
+            model: load_file(
+                model, directory / MODELS_FILES[model], batch_size,
+                progress, using, incremental, reject
+            )
+            for model in load_order()
+        }
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from reviews.dump import DUMP_CHUNK_SIZE, dump_files
+from reviews.loader import MODELS_FILES
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка базы данных в файлы .csv в формате команды loadcsv'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            type=Path,
+            help='Каталог для файлов .csv'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать файлы (users.csv.gz и т.д.)'
+        )
+        parser.add_argument(
+            '--since',
+            help=(
+                'Выгрузить только пользователей, отзывы и комментарии, '
+                'созданные не раньше указанного момента (ISO 8601), и '
+                'записи, на которые они ссылаются'
+            )
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DUMP_CHUNK_SIZE,
+            help='Количество строк, читаемых из базы за раз'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть больше нуля')
+        since = self.parse_since(options['since'])
+        try:
+            dump_files(
+                options['path'], since, options['gzip'],
+                options['chunk_size'], self.report
+            )
+        except OSError as e:
+            raise CommandError(e)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Данные выгружены в каталог {options["path"]}'
+            ))
+
+    def parse_since(self, value):
+        if value is None:
+            return None
+        try:
+            since = parse_datetime(value)
+        except ValueError:
+            since = None
+        if since is None:
+            raise CommandError(
+                '--since: ожидается дата и время в формате ISO 8601'
+            )
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+    def report(self, model, rows, elapsed, finished):
+        rate = rows / elapsed if elapsed else rows
+        message = (
+            f'{model.__name__} -> {MODELS_FILES[model]}: {rows} строк, '
+            f'{elapsed:.1f} с, {rate:.0f} строк/с'
+        )
+        if finished:
+            message = self.style.SUCCESS(f'{message} - выгружено')
+        self.stdout.write(message)
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.loader import MODELS_FILES
+from reviews.synthetic import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация синтетических данных для нагрузочного тестирования '
+        'в формате команды loadcsv'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            type=Path,
+            help='Каталог для файлов .csv'
+        )
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--genres', type=int, default=20)
+        parser.add_argument('--categories', type=int, default=5)
+        parser.add_argument(
+            '--reviews-per-title',
+            type=float,
+            default=10,
+            help='Среднее количество отзывов на произведение'
+        )
+        parser.add_argument(
+            '--comments-per-review',
+            type=float,
+            default=1,
+            help='Среднее количество комментариев к отзыву'
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=1.5,
+            help=(
+                'Показатель распределения Парето для отзывов: чем меньше, '
+                'тем сильнее отзывы сосредоточены на немногих произведениях'
+            )
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора: одинаковое зерно - одинаковые данные'
+        )
+        parser.add_argument(
+            '--load',
+            action='store_true',
+            help='Сразу загрузить данные командой loadcsv'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users должен быть больше нуля')
+        if options['alpha'] <= 1:
+            raise CommandError('--alpha должен быть больше 1')
+        counts = DatasetGenerator(
+            options['users'], options['titles'], options['genres'],
+            options['categories'], options['reviews_per_title'],
+            options['comments_per_review'], options['alpha'], options['seed']
+        ).generate(options['path'])
+        for model, rows in counts.items():
+            self.stdout.write(f'{MODELS_FILES[model]}: {rows} строк')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Данные сгенерированы в каталоге {options["path"]}'
+            ))
+        if options['load']:
+            call_command(
+                'loadcsv', path=options['path'], stdout=self.stdout,
+                stderr=self.stderr
+            )
@@ -1,39 +1,102 @@
-import csv
+from pathlib import Path
+
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from reviews.models import (
-    Category, Comments, Genre, GenreTitle, Review, Title, User
-)
-
-MODELS_FILES = {
-    User: 'users.csv',
-    Category: 'category.csv',
-    Genre: 'genre.csv',
-    Title: 'titles.csv',
-    GenreTitle: 'genre_title.csv',
-    Review: 'review.csv',
-    Comments: 'comments.csv'
-}
+from django.core.management.base import BaseCommand, CommandError
+
+from api.signals import invalidate_catalog
+from reviews.loader import BATCH_SIZE, MODELS_FILES, LoadError, load_files
+
+MAX_REJECTED_SHOWN = 100
 
 
 class Command(BaseCommand):
     help = 'Загрузка файлов .csv в базу данных '
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            type=Path,
+            default=settings.BASE_DIR / 'static' / 'data',
+            help='Каталог с файлами .csv'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк в одном INSERT'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help=(
+                'Пропустить неизменные файлы, у дописанных загрузить только '
+                'новые строки, существующие записи обновить'
+            )
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Количество процессов для разбора и проверки строк'
+        )
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help=(
+                'Пропускать строки с ошибками и вывести их список вместо '
+                'остановки загрузки'
+            )
+        )
+
     def handle(self, *args, **options):
-        for model, csv_file in MODELS_FILES.items():
-            with open(
-                f'{settings.BASE_DIR}/static/data/{csv_file}',
-                'r',
-                encoding='utf-8'
-            ) as csvfile:
-                reader = csv.DictReader(csvfile)
-                model.objects.bulk_create(
-                    model(**data) for data in reader)
-                print(
-                    f'Данные из файла {csv_file} загруженны в БД'
-                    f' в таблицу модели {model.__name__}'
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        if options['workers'] < 1:
+            raise CommandError('--workers должен быть больше нуля')
+        self.rejected = []
+        self.rejected_count = 0
+        try:
+            loaded = load_files(
+                options['path'], options['batch_size'], self.report,
+                incremental=options['incremental'],
+                workers=options['workers'],
+                reject=self.reject if options['skip_invalid'] else None
+            )
+        except (LoadError, OSError) as e:
+            raise CommandError(e)
+        if self.rejected_count:
+            self.stderr.write(
+                f'Пропущено строк с ошибками: {self.rejected_count}'
+            )
+            for csv_file, line, error in self.rejected:
+                self.stderr.write(f'{csv_file}, строка {line}: {error}')
+        for model, rows in loaded.items():
+            if rows is None:
+                self.stdout.write(
+                    f'{MODELS_FILES[model]} не изменился - пропущен'
                 )
+        # Загрузка идёт в обход сигналов моделей, поэтому версии кеша
+        # каталога сбрасываются здесь.
+        if any(loaded.values()):
+            invalidate_catalog(sender=self)
         self.stdout.write(
             self.style.SUCCESS(
                 'Все данные успешно загружены в базу!'
             ))
+
+    def reject(self, csv_file, line, error):
+        # Список ограничен: в большом файле ошибочных строк может быть
+        # слишком много, чтобы держать их в памяти.
+        self.rejected_count += 1
+        if len(self.rejected) < MAX_REJECTED_SHOWN:
+            self.rejected.append((csv_file, line, error))
+
+    def report(self, model, rows, elapsed, finished):
+        rate = rows / elapsed if elapsed else rows
+        message = (
+            f'{MODELS_FILES[model]} -> {model.__name__}: {rows} строк, '
+            f'{elapsed:.1f} с, {rate:.0f} строк/с'
+        )
+        if finished:
+            message = self.style.SUCCESS(f'{message} - загружено')
+        self.stdout.write(message)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.search import FTS_INDEXES, fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Пересоздание полнотекстового индекса произведений и отзывов'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError(
+                'Полнотекстовый индекс FTS5 доступен только для SQLite'
+            )
+        for table in FTS_INDEXES:
+            rebuild_index(table)
+            self.stdout.write(f'Индекс {table} перестроен')
+        self.stdout.write(
+            self.style.SUCCESS(
+                'Полнотекстовый индекс успешно перестроен!'
+            ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.signals import invalidate_catalog
+from reviews.ratings import recalculate_ratings
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт рейтинга и счётчиков отзывов всех произведений'
+
+    def handle(self, *args, **options):
+        updated = recalculate_ratings()
+        # Рейтинг меняется через update(), в обход сигналов моделей.
+        invalidate_catalog(sender=self)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Рейтинг пересчитан для {updated} произведений'
+            ))
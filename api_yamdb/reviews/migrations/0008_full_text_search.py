@@ -0,0 +1,73 @@
+# Generated by Django 3.2 on 2026-10-18 19:40
+
+from django.db import migrations
+
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE reviews_title_fts USING fts5(name, description, "
+    "content='reviews_title', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER reviews_title_fts_ai AFTER INSERT ON reviews_title BEGIN "
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER reviews_title_fts_ad AFTER DELETE ON reviews_title BEGIN "
+    "INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER reviews_title_fts_au AFTER UPDATE OF name, description "
+    "ON reviews_title BEGIN "
+    "INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "INSERT INTO reviews_title_fts(reviews_title_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE reviews_review_fts USING fts5(text, "
+    "content='reviews_review', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER reviews_review_fts_ai AFTER INSERT ON reviews_review "
+    "BEGIN INSERT INTO reviews_review_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "CREATE TRIGGER reviews_review_fts_ad AFTER DELETE ON reviews_review "
+    "BEGIN INSERT INTO reviews_review_fts(reviews_review_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER reviews_review_fts_au AFTER UPDATE OF text "
+    "ON reviews_review BEGIN "
+    "INSERT INTO reviews_review_fts(reviews_review_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO reviews_review_fts(rowid, text) VALUES (new.id, new.text); "
+    "END",
+    "INSERT INTO reviews_review_fts(reviews_review_fts) VALUES ('rebuild')",
+)
+
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS reviews_title_fts_ai',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_ad',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_au',
+    'DROP TABLE IF EXISTS reviews_title_fts',
+    'DROP TRIGGER IF EXISTS reviews_review_fts_ai',
+    'DROP TRIGGER IF EXISTS reviews_review_fts_ad',
+    'DROP TRIGGER IF EXISTS reviews_review_fts_au',
+    'DROP TABLE IF EXISTS reviews_review_fts',
+)
+
+
+def run_sqlite_only(statements):
+    # FTS5 есть только в SQLite, на других СУБД поиск идёт без индекса.
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_pub_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_sqlite_only(CREATE_SQL), run_sqlite_only(DROP_SQL)
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 3.2 on 2026-10-18 19:36
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_name(value):
+    return unicodedata.normalize('NFKC', value or '').casefold()
+
+
+# AddField и RemoveField на SQLite пересоздают таблицу reviews_title, и
+# триггеры индекса FTS5 из 0008 удаляются вместе со старой таблицей.
+# Индекс при этом не меняется (rowid те же), нужны только триггеры.
+TITLE_TRIGGERS_SQL = (
+    "CREATE TRIGGER IF NOT EXISTS reviews_title_fts_ai AFTER INSERT ON "
+    "reviews_title BEGIN "
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS reviews_title_fts_ad AFTER DELETE ON "
+    "reviews_title BEGIN "
+    "INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS reviews_title_fts_au AFTER UPDATE OF "
+    "name, description ON reviews_title BEGIN "
+    "INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+)
+
+
+def restore_title_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in TITLE_TRIGGERS_SQL:
+        schema_editor.execute(sql)
+
+
+def fill_normalized_names(apps, schema_editor):
+    for model_name, source, target in (
+        ('Category', 'name', 'name_normalized'),
+        ('Genre', 'name', 'name_normalized'),
+        ('Title', 'name', 'name_normalized'),
+        ('User', 'username', 'username_normalized'),
+    ):
+        model = apps.get_model('reviews', model_name)
+        objects = list(model.objects.only('pk', source))
+        for obj in objects:
+            setattr(obj, target, normalize_name(getattr(obj, source)))
+        model.objects.bulk_update(objects, (target,), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_full_text_search'),
+    ]
+
+    operations = [
+        # При откате триггеры восстанавливаются после RemoveField.
+        migrations.RunPython(migrations.RunPython.noop, restore_title_triggers),
+        migrations.AddField(
+            model_name='category',
+            name='name_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256, verbose_name='Название для поиска'),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='name_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256, verbose_name='Название для поиска'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='name_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256, verbose_name='Название для поиска'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='username_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=150, verbose_name='Имя пользователя для поиска'),
+        ),
+        migrations.RunPython(fill_normalized_names, migrations.RunPython.noop),
+        migrations.RunPython(restore_title_triggers, migrations.RunPython.noop),
+    ]
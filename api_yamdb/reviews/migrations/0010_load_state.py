@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-18 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_normalized_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255, unique=True, verbose_name='Файл')),
+                ('checksum', models.CharField(max_length=64, verbose_name='SHA-256 загруженной части')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Загружено байт')),
+                ('rows', models.PositiveBigIntegerField(verbose_name='Загружено строк')),
+                ('loaded_at', models.DateTimeField(auto_now=True, verbose_name='Время загрузки')),
+            ],
+            options={
+                'verbose_name': 'Состояние загрузки файла',
+                'verbose_name_plural': 'Состояния загрузки файлов',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-18 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loadstate',
+            name='directory',
+            field=models.CharField(default='', max_length=1024, verbose_name='Каталог'),
+        ),
+        migrations.AlterField(
+            model_name='loadstate',
+            name='file_name',
+            field=models.CharField(max_length=255, verbose_name='Файл'),
+        ),
+        migrations.AddConstraint(
+            model_name='loadstate',
+            constraint=models.UniqueConstraint(fields=('directory', 'file_name'), name='unique_load_state_file'),
+        ),
+    ]
@@ -1,7 +1,10 @@
+import unicodedata
 from datetime import datetime
+
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.utils import timezone
 
 
 USER_ROLES = (
@@ -12,6 +15,19 @@ USER_ROLES = (
 
 STAFF_ROLES = ('moderator', 'admin')
 
+OUTBOX_STATUSES = (
+    ('pending', 'Ожидает отправки'),
+    ('sent', 'Отправлено'),
+    ('failed', 'Не отправлено')
+)
+
+
+def normalize_name(value):
+    """Приводит строку к виду для поиска без учёта регистра.
+    В отличие от LIKE в SQLite, casefold работает и для кириллицы.
+    """
+    return unicodedata.normalize('NFKC', value or '').casefold()
+
 
 class User(AbstractUser):
     bio = models.TextField('Биография', blank=True)
@@ -26,6 +42,16 @@ class User(AbstractUser):
         null=True
     )
     email = models.EmailField(('email address'), unique=True, max_length=254)
+    username_normalized = models.CharField(
+        'Имя пользователя для поиска',
+        max_length=150,
+        db_index=True,
+        editable=False,
+        default=''
+    )
+
+    # Поисковые копии полей: поле-копия -> исходное поле.
+    normalized_fields = {'username_normalized': 'username'}
 
     def save(self, **kwargs):
         # Если роль admin или moderator, то у пользователя is_staff меняется
@@ -34,8 +60,13 @@ class User(AbstractUser):
             self.is_staff = True
         else:
             self.is_staff = False
+        self.normalize_fields()
         super().save()
 
+    def normalize_fields(self):
+        for target, source in self.normalized_fields.items():
+            setattr(self, target, normalize_name(getattr(self, source)))
+
     @property
     def is_admin(self):
         if self.role == STAFF_ROLES[1]:
@@ -43,7 +74,32 @@ class User(AbstractUser):
         return False
 
 
-class Category(models.Model):
+class NormalizedNameModel(models.Model):
+    """Абстрактная модель с индексируемой поисковой копией поля name."""
+
+    name_normalized = models.CharField(
+        'Название для поиска',
+        max_length=256,
+        db_index=True,
+        editable=False,
+        default=''
+    )
+
+    normalized_fields = {'name_normalized': 'name'}
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.normalize_fields()
+        super().save(*args, **kwargs)
+
+    def normalize_fields(self):
+        for target, source in self.normalized_fields.items():
+            setattr(self, target, normalize_name(getattr(self, source)))
+
+
+class Category(NormalizedNameModel):
     name = models.CharField('Название категории', max_length=256)
     slug = models.SlugField('Слаг', max_length=50, unique=True)
 
@@ -55,7 +111,7 @@ class Category(models.Model):
         verbose_name_plural = 'Категории'
 
 
-class Genre(models.Model):
+class Genre(NormalizedNameModel):
     name = models.CharField('Название жанра', max_length=256)
     slug = models.SlugField('Слаг', max_length=50, unique=True)
 
@@ -67,7 +123,7 @@ class Genre(models.Model):
         verbose_name_plural = 'Жанры'
 
 
-class Title(models.Model):
+class Title(NormalizedNameModel):
     name = models.CharField('Название', max_length=256)
     year = models.IntegerField(
         'Год', validators=[
@@ -91,6 +147,13 @@ class Title(models.Model):
         null=True,
         related_name='titles'
     )
+    # Денормализованный рейтинг: поддерживается сигналами из signals.py
+    # и пересчитывается командой recalcratings.
+    rating = models.IntegerField('Рейтинг', null=True, blank=True)
+    reviews_count = models.PositiveIntegerField(
+        'Количество отзывов', default=0
+    )
+    score_sum = models.PositiveIntegerField('Сумма оценок', default=0)
 
     def __str__(self):
         return self.name
@@ -153,6 +216,13 @@ class Review(models.Model):
             models.UniqueConstraint(
                 fields=['title', 'author'], name='unique_reviews'),
         ]
+        # Под курсорную пагинацию отзывов произведения.
+        indexes = [
+            models.Index(
+                fields=['title', '-pub_date', '-id'],
+                name='review_title_pub_date_idx'
+            ),
+        ]
 
 
 class Comments(models.Model):
@@ -171,3 +241,76 @@ class Comments(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        # Под курсорную пагинацию комментариев к отзыву.
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx'
+            ),
+        ]
+
+
+class LoadState(models.Model):
+    """Состояние файла, загруженного командой loadcsv.
+    Контрольная сумма и размер загруженной части позволяют при повторной
+    загрузке пропустить неизменный файл, а у дописанного файла прочитать
+    только новые строки. Файлы с одним именем из разных каталогов
+    (--path) учитываются отдельно.
+    """
+
+    directory = models.CharField('Каталог', max_length=1024, default='')
+    file_name = models.CharField('Файл', max_length=255)
+    checksum = models.CharField('SHA-256 загруженной части', max_length=64)
+    size = models.PositiveBigIntegerField('Загружено байт')
+    rows = models.PositiveBigIntegerField('Загружено строк')
+    loaded_at = models.DateTimeField('Время загрузки', auto_now=True)
+
+    def __str__(self):
+        return f'{self.directory}/{self.file_name}'
+
+    class Meta:
+        verbose_name = 'Состояние загрузки файла'
+        verbose_name_plural = 'Состояния загрузки файлов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['directory', 'file_name'],
+                name='unique_load_state_file'
+            )
+        ]
+
+
+class OutboxEmail(models.Model):
+    """Письмо в очереди на отправку. Запрос к API только добавляет
+    запись, письма отправляет команда sendemails.
+    """
+
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=254)
+    to = models.EmailField('Получатель', max_length=254)
+    status = models.CharField(
+        'Состояние',
+        choices=OUTBOX_STATUSES,
+        max_length=10,
+        default=OUTBOX_STATUSES[0][0]
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток отправки', default=0)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка', default=timezone.now
+    )
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'
+
+    class Meta:
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        indexes = [
+            models.Index(
+                fields=['status', 'next_attempt_at'],
+                name='outbox_status_next_idx'
+            ),
+        ]
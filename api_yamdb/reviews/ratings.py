@@ -0,0 +1,49 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, NullIf
+
+from .models import Review, Title
+
+
+def update_title_rating(title_id, count_delta, score_delta):
+    """Сдвигает счётчики произведения одним UPDATE без агрегации отзывов.
+    Рейтинг считается в том же запросе из новых значений суммы и количества;
+    NullIf превращает рейтинг произведения без отзывов в NULL.
+    """
+    reviews_count = F('reviews_count') + count_delta
+    score_sum = F('score_sum') + score_delta
+    Title.objects.filter(pk=title_id).update(
+        reviews_count=reviews_count,
+        score_sum=score_sum,
+        rating=score_sum / NullIf(reviews_count, 0),
+    )
+
+
+def recalculate_ratings(titles=None):
+    """Пересчитывает счётчики и рейтинг по таблице отзывов.
+    Используется для сверки после bulk_create и прочих операций,
+    обходящих сигналы. Возвращает количество обновлённых произведений.
+    """
+    if titles is None:
+        titles = Title.objects.all()
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')
+    ).order_by().values('title')
+    reviews_count = Coalesce(
+        Subquery(
+            reviews.annotate(value=Count('pk')).values('value'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+    score_sum = Coalesce(
+        Subquery(
+            reviews.annotate(value=Sum('score')).values('value'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+    updated = titles.update(
+        reviews_count=reviews_count, score_sum=score_sum
+    )
+    titles.update(rating=F('score_sum') / NullIf(F('reviews_count'), 0))
+    return updated
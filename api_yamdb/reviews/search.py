@@ -0,0 +1,132 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+# Полнотекстовый индекс на SQLite FTS5. Таблицы индекса внешние
+# (external content): текст хранится только в таблицах моделей, а
+# триггеры поддерживают индекс в актуальном состоянии.
+FTS_INDEXES = {
+    'reviews_title_fts': {
+        'content': 'reviews_title',
+        'columns': ('name', 'description'),
+        # Совпадение в названии весит больше, чем в описании.
+        'weights': (10.0, 1.0),
+    },
+    'reviews_review_fts': {
+        'content': 'reviews_review',
+        'columns': ('text',),
+        'weights': (1.0,),
+    },
+}
+FTS_TOKENIZER = 'unicode61 remove_diacritics 2'
+FTS_TERM_RE = re.compile(r'\w+')
+
+
+def fts_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def create_index_sql(table):
+    """SQL для создания таблицы индекса и триггеров синхронизации."""
+    index = FTS_INDEXES[table]
+    content = index['content']
+    columns = ', '.join(index['columns'])
+    new_values = ', '.join(f'new.{column}' for column in index['columns'])
+    old_values = ', '.join(f'old.{column}' for column in index['columns'])
+    return [
+        f"CREATE VIRTUAL TABLE {table} USING fts5({columns}, "
+        f"content='{content}', content_rowid='id', "
+        f"tokenize='{FTS_TOKENIZER}')",
+        f"CREATE TRIGGER {table}_ai AFTER INSERT ON {content} BEGIN "
+        f"INSERT INTO {table}(rowid, {columns}) VALUES (new.id, {new_values});"
+        f" END",
+        f"CREATE TRIGGER {table}_ad AFTER DELETE ON {content} BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values}); END",
+        # Триггер срабатывает только на изменение индексируемых колонок,
+        # а не на каждое обновление счётчиков рейтинга.
+        f"CREATE TRIGGER {table}_au AFTER UPDATE OF {columns} ON {content} "
+        f"BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {table}(rowid, {columns}) VALUES (new.id, {new_values});"
+        f" END",
+    ]
+
+
+def drop_index_sql(table):
+    return [
+        f'DROP TRIGGER IF EXISTS {table}_ai',
+        f'DROP TRIGGER IF EXISTS {table}_ad',
+        f'DROP TRIGGER IF EXISTS {table}_au',
+        f'DROP TABLE IF EXISTS {table}',
+    ]
+
+
+def rebuild_index(table, using=connection):
+    """Пересоздаёт таблицу индекса и триггеры и заполняет индекс заново."""
+    with transaction.atomic(using=using.alias), using.cursor() as cursor:
+        for sql in drop_index_sql(table) + create_index_sql(table):
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+
+def ensure_indexes(using=connection):
+    """Восстанавливает индексы, у которых пропали таблица или триггеры.
+    SQLite пересоздаёт таблицу модели при многих изменениях схемы
+    (например, AddField), и триггеры старой таблицы при этом удаляются,
+    поэтому проверка выполняется после каждого migrate.
+    """
+    if not fts_available(using):
+        return []
+    with using.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master")
+        existing = {row[0] for row in cursor.fetchall()}
+    rebuilt = []
+    for table in FTS_INDEXES:
+        required = {table, f'{table}_ai', f'{table}_ad', f'{table}_au'}
+        if not required <= existing:
+            rebuild_index(table, using)
+            rebuilt.append(table)
+    return rebuilt
+
+
+def build_match_query(text):
+    """Переводит пользовательскую строку в безопасный запрос FTS5.
+    Каждое слово берётся в кавычки (операторы FTS5 не интерпретируются)
+    и ищется по префиксу; слова объединяются через AND.
+    """
+    return ' '.join(f'"{term}"*' for term in FTS_TERM_RE.findall(text))
+
+
+def full_text_search(queryset, table, text):
+    """Оставляет в queryset совпавшие с text записи, лучшие - первыми.
+    Без FTS5 (не SQLite) используется поиск подстроки по тем же полям.
+    """
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+    index = FTS_INDEXES[table]
+    if not fts_available():
+        condition = Q()
+        for column in index['columns']:
+            condition |= Q(**{f'{column}__icontains': text})
+        return queryset.filter(condition)
+    content = index['content']
+    weights = ', '.join(str(weight) for weight in index['weights'])
+    return queryset.extra(
+        tables=[table],
+        where=[f'{table}.rowid = {content}.id', f'{table} MATCH %s'],
+        params=[match],
+        select={'search_rank': f'bm25({table}, {weights})'},
+        order_by=['search_rank'],
+    )
+
+
+def search_titles(queryset, text):
+    return full_text_search(queryset, 'reviews_title_fts', text)
+
+
+def search_reviews(queryset, text):
+    return full_text_search(queryset, 'reviews_review_fts', text)
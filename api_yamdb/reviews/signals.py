@@ -0,0 +1,41 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Review, Title
+from .ratings import recalculate_ratings, update_title_rating
+from .search import ensure_indexes
+
+
+@receiver(post_init, sender=Review)
+def remember_review_score(sender, instance, **kwargs):
+    # Запоминаем оценку на момент загрузки, чтобы при редактировании
+    # изменить сумму оценок на разницу, а не пересчитывать её целиком.
+    instance._saved_score = instance.__dict__.get('score')
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    if created:
+        update_title_rating(instance.title_id, 1, instance.score)
+    elif instance._saved_score is None:
+        # Оценка не была загружена (отложенное поле) - разницу не узнать.
+        recalculate_ratings(Title.objects.filter(pk=instance.title_id))
+    elif instance.score != instance._saved_score:
+        update_title_rating(
+            instance.title_id, 0, instance.score - instance._saved_score
+        )
+    instance._saved_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    # Срабатывает и при каскадном удалении отзывов вместе с автором
+    # или произведением.
+    update_title_rating(instance.title_id, -1, -instance.score)
+
+
+def restore_search_indexes(sender, using, **kwargs):
+    # Миграции сами восстанавливают триггеры; проверка после migrate
+    # страхует от будущих миграций, которые пересоздадут таблицу.
+    ensure_indexes(connections[using])
@@ -0,0 +1,166 @@
+import csv
+import math
+import random
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+
+from .loader import MODELS_FILES
+from .models import (
+    Category, Comments, Genre, GenreTitle, Review, Title, User
+)
+
+# Все значения выводятся из seed: одинаковые параметры дают
+# одинаковые файлы байт в байт, поэтому замеры на них сравнимы.
+WORDS = (
+    'время', 'город', 'дорога', 'жизнь', 'звезда', 'зима', 'игра', 'история',
+    'космос', 'лето', 'любовь', 'море', 'ночь', 'остров', 'память', 'песня',
+    'письмо', 'поезд', 'путь', 'река', 'свет', 'сердце', 'сон', 'тайна',
+    'тень', 'утро', 'финал', 'ветер', 'война', 'дом', 'мечта', 'небо',
+)
+CATEGORY_NAMES = ('Фильм', 'Книга', 'Музыка', 'Сериал', 'Игра', 'Спектакль')
+ROLES = (('user', 0.98), ('moderator', 0.015), ('admin', 0.005))
+SCORE_WEIGHTS = (1, 1, 2, 3, 4, 6, 8, 9, 7, 5)
+START_DATE = datetime(2015, 1, 1, tzinfo=timezone.utc)
+DATE_RANGE_SECONDS = 8 * 365 * 24 * 3600
+YEARS = (1900, 2020)
+MAX_GENRES_PER_TITLE = 3
+
+HEADERS = {
+    User: ('id', 'username', 'email', 'role', 'bio', 'first_name',
+           'last_name'),
+    Category: ('id', 'name', 'slug'),
+    Genre: ('id', 'name', 'slug'),
+    Title: ('id', 'name', 'year', 'category_id', 'description'),
+    GenreTitle: ('id', 'title_id', 'genre_id'),
+    Review: ('id', 'title_id', 'text', 'author_id', 'score', 'pub_date'),
+    Comments: ('id', 'review_id', 'text', 'author_id', 'pub_date'),
+}
+
+
+def format_date(value):
+    return value.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+class DatasetGenerator:
+    """Согласованный набор файлов для loadcsv заданного размера.
+    Количество отзывов на произведение распределено по Парето с
+    показателем alpha: у немногих произведений тысячи отзывов, у
+    большинства - единицы, как на реальном сайте. Комментарии к отзыву
+    распределены экспоненциально со средним comments_per_review.
+    """
+
+    def __init__(self, users, titles, genres, categories, reviews_per_title,
+                 comments_per_review, alpha=1.5, seed=0):
+        self.users = users
+        self.titles = titles
+        self.genres = genres
+        self.categories = categories
+        self.reviews_per_title = reviews_per_title
+        self.comments_per_review = comments_per_review
+        self.alpha = alpha
+        self.random = random.Random(seed)
+        self.counts = dict.fromkeys(HEADERS, 0)
+
+    def words(self, low, high):
+        count = self.random.randint(low, high)
+        return ' '.join(self.random.choices(WORDS, k=count))
+
+    def date_after(self, start, seconds=DATE_RANGE_SECONDS):
+        return start + timedelta(seconds=self.random.randrange(seconds))
+
+    def generate(self, directory):
+        """Пишет файлы в каталог directory, возвращает {модель: строк}."""
+        directory.mkdir(parents=True, exist_ok=True)
+        with ExitStack() as stack:
+            self.writers = {}
+            for model, header in HEADERS.items():
+                csvfile = stack.enter_context(open(
+                    directory / MODELS_FILES[model], 'w', encoding='utf-8',
+                    newline=''
+                ))
+                self.writers[model] = csv.writer(csvfile)
+                self.writers[model].writerow(header)
+            self.write_users()
+            self.write_dictionary(Category, self.categories, CATEGORY_NAMES)
+            self.write_dictionary(Genre, self.genres, WORDS)
+            self.write_titles()
+        return self.counts
+
+    def write(self, model, *row):
+        self.counts[model] += 1
+        self.writers[model].writerow(row)
+
+    def write_users(self):
+        roles, weights = zip(*ROLES)
+        for user_id in range(1, self.users + 1):
+            username = f'user{user_id}'
+            # Первый пользователь - всегда администратор.
+            role = 'admin' if user_id == 1 else self.random.choices(
+                roles, weights
+            )[0]
+            self.write(
+                User, user_id, username, f'{username}@yamdb.fake', role,
+                self.words(0, 8), '', ''
+            )
+
+    def write_dictionary(self, model, count, names):
+        for pk in range(1, count + 1):
+            name = names[(pk - 1) % len(names)].capitalize()
+            if pk > len(names):
+                name = f'{name} {pk}'
+            self.write(model, pk, name, f'{model.__name__.lower()}{pk}')
+
+    def review_count(self):
+        # Среднее распределения Парето - alpha / (alpha - 1).
+        scale = self.reviews_per_title * (self.alpha - 1) / self.alpha
+        count = round(self.random.paretovariate(self.alpha) * scale)
+        return min(count, self.users)
+
+    def write_titles(self):
+        genre_ids = range(1, self.genres + 1)
+        for title_id in range(1, self.titles + 1):
+            self.write(
+                Title, title_id, self.words(1, 4).capitalize(),
+                self.random.randint(*YEARS),
+                self.random.randint(1, self.categories)
+                if self.categories else '',
+                self.words(5, 30)
+            )
+            for genre_id in self.random.sample(
+                genre_ids, min(self.genres, MAX_GENRES_PER_TITLE)
+            ):
+                self.write(
+                    GenreTitle, self.counts[GenreTitle] + 1, title_id,
+                    genre_id
+                )
+            self.write_reviews(title_id)
+
+    def write_reviews(self, title_id):
+        authors = self.random.sample(
+            range(1, self.users + 1), self.review_count()
+        )
+        for author_id in authors:
+            review_id = self.counts[Review] + 1
+            pub_date = self.date_after(START_DATE)
+            self.write(
+                Review, review_id, title_id, self.words(3, 60), author_id,
+                self.random.choices(range(1, 11), SCORE_WEIGHTS)[0],
+                format_date(pub_date)
+            )
+            self.write_comments(review_id, pub_date)
+
+    def write_comments(self, review_id, review_date):
+        if not self.comments_per_review:
+            return
+        # Целая часть экспоненциальной величины с параметром
+        # ln(1 + 1/mean) распределена геометрически со средним mean;
+        # int(expovariate(1/mean)) дал бы в среднем около mean - 0.5.
+        count = int(self.random.expovariate(
+            math.log(1 + 1 / self.comments_per_review)
+        ))
+        for _ in range(count):
+            self.write(
+                Comments, self.counts[Comments] + 1, review_id,
+                self.words(2, 30), self.random.randint(1, self.users),
+                format_date(self.date_after(review_date, 30 * 24 * 3600))
+            )
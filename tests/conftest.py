@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,3 +34,45 @@ assert get_version() < '4.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True)
+def strict_n_plus_one(settings):
+    """Любой N+1 в запросе к API роняет тест."""
+    settings.N_PLUS_ONE = {**settings.N_PLUS_ONE, 'MODE': 'strict'}
+
+
+@pytest.fixture(autouse=True)
+def cache_directory(settings, tmp_path):
+    """Файловый кеш у каждого теста свой."""
+    settings.CACHES = {
+        'default': {
+            **settings.CACHES['default'], 'LOCATION': tmp_path / 'cache'
+        }
+    }
+    return settings.CACHES['default']['LOCATION']
+
+
+@pytest.fixture(autouse=True)
+def metrics_directory(settings, tmp_path):
+    """Файлы метрик пишутся во временный каталог теста."""
+    settings.METRICS = {**settings.METRICS, 'DIRECTORY': tmp_path / 'metrics'}
+    return settings.METRICS['DIRECTORY']
+
+
+@pytest.fixture(autouse=True)
+def slow_queries_directory(settings, tmp_path):
+    """Журнал медленных запросов пишется во временный каталог теста."""
+    settings.SLOW_QUERIES = {
+        **settings.SLOW_QUERIES, 'DIRECTORY': tmp_path / 'slow_queries'
+    }
+    return settings.SLOW_QUERIES['DIRECTORY']
+
+
+@pytest.fixture(autouse=True)
+def throttle_database(settings, tmp_path):
+    """Корзины ограничения частоты у каждого теста свои."""
+    settings.THROTTLE = {
+        **settings.THROTTLE, 'DATABASE': tmp_path / 'throttle.sqlite3'
+    }
+    return settings.THROTTLE['DATABASE']
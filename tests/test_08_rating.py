@@ -0,0 +1,107 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Avg
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08TitleRating:
+
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+
+    def check_counters(self, title_id):
+        from reviews.models import Title
+        title = Title.objects.get(pk=title_id)
+        reviews = title.reviews.all()
+        expected_avg = reviews.aggregate(avg=Avg('score'))['avg']
+        assert title.reviews_count == reviews.count(), (
+            'Проверьте, что поле `reviews_count` произведения совпадает с '
+            'количеством его отзывов.'
+        )
+        assert title.score_sum == sum(r.score for r in reviews), (
+            'Проверьте, что поле `score_sum` произведения совпадает с '
+            'суммой оценок его отзывов.'
+        )
+        expected = None if expected_avg is None else int(expected_avg)
+        assert title.rating == expected, (
+            'Проверьте, что поле `rating` произведения равно средней оценке '
+            'его отзывов.'
+        )
+        return title
+
+    def test_01_rating_follows_review_changes(self, admin_client, user_client,
+                                              moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        self.check_counters(title_id)
+
+        create_single_review(admin_client, title_id, 'Плохо', 3)
+        response = create_single_review(user_client, title_id, 'Хорошо', 6)
+        review_id = response.json()['id']
+        create_single_review(moderator_client, title_id, 'Так себе', 4)
+        title = self.check_counters(title_id)
+        assert title.rating == 4
+
+        response = user_client.patch(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=review_id
+            ),
+            data={'score': 10}
+        )
+        assert response.status_code == HTTPStatus.OK
+        title = self.check_counters(title_id)
+        assert title.rating == 5
+
+        response = user_client.delete(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=review_id
+            )
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        self.check_counters(title_id)
+
+        response = admin_client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        )
+        assert response.json().get('rating') == 3, (
+            'Проверьте, что эндпоинт произведения возвращает сохранённый '
+            'рейтинг.'
+        )
+
+    def test_02_rating_follows_cascade_delete(self, admin_client, user,
+                                              user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(admin_client, title_id, 'Отлично', 9)
+        create_single_review(user_client, title_id, 'Ужасно', 1)
+        self.check_counters(title_id)
+
+        user.delete()
+        title = self.check_counters(title_id)
+        assert title.rating == 9
+
+    def test_03_recalcratings_command(self, admin_client, user_client):
+        from reviews.models import Title
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(admin_client, title_id, 'Отлично', 9)
+        create_single_review(user_client, title_id, 'Неплохо', 6)
+
+        url = f'/api/v1/titles/{title_id}/'
+        etag = admin_client.get(url)['ETag']
+        Title.objects.update(rating=None, reviews_count=0, score_sum=0)
+        call_command('recalcratings')
+        title = self.check_counters(title_id)
+        assert title.rating == 7
+        self.check_counters(titles[1]['id'])
+        response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что `recalcratings` сбрасывает версии кеша '
+            'каталога.'
+        )
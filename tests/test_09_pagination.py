@@ -0,0 +1,164 @@
+from base64 import b64encode
+from http import HTTPStatus
+from urllib.parse import urlencode
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09CursorPagination:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def create_many_titles(self, admin_client, count):
+        from reviews.models import Title
+        titles, _, _ = create_titles(admin_client)
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {idx}', year=2000) for idx in range(
+                count - len(titles)
+            )
+        )
+        return list(Title.objects.order_by('id').values_list('id', flat=True))
+
+    def walk(self, client, url):
+        ids = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK, (
+                f'Проверьте, что GET-запрос к `{url}` с параметром `cursor` '
+                'возвращает ответ со статусом 200.'
+            )
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что в курсорном режиме ответ не содержит `count`.'
+            )
+            ids.extend(element['id'] for element in data['results'])
+            url = data['next']
+        return ids
+
+    def test_01_titles_cursor_walk(self, client, admin_client):
+        expected_ids = self.create_many_titles(admin_client, 12)
+        ids = self.walk(client, f'{self.TITLES_URL}?cursor=&limit=5')
+        assert ids == expected_ids, (
+            f'Проверьте, что курсорная пагинация `{self.TITLES_URL}` '
+            'возвращает все произведения ровно один раз в порядке `id`.'
+        )
+
+    def test_02_titles_cursor_without_count_query(self, client,
+                                                  admin_client):
+        self.create_many_titles(admin_client, 12)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'{self.TITLES_URL}?cursor=')
+        assert response.status_code == HTTPStatus.OK
+        assert not any(
+            'COUNT(' in query['sql'].upper() for query in context
+        ), (
+            'Проверьте, что курсорная пагинация не выполняет COUNT-запрос.'
+        )
+
+    def test_03_titles_cursor_with_filter(self, client, admin_client):
+        self.create_many_titles(admin_client, 12)
+        ids = self.walk(client, f'{self.TITLES_URL}?cursor=&year=2000&limit=3')
+        assert len(ids) == 10, (
+            'Проверьте, что курсорная пагинация учитывает фильтры '
+            f'`{self.TITLES_URL}`.'
+        )
+
+    def test_04_titles_offset_still_available(self, client, admin_client):
+        expected_ids = self.create_many_titles(admin_client, 12)
+        response = client.get(f'{self.TITLES_URL}?limit=5&offset=5')
+        data = response.json()
+        assert data['count'] == 12
+        assert [element['id'] for element in data['results']] == (
+            expected_ids[5:10]
+        ), (
+            f'Проверьте, что `{self.TITLES_URL}` по-прежнему поддерживает '
+            'пагинацию limit/offset.'
+        )
+
+    def test_05_reviews_cursor_stable_on_insert(self, client, admin_client,
+                                                admin):
+        from reviews.models import Review, Title, User
+        titles, _, _ = create_titles(admin_client)
+        title = Title.objects.get(pk=titles[0]['id'])
+        authors = [
+            User.objects.create(
+                username=f'reader{idx}', email=f'reader{idx}@yamdb.fake'
+            ) for idx in range(7)
+        ]
+        for idx, author in enumerate(authors):
+            Review.objects.create(
+                title=title, author=author, text=f'Отзыв {idx}', score=5
+            )
+        expected_ids = list(
+            title.reviews.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = client.get(f'{url}?cursor=&limit=3')
+        data = response.json()
+        ids = [element['id'] for element in data['results']]
+
+        Review.objects.create(
+            title=title, author=admin, text='Новый отзыв', score=7
+        )
+        ids.extend(self.walk(client, data['next']))
+        assert ids == expected_ids, (
+            f'Проверьте, что курсорная пагинация `{url}` отдаёт отзывы '
+            'от новых к старым без пропусков и повторов, даже если во '
+            'время обхода добавлен новый отзыв.'
+        )
+
+        response = client.get(data['next'])
+        previous = response.json()['previous']
+        response = client.get(previous)
+        assert [element['id'] for element in response.json()['results']] == (
+            expected_ids[:3]
+        ), (
+            f'Проверьте, что ссылка `previous` для `{url}` возвращает '
+            'предыдущую страницу.'
+        )
+
+    def test_06_comments_cursor_walk(self, client, admin_client, admin):
+        from reviews.models import Comments, Review, Title
+        titles, _, _ = create_titles(admin_client)
+        review = Review.objects.create(
+            title=Title.objects.get(pk=titles[0]['id']), author=admin,
+            text='Отзыв', score=5
+        )
+        Comments.objects.bulk_create(
+            Comments(review=review, author=admin, text=f'Комментарий {idx}')
+            for idx in range(8)
+        )
+        expected_ids = list(
+            review.comments.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{review.id}/comments/'
+        ids = self.walk(client, f'{url}?cursor=&limit=3')
+        assert ids == expected_ids, (
+            f'Проверьте, что курсорная пагинация `{url}` возвращает все '
+            'комментарии ровно один раз.'
+        )
+
+    @pytest.mark.parametrize('position', (
+        'abc', '99999999999999999999', 'notadate|1',
+        '2024-01-01T00:00:00|abc', '1|2|3',
+    ))
+    def test_07_tampered_cursor(self, client, admin_client, position):
+        titles, _, _ = create_titles(admin_client)
+        cursor = b64encode(urlencode({'p': position}).encode()).decode()
+        for url in (
+            self.TITLES_URL, f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        ):
+            response = client.get(url, {'cursor': cursor})
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                f'Проверьте, что испорченный курсор в `{url}` возвращает '
+                'ответ со статусом 404.'
+            )
@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10FullTextSearch:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    def get_names(self, client, url):
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает ответ со '
+            'статусом 200.'
+        )
+        return [element['name'] for element in response.json()['results']]
+
+    def test_01_title_search(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.post(self.TITLES_URL, data={
+            'name': 'Назад в будущее',
+            'year': 1985,
+            'genre': [titles[0]['genre'][0]],
+            'category': titles[0]['category'],
+            'description': 'Терминатор тут ни при чём.'
+        })
+
+        names = self.get_names(client, f'{self.TITLES_URL}?search=терминатор')
+        assert names == ['Терминатор', 'Назад в будущее'], (
+            f'Проверьте, что параметр `search` эндпоинта `{self.TITLES_URL}` '
+            'ищет по названию и описанию без учёта регистра, а совпадения '
+            'в названии идут первыми.'
+        )
+        names = self.get_names(client, f'{self.TITLES_URL}?search=орешек')
+        assert names == ['Крепкий орешек']
+        names = self.get_names(client, f'{self.TITLES_URL}?search=креп')
+        assert names == ['Крепкий орешек'], (
+            'Проверьте, что поиск находит слова по префиксу.'
+        )
+        names = self.get_names(client, f'{self.TITLES_URL}?search="OR')
+        assert names == []
+
+    def test_02_title_search_follows_updates(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'{self.TITLES_URL}{titles[1]["id"]}/'
+        admin_client.patch(url, data={'name': 'Крепкий орех'})
+        names = self.get_names(client, f'{self.TITLES_URL}?search=орешек')
+        assert names == [], (
+            'Проверьте, что индекс обновляется при изменении произведения.'
+        )
+        admin_client.delete(url)
+        names = self.get_names(client, f'{self.TITLES_URL}?search=орех')
+        assert names == []
+
+    def test_03_review_search(self, client, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(admin_client, title_id, 'Отличный боевик', 9)
+        create_single_review(user_client, title_id, 'Скучная драма', 3)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title_id)
+        response = client.get(f'{url}?search=Боевик')
+        texts = [element['text'] for element in response.json()['results']]
+        assert texts == ['Отличный боевик'], (
+            f'Проверьте, что параметр `search` эндпоинта `{url}` ищет '
+            'по тексту отзывов.'
+        )
+
+    def test_04_rebuildsearch_command(self, client, admin_client):
+        create_titles(admin_client)
+        call_command('rebuildsearch')
+        names = self.get_names(client, f'{self.TITLES_URL}?search=терминатор')
+        assert names == ['Терминатор'], (
+            'Проверьте, что после перестроения индекса поиск работает.'
+        )
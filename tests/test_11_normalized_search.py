@@ -0,0 +1,141 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11NormalizedSearch:
+
+    TITLES_URL = '/api/v1/titles/'
+    GENRES_URL = '/api/v1/genres/'
+    CATEGORY_URL = '/api/v1/categories/'
+    USERS_URL = '/api/v1/users/'
+
+    def get_results(self, client, url, key='name'):
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает ответ со '
+            'статусом 200.'
+        )
+        return sorted(element[key] for element in response.json()['results'])
+
+    def test_01_title_name_filter_is_case_insensitive(self, client,
+                                                      admin_client):
+        create_titles(admin_client)
+        for query in ('терминатор', 'ТЕРМИНАТОР', 'ТерМ'):
+            names = self.get_results(client, f'{self.TITLES_URL}?name={query}')
+            assert names == ['Терминатор'], (
+                f'Проверьте, что фильтр `name` эндпоинта `{self.TITLES_URL}` '
+                'не учитывает регистр кириллических символов.'
+            )
+        names = self.get_results(client, f'{self.TITLES_URL}?name=ОРЕШ')
+        assert names == ['Крепкий орешек'], (
+            f'Проверьте, что фильтр `name` эндпоинта `{self.TITLES_URL}` '
+            'находит совпадения не только в начале названия.'
+        )
+
+    def test_02_prefix_and_substring_matches(self, client, admin_client):
+        from reviews.models import Title
+        create_titles(admin_client)
+        Title.objects.create(name='Орешки', year=2000)
+        names = self.get_results(client, f'{self.TITLES_URL}?name=ореш')
+        assert names == ['Крепкий орешек', 'Орешки'], (
+            'Проверьте, что фильтр `name` находит совпадения по подстроке.'
+        )
+        names = self.get_results(
+            client, f'{self.TITLES_URL}?name_prefix=ОРЕШ'
+        )
+        assert names == ['Орешки'], (
+            'Проверьте, что фильтр `name_prefix` находит только названия, '
+            'которые начинаются со строки поиска.'
+        )
+
+    def test_03_genre_and_category_search(self, client, admin_client):
+        create_titles(admin_client)
+        names = self.get_results(client, f'{self.GENRES_URL}?search=УЖАСЫ')
+        assert names == ['Ужасы'], (
+            f'Проверьте, что поиск `{self.GENRES_URL}` не учитывает регистр.'
+        )
+        names = self.get_results(client, f'{self.CATEGORY_URL}?search=фильм')
+        assert names == ['Фильм'], (
+            f'Проверьте, что поиск `{self.CATEGORY_URL}` не учитывает '
+            'регистр.'
+        )
+
+    def test_04_username_search(self, admin_client, django_user_model):
+        django_user_model.objects.create(
+            username='Иван_Петров', email='ivan@yamdb.fake'
+        )
+        usernames = self.get_results(
+            admin_client, f'{self.USERS_URL}?search=иван', key='username'
+        )
+        assert usernames == ['Иван_Петров'], (
+            f'Проверьте, что поиск `{self.USERS_URL}` по username не '
+            'учитывает регистр.'
+        )
+
+    def test_05_normalized_name_follows_updates(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(
+            f'{self.TITLES_URL}{titles[0]["id"]}/', data={'name': 'Чужой'}
+        )
+        names = self.get_results(client, f'{self.TITLES_URL}?name=чужой')
+        assert names == ['Чужой']
+
+    def test_06_migration_keeps_search_triggers(self):
+        from django.db import connection
+        from django.db.migrations.executor import MigrationExecutor
+
+        def get_triggers():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+                )
+                return {row[0] for row in cursor.fetchall()}
+
+        executor = MigrationExecutor(connection)
+        try:
+            executor.migrate([('reviews', '0008_full_text_search')])
+            triggers_after_rollback = get_triggers()
+            executor.loader.build_graph()
+            executor.migrate([('reviews', '0009_normalized_names')])
+            triggers = get_triggers()
+        finally:
+            executor.loader.build_graph()
+            executor.migrate(executor.loader.graph.leaf_nodes())
+        title_triggers = {
+            'reviews_title_fts_ai', 'reviews_title_fts_ad',
+            'reviews_title_fts_au',
+        }
+        assert title_triggers <= triggers, (
+            'Проверьте, что миграция 0009 сама восстанавливает триггеры '
+            'поискового индекса произведений.'
+        )
+        assert title_triggers <= triggers_after_rollback, (
+            'Проверьте, что откат миграции 0009 сохраняет триггеры '
+            'поискового индекса произведений.'
+        )
+
+    def test_07_name_prefix_uses_index(self, client, admin_client):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        create_titles(admin_client)
+        with CaptureQueriesContext(connection) as context:
+            self.get_results(client, f'{self.TITLES_URL}?name_prefix=терм')
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if 'name_normalized" >=' in query['sql']
+        ]
+        assert queries, 'Проверьте, что `name_prefix` ищет диапазоном.'
+        with connection.cursor() as cursor:
+            for sql in queries:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+                assert 'reviews_title_name_normalized' in plan, (
+                    'Проверьте, что фильтр `name_prefix` использует индекс '
+                    'по `name_normalized`.'
+                )
+                assert 'LIKE' not in sql
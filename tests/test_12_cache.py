@@ -0,0 +1,103 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12CatalogCache:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    GENRES_URL = '/api/v1/genres/'
+
+    def test_01_repeated_get_is_served_from_cache(self, client,
+                                                  admin_client):
+        create_titles(admin_client)
+        url = f'{self.TITLES_URL}?year=1984&limit=5'
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        with CaptureQueriesContext(connection) as context:
+            cached = client.get(f'{self.TITLES_URL}?limit=5&year=1984')
+        assert cached.status_code == HTTPStatus.OK
+        assert cached['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный GET-запрос с теми же параметрами в '
+            'другом порядке отдаётся из кеша.'
+        )
+        assert cached.json() == response.json()
+        assert len(context) == 0, (
+            'Проверьте, что ответ из кеша не выполняет SQL-запросов.'
+        )
+
+    def test_02_review_invalidates_title(self, client, admin_client,
+                                         user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        assert client.get(url).json()['rating'] is None
+        client.get(self.TITLES_URL)
+        create_single_review(admin_client, titles[0]['id'], 'Отлично', 8)
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['rating'] == 8, (
+            'Проверьте, что новый отзыв сбрасывает кеш произведения.'
+        )
+        results = client.get(self.TITLES_URL).json()['results']
+        ratings = {element['id']: element['rating'] for element in results}
+        assert ratings[titles[0]['id']] == 8, (
+            'Проверьте, что новый отзыв сбрасывает кеш списка произведений.'
+        )
+        other_url = self.TITLE_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[1]['id']
+        )
+        client.get(other_url)
+        create_single_review(user_client, titles[0]['id'], 'Так себе', 2)
+        assert client.get(other_url)['X-Cache'] == 'HIT', (
+            'Проверьте, что отзыв не сбрасывает кеш других произведений.'
+        )
+
+    def test_03_genre_change_invalidates_titles(self, client, admin_client):
+        from reviews.models import Genre
+        titles, _, genres = create_titles(admin_client)
+        url = self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        client.get(url)
+        client.get(self.GENRES_URL)
+        genre = Genre.objects.get(slug=genres[0]['slug'])
+        genre.name = 'Хоррор'
+        genre.save()
+        names = {element['name'] for element in client.get(url).json()['genre']}
+        assert 'Хоррор' in names, (
+            'Проверьте, что изменение жанра сбрасывает кеш произведений.'
+        )
+        response = client.get(self.GENRES_URL)
+        assert response['X-Cache'] == 'MISS'
+
+    def test_04_stale_response_while_refreshing(self, client, admin_client):
+        from api import cache
+        create_titles(admin_client)
+        first = client.get(self.GENRES_URL)
+        key = cache.get_response_key(first.wsgi_request)
+        cache.bump_versions('genres')
+        assert cache.acquire_lock(key)
+        try:
+            response = client.get(self.GENRES_URL)
+            assert response['X-Cache'] == 'STALE', (
+                'Проверьте, что пока другой воркер обновляет ответ, '
+                'отдаётся устаревшая копия.'
+            )
+            assert response['ETag'] == first['ETag'], (
+                'Проверьте, что устаревший ответ отдаётся с ETag версий, '
+                'с которыми он построен.'
+            )
+        finally:
+            cache.release_lock(key)
+        response = client.get(
+            self.GENRES_URL, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после обновления ответа ETag устаревшей копии '
+            'не даёт 304.'
+        )
+        assert response['X-Cache'] == 'MISS'
@@ -0,0 +1,142 @@
+import multiprocessing
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import (create_single_comment, create_single_review,
+                         create_titles)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13ConditionalGet:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def check_not_modified(self, client, url, response):
+        etag = response.get('ETag')
+        assert etag, (
+            f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+            'заголовок `ETag`.'
+        )
+        assert response.get('Last-Modified'), (
+            f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+            'заголовок `Last-Modified`.'
+        )
+        with CaptureQueriesContext(connection) as context:
+            repeated = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert repeated.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{url}` с актуальным '
+            '`If-None-Match` возвращает ответ со статусом 304.'
+        )
+        assert len(context) == 0, (
+            'Проверьте, что ответ 304 отдаётся без запросов к базе данных.'
+        )
+        return etag
+
+    def test_01_titles_etag(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        for url in (
+            self.TITLES_URL,
+            f'{self.TITLES_URL}{titles[0]["id"]}/',
+            '/api/v1/genres/',
+            '/api/v1/categories/',
+        ):
+            self.check_not_modified(client, url, client.get(url))
+
+        url = f'{self.TITLES_URL}{titles[0]["id"]}/'
+        etag = client.get(url)['ETag']
+        admin_client.patch(url, data={'description': 'Новое описание'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после изменения произведения старый `ETag` '
+            'больше не подходит.'
+        )
+        assert response.json()['description'] == 'Новое описание'
+
+    def test_02_reviews_and_comments_etag(self, client, admin_client,
+                                          user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        review_id = create_single_review(
+            admin_client, title_id, 'Отзыв', 5
+        ).json()['id']
+        reviews_url = self.REVIEWS_URL_TEMPLATE.format(title_id=title_id)
+        comments_url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=title_id, review_id=review_id
+        )
+        reviews_etag = self.check_not_modified(
+            client, reviews_url, client.get(reviews_url)
+        )
+        comments_etag = self.check_not_modified(
+            client, comments_url, client.get(comments_url)
+        )
+
+        create_single_comment(user_client, title_id, review_id, 'Согласен')
+        response = client.get(comments_url, HTTP_IF_NONE_MATCH=comments_etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что новый комментарий меняет `ETag` списка '
+            'комментариев.'
+        )
+        response = client.get(reviews_url, HTTP_IF_NONE_MATCH=reviews_etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        create_single_review(user_client, title_id, 'Ещё отзыв', 7)
+        response = client.get(reviews_url, HTTP_IF_NONE_MATCH=reviews_etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что новый отзыв меняет `ETag` списка отзывов.'
+        )
+
+    def test_03_if_modified_since(self, client, admin_client):
+        create_titles(admin_client)
+        response = client.get(self.TITLES_URL)
+        response = client.get(
+            self.TITLES_URL,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что GET-запрос с актуальным `If-Modified-Since` '
+            'возвращает ответ со статусом 304.'
+        )
+
+    def test_04_head_without_body(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'{self.TITLES_URL}{titles[0]["id"]}/'
+        response = client.head(url)
+        assert response.status_code == HTTPStatus.OK
+        assert response['ETag'] == client.get(url)['ETag']
+        assert response.content == b''
+        response = client.head(f'{self.TITLES_URL}0/')
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что HEAD-запрос к несуществующему произведению '
+            'возвращает ответ со статусом 404.'
+        )
+        response = client.head(
+            self.REVIEWS_URL_TEMPLATE.format(title_id=0)
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_05_versions_shared_between_workers(self, client,
+                                                admin_client):
+        from api import cache
+        create_titles(admin_client)
+        url = '/api/v1/genres/'
+        etag = client.get(url)['ETag']
+        # Данные меняет другой воркер - отдельный процесс со своей памятью.
+        worker = multiprocessing.get_context('fork').Process(
+            target=cache.bump_versions, args=('genres',)
+        )
+        worker.start()
+        worker.join()
+        assert worker.exitcode == 0
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что изменение данных в одном воркере меняет '
+            '`ETag` в остальных.'
+        )
+        assert response['ETag'] != etag
@@ -0,0 +1,77 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14SparseFieldsets:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    def get_with_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает ответ со '
+            'статусом 200.'
+        )
+        return response.json(), [query['sql'] for query in context]
+
+    def test_01_title_list_fields(self, client, admin_client):
+        create_titles(admin_client)
+        data, queries = self.get_with_queries(
+            client, f'{self.TITLES_URL}?fields=id,name,rating'
+        )
+        for element in data['results']:
+            assert set(element) == {'id', 'name', 'rating'}, (
+                'Проверьте, что параметр `fields` оставляет в ответе только '
+                'запрошенные поля.'
+            )
+        assert not any('"description"' in sql for sql in queries), (
+            'Проверьте, что незапрошенное поле `description` не '
+            'загружается из базы данных.'
+        )
+        assert not any('reviews_genre' in sql for sql in queries), (
+            'Проверьте, что жанры не загружаются, если поле `genre` не '
+            'запрошено.'
+        )
+        assert not any('reviews_category' in sql for sql in queries)
+
+    def test_02_title_detail_fields(self, client, admin_client):
+        titles, categories, _ = create_titles(admin_client)
+        data, _ = self.get_with_queries(
+            client,
+            f'{self.TITLES_URL}{titles[0]["id"]}/?fields=name,category'
+        )
+        assert data == {
+            'name': titles[0]['name'],
+            'category': categories[0],
+        }
+
+    def test_03_full_response_by_default(self, client, admin_client):
+        create_titles(admin_client)
+        data, _ = self.get_with_queries(client, self.TITLES_URL)
+        assert set(data['results'][0]) == {
+            'id', 'name', 'year', 'rating', 'description', 'genre',
+            'category'
+        }
+
+    def test_04_review_fields(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(admin_client, titles[0]['id'], 'Длинный текст', 6)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        data, queries = self.get_with_queries(
+            client, f'{url}?fields=id,score'
+        )
+        assert [set(element) for element in data['results']] == [
+            {'id', 'score'}
+        ]
+        assert not any('"text"' in sql for sql in queries), (
+            'Проверьте, что незапрошенный текст отзыва не загружается из '
+            'базы данных.'
+        )
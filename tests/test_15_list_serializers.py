@@ -0,0 +1,83 @@
+import pytest
+from rest_framework import serializers as drf_serializers
+from rest_framework.renderers import JSONRenderer
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15CompiledListSerializer:
+
+    def render_both(self, serializer_class, queryset, context=None):
+        context = context or {}
+        compiled = serializer_class(queryset, many=True, context=context)
+        reference = drf_serializers.ListSerializer(
+            queryset, child=serializer_class(context=context),
+            context=context
+        )
+        renderer = JSONRenderer()
+        return renderer.render(compiled.data), renderer.render(reference.data)
+
+    def check_parity(self, serializer_class, queryset, context=None):
+        compiled, reference = self.render_both(
+            serializer_class, queryset, context
+        )
+        assert compiled == reference, (
+            f'Проверьте, что быстрая сериализация списков '
+            f'{serializer_class.__name__} даёт тот же JSON, что и '
+            'стандартная.'
+        )
+
+    def test_01_titles_parity(self, admin_client, user_client):
+        from api.serializers import TitleReadSerializer
+        from reviews.models import Title
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(admin_client, titles[0]['id'], 'Отлично', 9)
+        create_single_review(user_client, titles[0]['id'], 'Неплохо', 6)
+        Title.objects.create(
+            name='Без категории «и жанров»', year=1999, description=''
+        )
+        queryset = Title.objects.select_related('category').prefetch_related(
+            'genre'
+        ).order_by('id')
+        self.check_parity(TitleReadSerializer, queryset)
+        self.check_parity(
+            TitleReadSerializer, queryset,
+            {'requested_fields': {'id', 'rating', 'genre'}}
+        )
+
+    def test_02_reviews_and_comments_parity(self, admin_client, user_client):
+        from api.serializers import CommentSerializer, ReviewSerializer
+        from reviews.models import Comments, Review
+        titles, _, _ = create_titles(admin_client)
+        for client, title in ((admin_client, titles[0]),
+                              (user_client, titles[0]),
+                              (user_client, titles[1])):
+            review = create_single_review(
+                client, title['id'], 'Текст отзыва\nс переносом', 7
+            ).json()
+            client.post(
+                f'/api/v1/titles/{title["id"]}/reviews/{review["id"]}'
+                '/comments/',
+                data={'text': 'Комментарий'}
+            )
+        self.check_parity(ReviewSerializer, Review.objects.order_by('id'))
+        self.check_parity(CommentSerializer, Comments.objects.order_by('id'))
+
+    def test_03_nested_objects_are_shared(self, admin_client):
+        from api.serializers import TitleReadSerializer
+        from reviews.models import Title
+        titles, _, _ = create_titles(admin_client)
+        Title.objects.create(
+            name='Ещё фильм', year=2001,
+            category_id=Title.objects.get(pk=titles[0]['id']).category_id
+        )
+        data = TitleReadSerializer(
+            Title.objects.filter(category__isnull=False).order_by('id'),
+            many=True
+        ).data
+        first, _, last = data
+        assert first['category'] is last['category'], (
+            'Проверьте, что одинаковые вложенные объекты сериализуются '
+            'один раз за ответ.'
+        )
@@ -0,0 +1,116 @@
+import gzip
+import json
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_comments, create_reviews, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16Export:
+
+    EXPORT_URL_TEMPLATE = '/api/v1/export/{resource}/'
+
+    def get_rows(self, client, resource, query='', **headers):
+        url = self.EXPORT_URL_TEMPLATE.format(resource=resource) + query
+        response = client.get(url, **headers)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос администратора к `{url}` возвращает '
+            'ответ со статусом 200.'
+        )
+        assert response.streaming, (
+            'Проверьте, что выгрузка отдаётся потоковым ответом.'
+        )
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        body = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return [json.loads(line) for line in body.decode().splitlines()]
+
+    def test_01_admin_only(self, client, user_client, moderator_client):
+        url = self.EXPORT_URL_TEMPLATE.format(resource='titles')
+        assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что выгрузка недоступна анонимному пользователю.'
+        )
+        for role_client in (user_client, moderator_client):
+            assert role_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+                'Проверьте, что выгрузка доступна только администратору.'
+            )
+
+    def test_02_unknown_resource(self, admin_client):
+        url = self.EXPORT_URL_TEMPLATE.format(resource='users')
+        assert admin_client.get(url).status_code == HTTPStatus.NOT_FOUND
+
+    def test_03_titles_match_api(self, admin_client):
+        create_titles(admin_client)
+        rows = self.get_rows(admin_client, 'titles')
+        expected = admin_client.get('/api/v1/titles/').json()['results']
+        assert sorted(rows, key=lambda row: row['id']) == sorted(
+            expected, key=lambda row: row['id']
+        ), (
+            'Проверьте, что строки выгрузки произведений совпадают с '
+            'ответом API.'
+        )
+
+    def test_04_reviews_and_comments(self, admin_client, admin, user,
+                                     user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        review_rows = self.get_rows(admin_client, 'reviews')
+        api_reviews = admin_client.get(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        ).json()['results']
+        for row in review_rows:
+            assert row.pop('title') == titles[0]['id'], (
+                'Проверьте, что в строке отзыва указан id произведения.'
+            )
+        assert sorted(review_rows, key=lambda row: row['id']) == sorted(
+            api_reviews, key=lambda row: row['id']
+        )
+        comment_rows = self.get_rows(admin_client, 'comments')
+        assert {row['id'] for row in comment_rows} == {
+            comment['id'] for comment in comments
+        }
+        assert all(row['review'] == reviews[0]['id'] for row in comment_rows)
+
+    def test_05_since(self, admin_client, admin, user, user_client):
+        create_reviews(admin_client, {admin: admin_client, user: user_client})
+        rows = self.get_rows(admin_client, 'reviews')
+        latest = max(row['pub_date'] for row in rows)
+        filtered = self.get_rows(
+            admin_client, 'reviews', f'?since={latest}'
+        )
+        assert [row['pub_date'] for row in filtered] == [latest], (
+            'Проверьте, что параметр `since` оставляет только записи, '
+            'опубликованные не раньше указанного момента.'
+        )
+        assert self.get_rows(
+            admin_client, 'reviews', '?since=2999-01-01T00:00:00Z'
+        ) == []
+        url = self.EXPORT_URL_TEMPLATE.format(resource='reviews')
+        for value in ('вчера', '2024-13-40T00:00'):
+            response = admin_client.get(f'{url}?since={value}')
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                'Проверьте, что неверная дата в `since` возвращает ответ '
+                'со статусом 400.'
+            )
+        url = self.EXPORT_URL_TEMPLATE.format(resource='titles')
+        response = admin_client.get(f'{url}?since={latest}')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что для произведений фильтр `since` недоступен.'
+        )
+
+    def test_06_gzip(self, admin_client):
+        create_titles(admin_client)
+        plain = self.get_rows(admin_client, 'titles')
+        url = self.EXPORT_URL_TEMPLATE.format(resource='titles')
+        response = admin_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip', (
+            'Проверьте, что при `Accept-Encoding: gzip` выгрузка сжимается.'
+        )
+        compressed = self.get_rows(
+            admin_client, 'titles', HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        assert compressed == plain
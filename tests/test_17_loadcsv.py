@@ -0,0 +1,112 @@
+import csv
+import shutil
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.loader import MODELS_FILES, get_pragmas, load_files
+from reviews.models import Review, Title, User
+
+DATA_DIR = settings.BASE_DIR / 'static' / 'data'
+
+
+def read_csv(name, directory=DATA_DIR):
+    with open(directory / name, encoding='utf-8', newline='') as csvfile:
+        return list(csv.DictReader(csvfile))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17LoadCsv:
+
+    def test_01_load_bundled_data(self):
+        out = StringIO()
+        call_command('loadcsv', stdout=out)
+        for model, csv_file in MODELS_FILES.items():
+            assert model.objects.count() == len(read_csv(csv_file)), (
+                f'Проверьте, что команда `loadcsv` загружает все строки '
+                f'файла {csv_file}.'
+            )
+        assert 'строк/с' in out.getvalue(), (
+            'Проверьте, что команда `loadcsv` сообщает о скорости загрузки.'
+        )
+        row = read_csv('review.csv')[0]
+        review = Review.objects.get(pk=row['id'])
+        assert review.title_id == int(row['title_id'])
+        assert review.author_id == int(row['author_id'])
+        assert review.pub_date.isoformat().startswith(row['pub_date'][:19]), (
+            'Проверьте, что дата публикации отзыва берётся из файла.'
+        )
+        user = User.objects.get(username='bingobongo')
+        assert user.username_normalized == 'bingobongo'
+        title = Title.objects.get(pk=1)
+        assert title.name_normalized == title.name.casefold(), (
+            'Проверьте, что при загрузке заполняются поисковые поля.'
+        )
+        assert title.reviews_count == title.reviews.count()
+        assert title.rating is not None, (
+            'Проверьте, что после загрузки пересчитывается рейтинг.'
+        )
+
+    def test_02_small_batches(self, client):
+        call_command('loadcsv', batch_size=7, stdout=StringIO())
+        assert Review.objects.count() == len(read_csv('review.csv')), (
+            'Проверьте, что загрузка несколькими пачками не теряет строки.'
+        )
+        response = client.get('/api/v1/titles/')
+        assert response.json()['count'] == len(read_csv('titles.csv'))
+
+    def test_03_broken_file_rolls_back_table(self, tmp_path):
+        shutil.copytree(DATA_DIR, tmp_path, dirs_exist_ok=True)
+        rows = read_csv('review.csv')
+        rows[-1]['score'] = 'десять'
+        with open(tmp_path / 'review.csv', 'w', encoding='utf-8',
+                  newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        with pytest.raises(CommandError, match='review.csv, строка'):
+            call_command(
+                'loadcsv', path=tmp_path, batch_size=10, stdout=StringIO()
+            )
+        assert Title.objects.count() == len(read_csv('titles.csv'))
+        assert Review.objects.count() == 0, (
+            'Проверьте, что при ошибке в файле загрузка таблицы целиком '
+            'откатывается.'
+        )
+
+    def test_04_pragmas_restored(self):
+        before = get_pragmas()
+        during = []
+        load_files(
+            DATA_DIR,
+            progress=lambda *args: during.append(get_pragmas())
+        )
+        assert during[0]['synchronous'] == 0, (
+            'Проверьте, что на время загрузки отключается synchronous.'
+        )
+        assert during[0]['journal_mode'] == 'memory'
+        assert get_pragmas() == before, (
+            'Проверьте, что после загрузки настройки SQLite возвращаются.'
+        )
+
+    def test_05_dangling_reference_reports_line(self, tmp_path):
+        shutil.copytree(DATA_DIR, tmp_path, dirs_exist_ok=True)
+        rows = read_csv('review.csv')
+        rows[0]['title_id'] = '99999'
+        rows[0]['text'] = 'Отзыв'
+        with open(tmp_path / 'review.csv', 'w', encoding='utf-8',
+                  newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        with pytest.raises(
+            CommandError, match='review.csv, строка 2: title_id'
+        ):
+            call_command('loadcsv', path=tmp_path, stdout=StringIO())
+        assert Review.objects.count() == 0, (
+            'Проверьте, что отзыв со ссылкой на несуществующее произведение '
+            'откатывает загрузку таблицы.'
+        )
@@ -0,0 +1,180 @@
+import csv
+import shutil
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.loader import load_file, load_state_key
+from reviews.models import Genre, LoadState, Review, Title, User
+
+DATA_DIR = settings.BASE_DIR / 'static' / 'data'
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as csvfile:
+        return list(csv.DictReader(csvfile))
+
+
+def write_csv(path, rows, fieldnames=None):
+    with open(path, 'w', encoding='utf-8', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames or list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def loadcsv(path, **options):
+    out = StringIO()
+    call_command('loadcsv', path=path, stdout=out, **options)
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18LoadCsvIncremental:
+
+    @pytest.fixture
+    def data_dir(self, tmp_path):
+        shutil.copytree(DATA_DIR, tmp_path, dirs_exist_ok=True)
+        loadcsv(tmp_path)
+        return tmp_path
+
+    def test_01_unchanged_files_skipped(self, data_dir):
+        counts = {model: model.objects.count() for model in (Title, Review)}
+        out = loadcsv(data_dir, incremental=True)
+        assert out.count('пропущен') == 7, (
+            'Проверьте, что `loadcsv --incremental` пропускает файлы, '
+            'которые не менялись с прошлой загрузки.'
+        )
+        for model, count in counts.items():
+            assert model.objects.count() == count
+
+    def test_02_changed_rows_upserted(self, data_dir):
+        rows = read_csv(data_dir / 'titles.csv')
+        rows[0]['name'] = 'Побег из Шоушенка (режиссёрская версия)'
+        write_csv(data_dir / 'titles.csv', rows)
+        out = loadcsv(data_dir, incremental=True)
+        assert out.count('пропущен') == 6
+        title = Title.objects.get(pk=rows[0]['id'])
+        assert title.name == rows[0]['name'], (
+            'Проверьте, что `loadcsv --incremental` обновляет изменённые '
+            'записи.'
+        )
+        assert title.name_normalized == rows[0]['name'].casefold()
+        assert title.reviews_count > 0, (
+            'Проверьте, что обновление произведения не сбрасывает счётчики '
+            'отзывов.'
+        )
+        assert Title.objects.count() == len(rows)
+
+    def test_03_appended_rows_only(self, data_dir):
+        path = data_dir / 'review.csv'
+        rows = read_csv(path)
+        title = Title.objects.get(pk=1)
+        author = User.objects.exclude(reviews__title=title).first()
+        with open(path, 'a', encoding='utf-8', newline='') as csvfile:
+            csv.writer(csvfile).writerow([
+                999, title.id, 'Новый отзыв', author.id, 1,
+                '2024-01-01T00:00:00.000Z'
+            ])
+        state = LoadState.objects.get(**load_state_key(path))
+        loaded = load_file(Review, path, incremental=True)
+        assert loaded == 1, (
+            'Проверьте, что у дописанного файла загружаются только новые '
+            'строки.'
+        )
+        assert Review.objects.count() == len(rows) + 1
+        assert LoadState.objects.get(
+            **load_state_key(path)
+        ).rows == state.rows + 1
+        assert load_file(Review, path, incremental=True) is None
+
+    def test_04_natural_key_upsert(self, data_dir):
+        rows = read_csv(data_dir / 'genre.csv')
+        for row in rows:
+            del row['id']
+        rows[0]['name'] = 'Драма и мелодрама'
+        write_csv(data_dir / 'genre.csv', rows)
+        loadcsv(data_dir, incremental=True)
+        assert Genre.objects.count() == len(rows), (
+            'Проверьте, что без колонки id записи сопоставляются по slug.'
+        )
+        assert Genre.objects.get(slug=rows[0]['slug']).name == rows[0]['name']
+
+    def test_05_bad_row_reports_absolute_line(self, data_dir):
+        path = data_dir / 'genre.csv'
+        with open(path, 'a', encoding='utf-8', newline='') as csvfile:
+            csv.writer(csvfile).writerow(['не число', 'Жанр', 'genre'])
+        lines = path.read_text(encoding='utf-8').count('\n')
+        with pytest.raises(CommandError, match=f'genre.csv, строка {lines}'):
+            loadcsv(data_dir, incremental=True)
+
+    def test_06_directories_tracked_separately(self, data_dir,
+                                               tmp_path_factory):
+        other_dir = tmp_path_factory.mktemp('other')
+        shutil.copytree(data_dir, other_dir, dirs_exist_ok=True)
+        rows = read_csv(other_dir / 'titles.csv')
+        rows[0]['name'] = 'Побег из Шоушенка (режиссёрская версия)'
+        write_csv(other_dir / 'titles.csv', rows)
+        out = loadcsv(other_dir, incremental=True)
+        assert 'пропущен' not in out, (
+            'Проверьте, что `loadcsv --incremental` хранит состояние файлов '
+            'отдельно для каждого каталога `--path`.'
+        )
+        assert LoadState.objects.count() == 14
+        out = loadcsv(data_dir, incremental=True)
+        assert out.count('пропущен') == 7, (
+            'Проверьте, что загрузка другого каталога не сбрасывает '
+            'состояние файлов первого.'
+        )
+
+    def test_07_ratings_recalculated_for_loaded_reviews(self, data_dir):
+        path = data_dir / 'review.csv'
+        moved = next(
+            row for row in read_csv(path) if row['title_id'] == '1'
+        )
+        other = Title.objects.exclude(pk=1).exclude(
+            reviews__author_id=moved['author_id']
+        ).first()
+        untouched = Title.objects.exclude(pk__in=(1, other.pk)).filter(
+            reviews_count__gt=0
+        ).first()
+        Title.objects.filter(pk=untouched.pk).update(rating=1)
+        comments = read_csv(data_dir / 'comments.csv')
+        comments[0]['text'] = 'Изменённый комментарий'
+        write_csv(data_dir / 'comments.csv', comments)
+        # Дописанная строка с тем же id переносит отзыв к другому
+        # произведению.
+        moved['title_id'] = str(other.pk)
+        with open(path, 'a', encoding='utf-8', newline='') as csvfile:
+            csv.DictWriter(csvfile, list(moved)).writerow(moved)
+        loadcsv(data_dir, incremental=True)
+        for title_id in (1, other.pk):
+            title = Title.objects.get(pk=title_id)
+            reviews = Review.objects.filter(title_id=title_id)
+            assert title.reviews_count == reviews.count(), (
+                'Проверьте, что после загрузки отзывов пересчитываются '
+                'счётчики прежнего и нового произведения отзыва.'
+            )
+            assert title.score_sum == sum(
+                review.score for review in reviews
+            )
+        assert Title.objects.get(pk=untouched.pk).rating == 1, (
+            'Проверьте, что рейтинг пересчитывается только у произведений '
+            'загруженных отзывов.'
+        )
+
+    def test_08_catalog_versions_bumped(self, data_dir, client):
+        url = '/api/v1/titles/1/'
+        etag = client.get(url)['ETag']
+        rows = read_csv(data_dir / 'titles.csv')
+        rows[0]['name'] = 'Побег из Шоушенка (режиссёрская версия)'
+        write_csv(data_dir / 'titles.csv', rows)
+        loadcsv(data_dir, incremental=True)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что `loadcsv` сбрасывает версии кеша каталога.'
+        )
+        assert response.json()['name'] == rows[0]['name']
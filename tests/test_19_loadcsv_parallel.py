@@ -0,0 +1,114 @@
+import csv
+import shutil
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.loader import MODELS_FILES, load_order
+from reviews.models import Review, Title
+
+DATA_DIR = settings.BASE_DIR / 'static' / 'data'
+
+
+def read_records(path):
+    """Строки файла с номером последней строки записи, как у csv.reader."""
+    with open(path, encoding='utf-8', newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)
+        return header, [(reader.line_num, row) for row in reader]
+
+
+def loadcsv(path, **options):
+    out = StringIO()
+    err = StringIO()
+    call_command('loadcsv', path=path, stdout=out, stderr=err, **options)
+    return out.getvalue(), err.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19LoadCsvParallel:
+
+    @pytest.fixture
+    def broken_dir(self, tmp_path):
+        """Копия данных с неверной оценкой в одном из отзывов."""
+        shutil.copytree(DATA_DIR, tmp_path, dirs_exist_ok=True)
+        header, records = read_records(tmp_path / 'review.csv')
+        line, row = records[10]
+        row[header.index('score')] = 'много'
+        with open(tmp_path / 'review.csv', 'w', encoding='utf-8',
+                  newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(header)
+            writer.writerows(row for _, row in records)
+        return tmp_path, line, len(records)
+
+    def test_01_load_order(self):
+        order = load_order()
+        assert set(order) == set(MODELS_FILES)
+        for model in order:
+            for field in model._meta.local_concrete_fields:
+                related = field.related_model
+                if related in MODELS_FILES and related is not model:
+                    assert order.index(related) < order.index(model), (
+                        f'Проверьте, что {related.__name__} загружается '
+                        f'раньше {model.__name__}.'
+                    )
+
+    def test_02_parallel_load(self):
+        out, _ = loadcsv(DATA_DIR, workers=2, batch_size=10)
+        for model, csv_file in MODELS_FILES.items():
+            _, records = read_records(DATA_DIR / csv_file)
+            assert model.objects.count() == len(records), (
+                f'Проверьте, что `loadcsv --workers` загружает все строки '
+                f'файла {csv_file}.'
+            )
+        assert Title.objects.filter(rating__isnull=False).exists()
+        assert 'строк/с' in out
+
+    @pytest.mark.parametrize('workers', (1, 2))
+    def test_03_rejected_rows_reported(self, broken_dir, workers):
+        path, line, total = broken_dir
+        _, err = loadcsv(
+            path, workers=workers, batch_size=7, skip_invalid=True
+        )
+        assert f'review.csv, строка {line}:' in err, (
+            'Проверьте, что `loadcsv --skip-invalid` выводит номер строки '
+            'файла с ошибкой.'
+        )
+        assert 'Пропущено строк с ошибками: 1' in err
+        assert Review.objects.count() == total - 1, (
+            'Проверьте, что строки без ошибок загружаются.'
+        )
+
+    def test_04_parallel_stops_on_error(self, broken_dir):
+        path, line, _ = broken_dir
+        with pytest.raises(CommandError, match=f'review.csv, строка {line}'):
+            loadcsv(path, workers=2)
+        assert Review.objects.count() == 0
+        assert Title.objects.exists()
+
+    def test_05_invalid_values_rejected(self, tmp_path):
+        shutil.copytree(DATA_DIR, tmp_path, dirs_exist_ok=True)
+        header, records = read_records(tmp_path / 'review.csv')
+        (score_line, score_row), (title_line, title_row) = records[3:5]
+        score_row[header.index('score')] = '42'
+        title_row[header.index('title_id')] = '99999'
+        with open(tmp_path / 'review.csv', 'w', encoding='utf-8',
+                  newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(header)
+            writer.writerows(row for _, row in records)
+        _, err = loadcsv(
+            tmp_path, workers=2, batch_size=7, skip_invalid=True
+        )
+        for line in (score_line, title_line):
+            assert f'review.csv, строка {line}:' in err, (
+                'Проверьте, что `loadcsv --skip-invalid` отклоняет значения, '
+                'которые не проходят проверки модели, и ссылки на '
+                'несуществующие записи.'
+            )
+        assert Review.objects.count() == len(records) - 2
+        assert not Title.objects.filter(rating__gt=10).exists()
@@ -0,0 +1,119 @@
+import csv
+import gzip
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from reviews.dump import dump_fields
+from reviews.loader import MODELS_FILES
+from reviews.models import Category, Comments, Review, Title, User
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as csvfile:
+        return list(csv.DictReader(csvfile))
+
+
+def snapshot():
+    """Содержимое всех таблиц выгрузки и рейтинги произведений."""
+    data = {
+        model: list(model.objects.order_by('pk').values_list(
+            *(field.attname for field in dump_fields(model))
+        ))
+        for model in MODELS_FILES
+    }
+    data['ratings'] = list(
+        Title.objects.order_by('pk').values_list('rating', 'reviews_count')
+    )
+    return data
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20DumpCsv:
+
+    @pytest.fixture(autouse=True)
+    def loaded(self):
+        call_command('loadcsv', stdout=StringIO())
+
+    def test_01_round_trip(self, tmp_path):
+        before = snapshot()
+        out = StringIO()
+        call_command('dumpcsv', tmp_path, stdout=out)
+        assert 'строк/с' in out.getvalue()
+        for model, csv_file in MODELS_FILES.items():
+            assert len(read_csv(tmp_path / csv_file)) == len(before[model])
+        call_command('flush', interactive=False)
+        call_command('loadcsv', path=tmp_path, stdout=StringIO())
+        assert snapshot() == before, (
+            'Проверьте, что данные, выгруженные командой `dumpcsv`, '
+            'загружаются командой `loadcsv` без изменений.'
+        )
+
+    def test_02_gzip(self, tmp_path):
+        call_command('dumpcsv', tmp_path / 'plain', stdout=StringIO())
+        call_command(
+            'dumpcsv', tmp_path / 'packed', gzip=True, stdout=StringIO()
+        )
+        for csv_file in MODELS_FILES.values():
+            packed = tmp_path / 'packed' / f'{csv_file}.gz'
+            assert packed.exists(), (
+                'Проверьте, что с `--gzip` файлы сохраняются сжатыми.'
+            )
+            assert gzip.decompress(packed.read_bytes()) == (
+                tmp_path / 'plain' / csv_file
+            ).read_bytes()
+        assert not list(tmp_path.glob('**/*.tmp'))
+
+    def test_03_since(self, tmp_path):
+        old = timezone.now() - timedelta(days=365)
+        cutoff = timezone.now() - timedelta(days=1)
+        User.objects.update(date_joined=old)
+        Review.objects.update(pub_date=old)
+        Comments.objects.update(pub_date=old)
+        new_reviews = Review.objects.order_by('pk')[:2]
+        Review.objects.filter(
+            pk__in=[review.pk for review in new_reviews]
+        ).update(pub_date=timezone.now())
+        comment = Comments.objects.exclude(
+            review__in=new_reviews
+        ).order_by('pk').first()
+        comment.pub_date = timezone.now()
+        comment.save()
+        expected_reviews = {review.pk for review in new_reviews}
+        expected_reviews.add(comment.review_id)
+        expected_users = {review.author_id for review in new_reviews}
+        expected_users.update((comment.author_id, comment.review.author_id))
+
+        call_command(
+            'dumpcsv', tmp_path, since=cutoff.isoformat(), stdout=StringIO()
+        )
+        assert {
+            int(row['id']) for row in read_csv(tmp_path / 'review.csv')
+        } == expected_reviews, (
+            'Проверьте, что `--since` выгружает новые отзывы и отзывы '
+            'с новыми комментариями.'
+        )
+        assert {
+            int(row['id']) for row in read_csv(tmp_path / 'users.csv')
+        } == expected_users, (
+            'Проверьте, что `--since` выгружает авторов выгруженных '
+            'отзывов и комментариев.'
+        )
+        assert len(read_csv(tmp_path / 'category.csv')) == (
+            Category.objects.count()
+        )
+        call_command('flush', interactive=False)
+        call_command('loadcsv', path=tmp_path, stdout=StringIO())
+        assert set(Review.objects.values_list('id', flat=True)) == (
+            expected_reviews
+        ), (
+            'Проверьте, что выгрузка с `--since` загружается командой '
+            '`loadcsv`.'
+        )
+        for value in ('вчера', '2024-13-40T00:00'):
+            with pytest.raises(CommandError):
+                call_command('dumpcsv', tmp_path, since=value)
@@ -0,0 +1,91 @@
+import csv
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+
+from reviews.loader import MODELS_FILES
+from reviews.models import Comments, Review, Title, User
+
+OPTIONS = {
+    'users': 50,
+    'titles': 40,
+    'genres': 5,
+    'categories': 3,
+    'reviews_per_title': 4,
+    'comments_per_review': 1,
+}
+
+
+def generate(path, **options):
+    call_command('gendata', path, stdout=StringIO(), **options)
+    return {
+        csv_file: (path / csv_file).read_bytes()
+        for csv_file in MODELS_FILES.values()
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21GenData:
+
+    def test_01_deterministic(self, tmp_path):
+        first = generate(tmp_path / 'first', seed=7, **OPTIONS)
+        second = generate(tmp_path / 'second', seed=7, **OPTIONS)
+        assert first == second, (
+            'Проверьте, что при одинаковом `--seed` команда `gendata` '
+            'создаёт одинаковые файлы.'
+        )
+        other = generate(tmp_path / 'other', seed=8, **OPTIONS)
+        assert other['review.csv'] != first['review.csv']
+
+    def test_02_loadable(self, tmp_path):
+        out = StringIO()
+        call_command(
+            'gendata', tmp_path, seed=1, load=True, stdout=out, **OPTIONS
+        )
+        assert 'Все данные успешно загружены в базу!' in out.getvalue(), (
+            'Проверьте, что данные `gendata` принимает команда `loadcsv`.'
+        )
+        assert User.objects.count() == OPTIONS['users']
+        assert Title.objects.count() == OPTIONS['titles']
+        assert Review.objects.exists() and Comments.objects.exists()
+        title = Title.objects.annotate(
+            total=Count('reviews')
+        ).order_by('-total').first()
+        assert title.reviews_count == title.total
+        assert User.objects.get(pk=1).role == 'admin'
+
+    def test_03_power_law(self, tmp_path):
+        generate(tmp_path, seed=3, users=2000, titles=500, genres=5,
+                 categories=3, reviews_per_title=10, comments_per_review=0)
+        counts = Counter(
+            line.split(',')[1]
+            for line in (tmp_path / 'review.csv').read_text(
+                encoding='utf-8'
+            ).splitlines()[1:]
+        )
+        per_title = sorted(counts.values())
+        mean = sum(per_title) / 500
+        assert 5 < mean < 20
+        assert per_title[-1] > 5 * mean, (
+            'Проверьте, что количество отзывов распределено по степенному '
+            'закону: у части произведений отзывов намного больше среднего.'
+        )
+        assert per_title[len(per_title) // 2] < mean
+
+    def test_04_comments_mean(self, tmp_path):
+        generate(tmp_path, seed=5, users=300, titles=300, genres=5,
+                 categories=3, reviews_per_title=5, comments_per_review=3)
+
+        def count_rows(csv_file):
+            with open(tmp_path / csv_file, encoding='utf-8',
+                      newline='') as file:
+                return sum(1 for _ in csv.DictReader(file))
+
+        mean = count_rows('comments.csv') / count_rows('review.csv')
+        assert abs(mean - 3) < 0.3, (
+            'Проверьте, что среднее число комментариев к отзыву равно '
+            f'`--comments-per-review` (получилось {mean:.2f}).'
+        )
@@ -0,0 +1,119 @@
+import copy
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from api.benchmark import compare, run_benchmark, seed_dataset
+
+SCALE = {
+    'users': 30,
+    'titles': 20,
+    'genres': 4,
+    'categories': 2,
+    'reviews_per_title': 3,
+    'comments_per_review': 2,
+}
+BASELINE = {
+    'meta': {},
+    'endpoints': {
+        'titles-list': {
+            'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 3, 'bytes': 1000,
+        },
+        'reviews-list': {
+            'p50_ms': 5.0, 'p95_ms': 8.0, 'queries': 4, 'bytes': 500,
+        },
+    },
+}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22Benchmark:
+
+    def test_01_all_routes_measured(self):
+        seed_dataset(seed=1, **SCALE)
+        result = run_benchmark(repeat=2, warmup=0)
+        paths = {
+            endpoint['path'] for endpoint in result['endpoints'].values()
+        }
+        for prefix in (
+            '/api/v1/titles/', '/api/v1/genres/', '/api/v1/categories/',
+            '/api/v1/users/', '/api/v1/users/me/', '/api/v1/auth/signup/',
+            '/api/v1/auth/token/', '/api/v1/export/',
+        ):
+            assert any(path.startswith(prefix) for path in paths), (
+                f'Проверьте, что бенчмарк замеряет маршрут {prefix}.'
+            )
+        assert any('/comments/' in path for path in paths)
+        for name, endpoint in result['endpoints'].items():
+            assert endpoint['p50_ms'] <= endpoint['p95_ms'], name
+            assert endpoint['queries'] > 0, name
+            assert endpoint['bytes'] > 0, name
+
+    def test_02_compare(self):
+        current = copy.deepcopy(BASELINE)
+        assert compare(BASELINE, current) == []
+        # Рост меньше миллисекунды - шум, а не регрессия.
+        current['endpoints']['reviews-list']['p50_ms'] = 5.9
+        assert compare(BASELINE, current) == []
+        current['endpoints']['titles-list']['p95_ms'] = 30.0
+        current['endpoints']['reviews-list']['queries'] = 5
+        regressions = compare(BASELINE, current)
+        assert len(regressions) == 2, (
+            'Проверьте, что сравнение находит рост времени ответа и числа '
+            'запросов к базе.'
+        )
+        del current['endpoints']['titles-list']
+        assert any('titles-list' in line for line in compare(
+            BASELINE, current
+        ))
+
+    def test_03_benchcompare_command(self, tmp_path):
+        baseline = tmp_path / 'baseline.json'
+        baseline.write_text(json.dumps(BASELINE))
+        current = copy.deepcopy(BASELINE)
+        current['endpoints']['titles-list']['bytes'] = 5000
+        current_path = tmp_path / 'current.json'
+        current_path.write_text(json.dumps(current))
+        with pytest.raises(CommandError, match='регрессий: 1'):
+            call_command(
+                'benchcompare', baseline, current_path, stderr=StringIO()
+            )
+        call_command(
+            'benchcompare', baseline, current_path, threshold=10,
+            stdout=StringIO()
+        )
+
+    def test_04_keeps_shared_state(self, metrics_directory,
+                                   slow_queries_directory, settings):
+        from django.core.cache import cache
+
+        from api import metrics, slowqueries, throttling
+        settings.SLOW_QUERIES = {**settings.SLOW_QUERIES, 'THRESHOLD_MS': 0}
+        seed_dataset(seed=1, **SCALE)
+        cache.set('service:key', 1)
+        throttling.store.take('signup_ip:attacker', 1, 3600)
+        run_benchmark(repeat=1, warmup=0)
+        assert cache.get('service:key') == 1, (
+            'Проверьте, что бенчмарк не очищает общий кеш работающего '
+            'сервиса.'
+        )
+        assert throttling.store.take('signup_ip:attacker', 1, 3600), (
+            'Проверьте, что бенчмарк не очищает корзины ограничения '
+            'частоты работающего сервиса.'
+        )
+        metrics.store.flush(force=True)
+        slowqueries.log.flush(force=True)
+        views = {
+            dict(labels).get('view') for _, labels in metrics.read_files()
+        }
+        assert 'TitleViewSet.list' not in views, (
+            'Проверьте, что запросы бенчмарка не попадают в метрики '
+            'работающего сервиса.'
+        )
+        assert not list(slow_queries_directory.glob('*.json')), (
+            'Проверьте, что запросы бенчмарка не попадают в журнал '
+            'медленных запросов.'
+        )
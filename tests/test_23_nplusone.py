@@ -0,0 +1,83 @@
+import logging
+
+import pytest
+
+from api.nplusone import NPlusOneError, assert_no_n_plus_one, fingerprint
+from api.views import ReviewViewSet
+from reviews.models import Review
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23NPlusOne:
+
+    @pytest.fixture
+    def reviews_url(self, admin_client, admin, user, user_client,
+                    moderator, moderator_client):
+        _, titles = create_reviews(admin_client, {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client,
+        })
+        return f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+    @pytest.fixture
+    def n_plus_one_view(self, monkeypatch):
+        """Список отзывов без select_related('author')."""
+        monkeypatch.setattr(
+            ReviewViewSet, 'get_queryset',
+            lambda view: view.get_title().reviews.all()
+        )
+
+    def test_01_fingerprint(self):
+        assert fingerprint(
+            'SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 21'
+        ) == fingerprint('SELECT * FROM t WHERE id IN (%s) LIMIT 100'), (
+            'Проверьте, что форма запроса не зависит от длины списка IN '
+            'и значения LIMIT.'
+        )
+
+    def test_02_helper_detects_loop(self, reviews_url):
+        with pytest.raises(AssertionError) as error:
+            with assert_no_n_plus_one():
+                for review in Review.objects.all():
+                    review.author.username
+        assert 'tests/test_23_nplusone.py' in str(error.value), (
+            'Проверьте, что в отчёте указано место вызова запроса.'
+        )
+        with assert_no_n_plus_one():
+            for review in Review.objects.select_related('author'):
+                review.author.username
+
+    def test_03_reviews_list_has_no_n_plus_one(self, client, reviews_url):
+        with assert_no_n_plus_one() as collector:
+            client.get(reviews_url)
+        assert collector.queries
+
+    def test_04_strict_mode(self, client, reviews_url, n_plus_one_view):
+        with pytest.raises(NPlusOneError) as error:
+            client.get(reviews_url)
+        message = str(error.value)
+        assert 'ReviewViewSet' in message, (
+            'Проверьте, что в отчёте о N+1 указано представление.'
+        )
+        assert 'ReviewSerializer.author' in message, (
+            'Проверьте, что в отчёте о N+1 указано поле сериализатора.'
+        )
+
+    def test_05_log_mode(self, client, reviews_url, n_plus_one_view,
+                         settings, caplog):
+        settings.N_PLUS_ONE = {
+            **settings.N_PLUS_ONE, 'MODE': 'log', 'SAMPLE_RATE': 1
+        }
+        with caplog.at_level(logging.WARNING, logger='api.nplusone'):
+            response = client.get(reviews_url)
+        assert response.status_code == 200
+        assert any(
+            'ReviewSerializer.author' in record.getMessage()
+            for record in caplog.records
+        ), 'Проверьте, что в режиме log находки пишутся в лог.'
+        caplog.clear()
+        settings.N_PLUS_ONE = {**settings.N_PLUS_ONE, 'SAMPLE_RATE': 0}
+        client.get(reviews_url)
+        assert not caplog.records
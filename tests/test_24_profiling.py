@@ -0,0 +1,98 @@
+import pstats
+
+import pytest
+from django.core.cache import cache
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24Profiling:
+    titles_url = '/api/v1/titles/'
+    profiles_url = '/api/v1/profiles/'
+
+    @pytest.fixture(autouse=True)
+    def profiles_dir(self, settings, tmp_path):
+        directory = tmp_path / 'profiles'
+        settings.PROFILING = {**settings.PROFILING, 'DIRECTORY': directory}
+        return directory
+
+    def test_01_no_header_no_profile(self, admin_client, user_client,
+                                     client, profiles_dir):
+        response = admin_client.get(self.titles_url)
+        assert 'X-Profile-Id' not in response, (
+            'Проверьте, что без заголовка X-Profile запрос не профилируется.'
+        )
+        for api_client in (user_client, client):
+            response = api_client.get(self.titles_url, HTTP_X_PROFILE='1')
+            assert response.status_code == 200
+            assert 'X-Profile-Id' not in response, (
+                'Проверьте, что профилируются только запросы администратора.'
+            )
+        assert not profiles_dir.exists()
+
+    def test_02_admin_profile(self, admin_client, profiles_dir):
+        # Без кеша каталога ответ строится запросами к базе.
+        cache.clear()
+        response = admin_client.get(self.titles_url, HTTP_X_PROFILE='1')
+        assert response.status_code == 200
+        profile_id = response['X-Profile-Id']
+        assert (profiles_dir / f'{profile_id}.pstats').exists()
+        assert (profiles_dir / f'{profile_id}.json').exists()
+
+        response = admin_client.get(f'{self.profiles_url}{profile_id}/')
+        assert response.status_code == 200
+        summary = response.json()
+        assert summary['path'] == self.titles_url
+        assert summary['status'] == 200
+        assert summary['sql']['count'] > 0, (
+            'Проверьте, что в сводке профиля учтены SQL-запросы.'
+        )
+        assert summary['functions'], (
+            'Проверьте, что в сводке профиля есть самые дорогие функции.'
+        )
+
+        response = admin_client.get(self.profiles_url)
+        assert [item['id'] for item in response.json()] == [profile_id]
+
+        response = admin_client.get(
+            f'{self.profiles_url}{profile_id}/pstats/'
+        )
+        assert response.status_code == 200
+        path = profiles_dir.parent / 'downloaded.pstats'
+        path.write_bytes(b''.join(response.streaming_content))
+        assert pstats.Stats(str(path)).total_calls > 0, (
+            'Проверьте, что эндпоинт pstats отдаёт файл профиля.'
+        )
+
+    def test_03_ring_is_bounded(self, admin_client, settings, profiles_dir):
+        settings.PROFILING = {**settings.PROFILING, 'MAX_PROFILES': 2}
+        ids = [
+            admin_client.get(
+                self.titles_url, HTTP_X_PROFILE='1'
+            )['X-Profile-Id']
+            for _ in range(4)
+        ]
+        response = admin_client.get(self.profiles_url)
+        assert [item['id'] for item in response.json()] == ids[:1:-1], (
+            'Проверьте, что хранятся только последние MAX_PROFILES профилей.'
+        )
+        assert len(list(profiles_dir.iterdir())) == 4
+
+    def test_04_admin_only(self, admin_client, user_client, client):
+        profile_id = admin_client.get(
+            self.titles_url, HTTP_X_PROFILE='1'
+        )['X-Profile-Id']
+        for url in (
+            self.profiles_url,
+            f'{self.profiles_url}{profile_id}/',
+            f'{self.profiles_url}{profile_id}/pstats/',
+        ):
+            assert client.get(url).status_code == 401
+            assert user_client.get(url).status_code == 403, (
+                'Проверьте, что профили доступны только администратору.'
+            )
+        for url in (
+            f'{self.profiles_url}1-1/',
+            f'{self.profiles_url}..%2Fsettings/',
+            f'{self.profiles_url}1-1/pstats/',
+        ):
+            assert admin_client.get(url).status_code == 404
@@ -0,0 +1,171 @@
+import json
+import subprocess
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api import metrics
+
+
+def parse_metrics(text):
+    """{'имя{метки}': значение} из текстового формата Prometheus."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25Metrics:
+    METRICS_URL = '/metrics'
+    TITLES_URL = '/api/v1/titles/'
+
+    TOKEN = 'prometheus-token'
+
+    @pytest.fixture(autouse=True)
+    def clean_store(self, settings):
+        settings.METRICS = {**settings.METRICS, 'TOKEN': self.TOKEN}
+        metrics.store.reset()
+
+    def get_metrics(self, client):
+        response = client.get(
+            self.METRICS_URL, HTTP_AUTHORIZATION=f'Bearer {self.TOKEN}'
+        )
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain'), (
+            'Проверьте, что /metrics отдаёт текстовый формат Prometheus.'
+        )
+        return parse_metrics(response.content.decode())
+
+    def test_01_view_metrics(self, client):
+        url = f'{self.TITLES_URL}?year=1999'
+        assert client.get(url)['X-Cache'] == 'MISS'
+        assert client.get(url)['X-Cache'] == 'HIT'
+        client.get('/api/v1/missing/')
+        samples = self.get_metrics(client)
+
+        view = 'view="TitleViewSet.list"'
+        assert samples[
+            f'yamdb_http_responses_total{{{view},method="GET",status="200"}}'
+        ] == 2, 'Проверьте, что ответы считаются по view, методу и статусу.'
+        assert samples[
+            f'yamdb_http_request_duration_seconds_bucket{{{view},le="+Inf"}}'
+        ] == 2
+        assert samples[
+            f'yamdb_http_request_duration_seconds_count{{{view}}}'
+        ] == 2
+        assert samples[f'yamdb_db_queries_total{{{view}}}'] > 0, (
+            'Проверьте, что SQL-запросы считаются по view.'
+        )
+        assert f'yamdb_db_query_duration_seconds_total{{{view}}}' in samples
+        assert samples[
+            f'yamdb_cache_responses_total{{{view},result="hit"}}'
+        ] == 1
+        assert samples['yamdb_cache_hit_ratio'] == 0.5, (
+            'Проверьте, что доля попаданий в кеш считается по ответам.'
+        )
+        assert samples[
+            'yamdb_http_responses_total'
+            '{view="unmatched",method="GET",status="404"}'
+        ] == 1
+
+    def test_02_aggregates_processes(self, client, metrics_directory):
+        # Файл другого процесса.
+        labels = [['view', 'TitleViewSet.list'], ['method', 'GET'],
+                  ['status', '200']]
+        metrics_directory.mkdir(parents=True, exist_ok=True)
+        (metrics_directory / '1.json').write_text(json.dumps({
+            'host': 'other-host', 'pid': 1,
+            'data': {'values': [[metrics.RESPONSES, labels, 5]]},
+        }))
+        client.get(self.TITLES_URL)
+        samples = self.get_metrics(client)
+        assert samples[
+            'yamdb_http_responses_total'
+            '{view="TitleViewSet.list",method="GET",status="200"}'
+        ] == 6, 'Проверьте, что /metrics складывает значения всех процессов.'
+
+    def test_03_emails(self, client):
+        response = client.post('/api/v1/auth/signup/', data={
+            'username': 'metrics', 'email': 'metrics@yamdb.fake'
+        })
+        assert response.status_code == 200
+        samples = self.get_metrics(client)
+        assert samples['yamdb_email_backlog'] == 1, (
+            'Проверьте, что /metrics показывает размер очереди писем.'
+        )
+        call_command('sendemails', '--once', stdout=StringIO())
+        samples = self.get_metrics(client)
+        assert samples['yamdb_emails_sent_total'] == 1
+        assert samples['yamdb_email_backlog'] == 0
+        assert samples[
+            'yamdb_http_responses_total'
+            '{view="SignUpViewSet.create",method="POST",status="200"}'
+        ] == 1
+
+    def test_04_disabled(self, client, settings, metrics_directory):
+        settings.METRICS = {**settings.METRICS, 'ENABLED': False}
+        client.get(self.TITLES_URL)
+        assert not metrics_directory.exists(), (
+            'Проверьте, что при ENABLED=False метрики не собираются.'
+        )
+
+    def test_05_pid_reuse_keeps_counters(self, metrics_directory):
+        metrics.store.inc(metrics.EMAILS_SENT, amount=5)
+        metrics.store.flush(force=True)
+        # Новый процесс получил pid остановленного воркера.
+        restarted = metrics.MetricsStore()
+        assert restarted.pid == metrics.store.pid
+        restarted.inc(metrics.EMAILS_SENT)
+        restarted.flush(force=True)
+        assert len(list(metrics_directory.glob('*.json'))) == 2
+        assert metrics.read_files()[(metrics.EMAILS_SENT, ())] == 6, (
+            'Проверьте, что процесс с повторно выданным pid не '
+            'перезаписывает файл метрик остановленного воркера.'
+        )
+
+    def test_06_token_required(self, client, settings):
+        assert client.get(self.METRICS_URL).status_code == 403
+        response = client.get(
+            self.METRICS_URL, HTTP_AUTHORIZATION='Bearer wrong'
+        )
+        assert response.status_code == 403, (
+            'Проверьте, что /metrics не отдаётся без токена.'
+        )
+        settings.METRICS = {**settings.METRICS, 'TOKEN': None}
+        response = client.get(
+            self.METRICS_URL, HTTP_AUTHORIZATION='Bearer None'
+        )
+        assert response.status_code == 404, (
+            'Проверьте, что без METRICS["TOKEN"] эндпоинт /metrics закрыт.'
+        )
+
+    def test_07_stopped_processes_folded(self, metrics_directory):
+        from api import processfiles
+        metrics_directory.mkdir(parents=True, exist_ok=True)
+        for amount in (2, 3):
+            stopped = subprocess.Popen(['true'])
+            stopped.wait()
+            (metrics_directory / f'{stopped.pid}-{amount}.json').write_text(
+                json.dumps({
+                    'host': processfiles.HOST, 'pid': stopped.pid,
+                    'data': {'values': [[metrics.EMAILS_SENT, [], amount]]},
+                })
+            )
+        metrics.store.inc(metrics.EMAILS_SENT)
+        metrics.store.flush(force=True)
+        for _ in range(2):
+            assert metrics.read_files()[(metrics.EMAILS_SENT, ())] == 6, (
+                'Проверьте, что значения остановленных процессов остаются '
+                'в сумме.'
+            )
+        names = {path.name for path in metrics_directory.glob('*.json')}
+        assert names == {
+            processfiles.STOPPED_FILE, metrics.store.path().name
+        }, (
+            'Проверьте, что файлы остановленных процессов складываются в '
+            'один файл.'
+        )
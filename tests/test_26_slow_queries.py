@@ -0,0 +1,87 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api import slowqueries
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26SlowQueries:
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture(autouse=True)
+    def clean_log(self, settings):
+        settings.SLOW_QUERIES = {**settings.SLOW_QUERIES, 'THRESHOLD_MS': 0}
+        slowqueries.log.reset()
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('slowqueries', *args, stdout=out)
+        return out.getvalue()
+
+    def test_01_captures_queries_with_plans(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        slowqueries.clear()
+        client.get(f'{self.TITLES_URL}?year={titles[0]["year"]}')
+        offenders = slowqueries.top_offenders()
+        assert offenders, (
+            'Проверьте, что запросы дольше THRESHOLD_MS попадают в журнал.'
+        )
+        totals = [entry['total_ms'] for entry in offenders]
+        assert totals == sorted(totals, reverse=True), (
+            'Проверьте, что запросы упорядочены по общему времени.'
+        )
+        samples = [
+            sample for entry in offenders for sample in entry['samples']
+            if 'reviews_title' in entry['sql']
+        ]
+        assert samples
+        sample = samples[0]
+        assert sample['view'] == 'TitleViewSet.list', (
+            'Проверьте, что для запроса сохраняется view.'
+        )
+        assert titles[0]['year'] in sample['params'], (
+            'Проверьте, что сохраняются параметры запроса.'
+        )
+        assert sample['plan'], (
+            'Проверьте, что для SELECT сохраняется план выполнения.'
+        )
+
+        output = self.run_command('--plans', '--limit', '3')
+        assert output.startswith('1. всего')
+        assert 'TitleViewSet.list' in output
+        assert '4. всего' not in output
+        assert sample['plan'][0] in output
+
+    def test_02_threshold(self, client, settings):
+        settings.SLOW_QUERIES = {
+            **settings.SLOW_QUERIES, 'THRESHOLD_MS': 10 ** 6
+        }
+        client.get(self.TITLES_URL)
+        assert slowqueries.top_offenders() == []
+        assert 'Медленных запросов не найдено' in self.run_command()
+
+    def test_03_bounded(self, client, admin_client, settings):
+        settings.SLOW_QUERIES = {
+            **settings.SLOW_QUERIES, 'MAX_QUERIES': 2, 'MAX_SAMPLES': 1
+        }
+        create_titles(admin_client)
+        for year in (1990, 1991, 1992):
+            client.get(f'{self.TITLES_URL}?year={year}')
+        offenders = slowqueries.top_offenders()
+        assert len(offenders) == 2, (
+            'Проверьте, что журнал хранит не больше MAX_QUERIES форм.'
+        )
+        assert all(len(entry['samples']) == 1 for entry in offenders), (
+            'Проверьте, что для формы хранится не больше MAX_SAMPLES '
+            'примеров.'
+        )
+
+    def test_04_clear(self, client, slow_queries_directory):
+        client.get(self.TITLES_URL)
+        slowqueries.top_offenders()
+        assert list(slow_queries_directory.glob('*.json'))
+        assert 'Журнал очищен' in self.run_command('--clear')
+        assert slowqueries.top_offenders() == []
@@ -0,0 +1,104 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.authentication import UserCache, user_cache
+from tests.utils import create_titles
+
+
+def user_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'FROM "reviews_user"' in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test27AuthCache:
+    USERS_URL = '/api/v1/users/'
+    ME_URL = '/api/v1/users/me/'
+
+    @pytest.fixture(autouse=True)
+    def clean_cache(self):
+        user_cache.clear()
+
+    def test_01_user_query_is_cached(self, user_client):
+        url = '/api/v1/genres/'
+        with CaptureQueriesContext(connection) as context:
+            user_client.get(url)
+        assert user_queries(context), (
+            'Проверьте, что при первом запросе пользователь читается из базы.'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(url)
+        assert response.status_code == 200
+        assert not user_queries(context), (
+            'Проверьте, что при повторном запросе с тем же токеном '
+            'пользователь берётся из кеша.'
+        )
+
+    def test_02_cached_user_is_usable(self, admin_client, user_client, user):
+        titles, _, _ = create_titles(admin_client)
+        user_client.get(self.ME_URL)
+        response = user_client.post(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+            data={'text': 'Отзыв', 'score': 7}
+        )
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username, (
+            'Проверьте, что пользователь из кеша записывается автором.'
+        )
+        response = user_client.patch(self.ME_URL, data={'bio': 'новое'})
+        assert response.status_code == 200
+        response = user_client.get(self.ME_URL)
+        assert response.json()['email'] == user.email
+        assert response.json()['bio'] == 'новое', (
+            'Проверьте, что /users/me/ отдаёт актуальные данные '
+            'пользователя.'
+        )
+        user.refresh_from_db()
+        assert user.role == 'user' and user.email == 'testuser@yamdb.fake'
+
+    def test_03_role_change_invalidates(self, admin_client, user_client,
+                                        user):
+        assert user_client.get(self.USERS_URL).status_code == 403
+        response = admin_client.patch(
+            f'{self.USERS_URL}{user.username}/', data={'role': 'admin'}
+        )
+        assert response.status_code == 200
+        assert user_client.get(self.USERS_URL).status_code == 200, (
+            'Проверьте, что смена роли сбрасывает кеш аутентификации.'
+        )
+
+    def test_04_block_and_delete_invalidate(self, admin_client, user_client,
+                                            user, moderator_client,
+                                            moderator):
+        assert user_client.get(self.ME_URL).status_code == 200
+        user.is_active = False
+        user.save()
+        assert user_client.get(self.ME_URL).status_code == 401, (
+            'Проверьте, что блокировка пользователя сбрасывает кеш.'
+        )
+        assert moderator_client.get(self.ME_URL).status_code == 200
+        response = admin_client.delete(
+            f'{self.USERS_URL}{moderator.username}/'
+        )
+        assert response.status_code == 204
+        assert moderator_client.get(self.ME_URL).status_code == 401, (
+            'Проверьте, что удаление пользователя сбрасывает кеш.'
+        )
+
+    def test_05_lru_and_ttl(self, settings):
+        settings.AUTH_CACHE = {'MAX_SIZE': 2, 'TTL': 60}
+        cache = UserCache()
+        for user_id in (1, 2, 3):
+            cache.set((user_id, b'token'), 'default', (user_id,))
+        assert cache.get((1, b'token')) is None, (
+            'Проверьте, что кеш хранит не больше MAX_SIZE записей.'
+        )
+        assert cache.get((3, b'token')) == ('default', (3,))
+        settings.AUTH_CACHE = {'MAX_SIZE': 2, 'TTL': 0}
+        cache.set((4, b'token'), 'default', (4,))
+        assert cache.get((4, b'token')) is None, (
+            'Проверьте, что запись кеша живёт не дольше TTL.'
+        )
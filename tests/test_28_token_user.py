@@ -0,0 +1,117 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import RoleAccessToken, user_cache
+from tests.utils import create_single_review, create_titles
+
+
+def claims_client(user, age=0):
+    token = RoleAccessToken.for_user(user)
+    token['iat'] -= age
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.mark.django_db(transaction=True)
+class Test28TokenUser:
+    GENRES_URL = '/api/v1/genres/'
+    USERS_URL = '/api/v1/users/'
+
+    @pytest.fixture(autouse=True)
+    def token_user_mode(self, settings):
+        settings.TOKEN_USER = {
+            'ENABLED': True, 'REVALIDATE': 'never', 'MAX_AGE': None
+        }
+        user_cache.clear()
+
+    def test_01_token_has_role_claims(self, client, django_user_model):
+        data = {'username': 'claims', 'email': 'claims@yamdb.fake'}
+        client.post('/api/v1/auth/signup/', data=data)
+        user = django_user_model.objects.get(username='claims')
+        response = client.post('/api/v1/auth/token/', data={
+            'username': 'claims',
+            'confirmation_code': user.confirmation_code,
+        })
+        assert response.status_code == 200
+        token = AccessToken(response.json()['token'])
+        assert token['role'] == 'user'
+        assert token['username'] == 'claims'
+        assert token['is_staff'] is False
+        assert token['is_superuser'] is False, (
+            'Проверьте, что в токен добавлены роль и флаги пользователя.'
+        )
+
+    def test_02_no_user_query(self, admin):
+        client = claims_client(admin)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                self.GENRES_URL, data={'name': 'Жанр', 'slug': 'genre'}
+            )
+        assert response.status_code == 201
+        assert not [
+            query for query in context.captured_queries
+            if 'FROM "reviews_user"' in query['sql']
+        ], 'Проверьте, что в режиме TOKEN_USER пользователь не читается.'
+
+    def test_03_author_from_claims(self, admin_client, user, moderator):
+        titles, _, _ = create_titles(admin_client)
+        user_client = claims_client(user)
+        response = user_client.post(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+            data={'text': 'Отзыв', 'score': 5}
+        )
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+        own = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+            f'{response.json()["id"]}/'
+        )
+        assert user_client.patch(own, data={'score': 6}).status_code == 200
+        other = create_single_review(
+            claims_client(moderator), titles[0]['id'], 'Чужой', 3
+        ).json()['id']
+        response = user_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{other}/',
+            data={'score': 1}
+        )
+        assert response.status_code == 403, (
+            'Проверьте, что автор сравнивается по id из токена.'
+        )
+
+    def test_04_revalidation_policy(self, admin, settings):
+        client = claims_client(admin, age=10)
+        admin.role = 'user'
+        admin.save()
+        assert client.get(self.USERS_URL).status_code == 200
+        assert client.post(
+            self.GENRES_URL, data={'name': 'Жанр', 'slug': 'genre'}
+        ).status_code == 201, (
+            'Проверьте, что при REVALIDATE=never роль берётся из токена.'
+        )
+
+        settings.TOKEN_USER = {**settings.TOKEN_USER, 'REVALIDATE': 'writes'}
+        assert client.get(self.USERS_URL).status_code == 200
+        assert client.post(
+            self.GENRES_URL, data={'name': 'Другой', 'slug': 'other'}
+        ).status_code == 403, (
+            'Проверьте, что при REVALIDATE=writes изменяющие запросы '
+            'сверяют роль с базой.'
+        )
+
+        settings.TOKEN_USER = {**settings.TOKEN_USER, 'MAX_AGE': 5}
+        assert client.get(self.USERS_URL).status_code == 403, (
+            'Проверьте, что поля токена старше MAX_AGE сверяются с базой.'
+        )
+
+    def test_05_disabled(self, admin, settings):
+        settings.TOKEN_USER = {**settings.TOKEN_USER, 'ENABLED': False}
+        client = claims_client(admin)
+        admin.role = 'user'
+        admin.save()
+        assert client.get(self.USERS_URL).status_code == 403, (
+            'Проверьте, что без TOKEN_USER роль берётся из базы.'
+        )
@@ -0,0 +1,172 @@
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPRecipientsRefused
+
+import pytest
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api import outbox
+from reviews.models import OutboxEmail
+
+
+class CountingBackend(EmailBackend):
+    """Почтовый backend для тестов: считает открытые соединения и не
+    принимает адреса с fail.
+    """
+
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any('fail' in address for address in message.to):
+                raise SMTPRecipientsRefused({message.to[0]: (550, b'')})
+        return super().send_messages(messages)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test29EmailOutbox:
+    SIGNUP_URL = '/api/v1/auth/signup/'
+
+    @pytest.fixture(autouse=True)
+    def backend(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_29_email_outbox.CountingBackend'
+        settings.EMAIL_OUTBOX = {
+            **settings.EMAIL_OUTBOX, 'BATCH_SIZE': 2, 'MAX_ATTEMPTS': 3,
+            'RETRY_DELAY': 10,
+        }
+        CountingBackend.opened = 0
+
+    def make_due(self):
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_01_signup_only_enqueues(self, client):
+        sent_before = len(mail.outbox)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(self.SIGNUP_URL, data={
+                'username': 'queued', 'email': 'queued@yamdb.fake'
+            })
+        assert response.status_code == 200
+        assert len(mail.outbox) == sent_before, (
+            'Проверьте, что запрос к signup не отправляет письмо сам.'
+        )
+        inserts = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('INSERT INTO "reviews_outboxemail"')
+        ]
+        assert len(inserts) == 1, (
+            'Проверьте, что письмо ставится в очередь одним INSERT.'
+        )
+        email = OutboxEmail.objects.get()
+        assert email.to == 'queued@yamdb.fake'
+        assert email.status == 'pending'
+
+    def test_02_drain_in_batches(self):
+        for number in range(5):
+            outbox.enqueue('Тема', 'Текст', 'yamdb@mail.com',
+                           f'user{number}@yamdb.fake')
+        sent_before = len(mail.outbox)
+        out = StringIO()
+        call_command('sendemails', '--once', stdout=out)
+        assert 'Отправлено писем: 5' in out.getvalue()
+        assert len(mail.outbox) == sent_before + 5
+        assert CountingBackend.opened == 1, (
+            'Проверьте, что все пачки отправляются через одно соединение.'
+        )
+        assert not OutboxEmail.objects.exclude(status='sent').exists()
+        assert outbox.backlog() == 0
+
+    def test_03_retry_with_backoff(self):
+        email = outbox.enqueue('Тема', 'Текст', 'yamdb@mail.com',
+                               'fail@yamdb.fake')
+        assert outbox.drain() == (0, 1)
+        email.refresh_from_db()
+        assert email.status == 'pending'
+        assert email.attempts == 1
+        assert 'SMTPRecipientsRefused' in email.last_error
+        delay = email.next_attempt_at - timezone.now()
+        assert timedelta(seconds=8) < delay <= timedelta(seconds=10), (
+            'Проверьте, что после ошибки попытка откладывается на '
+            'RETRY_DELAY.'
+        )
+        assert outbox.drain() == (0, 0), (
+            'Проверьте, что письмо не отправляется раньше срока.'
+        )
+
+        self.make_due()
+        outbox.drain()
+        email.refresh_from_db()
+        delay = email.next_attempt_at - timezone.now()
+        assert timedelta(seconds=18) < delay <= timedelta(seconds=20), (
+            'Проверьте, что задержка растёт с каждой попыткой.'
+        )
+
+        self.make_due()
+        outbox.drain()
+        email.refresh_from_db()
+        assert email.status == 'failed', (
+            'Проверьте, что после MAX_ATTEMPTS попыток письмо '
+            'помечается неотправленным.'
+        )
+        assert outbox.backlog() == 0
+
+    def test_04_claimed_emails_are_leased(self):
+        outbox.enqueue('Тема', 'Текст', 'yamdb@mail.com', 'a@yamdb.fake')
+        assert len(outbox.claim_batch(10)) == 1
+        assert outbox.claim_batch(10) == [], (
+            'Проверьте, что забранное воркером письмо не достаётся другому.'
+        )
+
+    def test_05_sent_emails_erased_and_purged(self):
+        email = outbox.enqueue('Тема', 'Код 123456', 'yamdb@mail.com',
+                               'a@yamdb.fake')
+        outbox.drain()
+        email.refresh_from_db()
+        assert email.status == 'sent'
+        assert email.body == '', (
+            'Проверьте, что у отправленного письма стирается текст с кодом.'
+        )
+        OutboxEmail.objects.update(
+            created_at=timezone.now() - timedelta(days=30)
+        )
+        waiting = outbox.enqueue('Тема', 'Текст', 'yamdb@mail.com',
+                                 'b@yamdb.fake')
+        OutboxEmail.objects.filter(pk=waiting.pk).update(
+            created_at=timezone.now() - timedelta(days=30),
+            next_attempt_at=timezone.now() + timedelta(hours=1)
+        )
+        assert outbox.purge() == 1
+        assert list(OutboxEmail.objects.values_list('pk', flat=True)) == [
+            waiting.pk
+        ], (
+            'Проверьте, что старые отправленные письма удаляются, а '
+            'ожидающие отправки остаются.'
+        )
+
+    def test_06_expired_lease_is_not_sent_twice(self):
+        for address in ('a@yamdb.fake', 'b@yamdb.fake'):
+            outbox.enqueue('Тема', 'Текст', 'yamdb@mail.com', address)
+        first, second = outbox.claim_batch(10)
+        # Аренда первого письма истекла, и его забрал другой воркер.
+        OutboxEmail.objects.filter(pk=first.pk).update(
+            next_attempt_at=timezone.now() + timedelta(minutes=1)
+        )
+        sent, errors = outbox.send_batch(
+            [first, second], get_connection()
+        )
+        assert sent == [second.pk] and errors == {}, (
+            'Проверьте, что письмо с истёкшей арендой не отправляется.'
+        )
+        second.refresh_from_db()
+        assert second.next_attempt_at > timezone.now() + timedelta(
+            seconds=outbox.get_setting('LEASE') - 10
+        ), 'Проверьте, что аренда продлевается перед отправкой письма.'
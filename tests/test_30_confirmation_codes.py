@@ -0,0 +1,89 @@
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import codes
+from reviews.models import User
+
+
+@pytest.mark.django_db(transaction=True)
+class Test30ConfirmationCodes:
+    SIGNUP_URL = '/api/v1/auth/signup/'
+    TOKEN_URL = '/api/v1/auth/token/'
+    DATA = {'username': 'coder', 'email': 'coder@yamdb.fake'}
+
+    @pytest.fixture
+    def hmac_mode(self, settings):
+        settings.CONFIRMATION_CODES = {
+            **settings.CONFIRMATION_CODES, 'MODE': 'hmac', 'WINDOW': 900
+        }
+
+    def signup(self, client):
+        response = client.post(self.SIGNUP_URL, data=self.DATA)
+        assert response.status_code == 200
+        return response
+
+    def mailed_code(self):
+        call_command('sendemails', '--once', stdout=StringIO())
+        return mail.outbox[-1].body.rsplit(' ', 1)[1]
+
+    def get_token(self, client, code):
+        return client.post(self.TOKEN_URL, data={
+            'username': self.DATA['username'], 'confirmation_code': code
+        })
+
+    def test_01_repeated_signup_is_read_only(self, client, hmac_mode):
+        self.signup(client)
+        with CaptureQueriesContext(connection) as context:
+            self.signup(client)
+        writes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(
+                ('UPDATE "reviews_user"', 'INSERT INTO "reviews_user"')
+            )
+        ]
+        assert writes == [], (
+            'Проверьте, что в режиме hmac повторный signup не пишет '
+            'в таблицу пользователей.'
+        )
+        assert User.objects.get().confirmation_code is None
+
+    def test_02_code_gives_token_once(self, client, hmac_mode):
+        self.signup(client)
+        code = self.mailed_code()
+        assert len(code) == codes.CODE_DIGITS
+        response = self.get_token(client, code)
+        assert response.status_code == 200
+        assert 'token' in response.json()
+        assert self.get_token(client, code).status_code == 400, (
+            'Проверьте, что использованный код больше не подходит.'
+        )
+        user = User.objects.get()
+        assert self.get_token(
+            client, codes.current_code(user)
+        ).status_code == 200
+
+    def test_03_code_expires(self, client, hmac_mode, monkeypatch):
+        self.signup(client)
+        code = self.mailed_code()
+        now = codes.time.time()
+        monkeypatch.setattr(codes.time, 'time', lambda: now + 900)
+        assert codes.check_code(User.objects.get(), int(code)), (
+            'Проверьте, что код действует и в следующем окне.'
+        )
+        monkeypatch.setattr(codes.time, 'time', lambda: now + 1800)
+        assert self.get_token(client, code).status_code == 400, (
+            'Проверьте, что код перестаёт действовать через два окна.'
+        )
+
+    def test_04_stored_mode(self, client):
+        self.signup(client)
+        code = self.mailed_code()
+        user = User.objects.get()
+        assert user.confirmation_code == int(code)
+        assert self.get_token(client, code).status_code == 200
+        assert self.get_token(client, code + '1').status_code == 400
@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import throttling
+
+
+@pytest.mark.django_db(transaction=True)
+class Test31Throttling:
+    SIGNUP_URL = '/api/v1/auth/signup/'
+    TOKEN_URL = '/api/v1/auth/token/'
+
+    def set_rates(self, settings, **rates):
+        settings.THROTTLE = {**settings.THROTTLE, 'RATES': rates}
+
+    def signup(self, client, number=0, **extra):
+        return client.post(self.SIGNUP_URL, data={
+            'username': f'user{number}', 'email': f'user{number}@yamdb.fake'
+        }, **extra)
+
+    def test_01_username_bucket(self, client, settings):
+        self.set_rates(settings, signup_username=(2, 60))
+        assert self.signup(client).status_code == 200
+        assert self.signup(client).status_code == 200
+        with CaptureQueriesContext(connection) as context:
+            response = self.signup(client)
+        assert response.status_code == 429, (
+            'Проверьте, что signup ограничивается по username.'
+        )
+        assert 0 < int(response['Retry-After']) <= 60
+        assert len(context) == 0, (
+            'Проверьте, что отклонённый запрос не обращается к базе.'
+        )
+        assert self.signup(client, 1).status_code == 200
+
+    def test_02_ip_bucket(self, client, settings):
+        self.set_rates(settings, signup_ip=(3, 60))
+        for number in range(3):
+            assert self.signup(client, number).status_code == 200
+        assert self.signup(client, 3).status_code == 429, (
+            'Проверьте, что signup ограничивается по IP-адресу.'
+        )
+        response = self.signup(client, 3, REMOTE_ADDR='10.0.0.2')
+        assert response.status_code == 200
+
+    def test_03_refill(self, client, settings, monkeypatch):
+        self.set_rates(settings, signup_email=(1, 10))
+        assert self.signup(client).status_code == 200
+        assert self.signup(client).status_code == 429
+        now = throttling.time.time()
+        monkeypatch.setattr(throttling.time, 'time', lambda: now + 10)
+        assert self.signup(client).status_code == 200, (
+            'Проверьте, что корзина пополняется со временем.'
+        )
+
+    def test_04_token_guessing(self, client, settings, user):
+        self.set_rates(settings, token_username=(3, 60))
+        data = {'username': user.username, 'confirmation_code': 1}
+        for _ in range(3):
+            assert client.post(self.TOKEN_URL, data=data).status_code == 400
+        assert client.post(self.TOKEN_URL, data=data).status_code == 429, (
+            'Проверьте, что подбор кода ограничивается по username.'
+        )
+
+    def test_05_atomic_shared_store(self, settings):
+        self.set_rates(settings)
+        stores = [throttling.BucketStore() for _ in range(4)]
+
+        def take(store):
+            return sum(
+                not store.take('shared', 20, 3600) for _ in range(10)
+            )
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            taken = sum(executor.map(take, stores))
+        assert taken == 20, (
+            'Проверьте, что воркеры делят одну корзину и не забирают '
+            'больше токенов, чем в ней есть.'
+        )
+
+    def test_06_disabled(self, client, settings):
+        self.set_rates(settings, signup_username=(1, 60))
+        settings.THROTTLE = {**settings.THROTTLE, 'ENABLED': False}
+        for _ in range(3):
+            assert self.signup(client).status_code == 200
+
+    def test_07_forwarded_for_needs_trusted_proxy(self, client,
+                                                  settings):
+        self.set_rates(settings, signup_ip=(2, 60))
+        for number in range(2):
+            assert self.signup(
+                client, number, HTTP_X_FORWARDED_FOR=f'10.1.0.{number}'
+            ).status_code == 200
+        response = self.signup(client, 2, HTTP_X_FORWARDED_FOR='10.1.0.2')
+        assert response.status_code == 429, (
+            'Проверьте, что без доверенных прокси (`NUM_PROXIES`) '
+            'заголовок X-Forwarded-For не меняет корзину IP-адреса.'
+        )
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK, 'NUM_PROXIES': 1
+        }
+        response = self.signup(
+            client, 3, HTTP_X_FORWARDED_FOR='10.1.0.3, 10.2.0.1'
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что за доверенным прокси IP клиента берётся из '
+            'X-Forwarded-For.'
+        )